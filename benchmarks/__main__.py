@@ -0,0 +1,137 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+
+from benchmarks import cases
+
+
+REPEATS_NUMBER = 3
+THRESHOLDS_PATH = os.path.join(os.path.dirname(__file__), 'thresholds.json')
+THRESHOLDS_FACTOR = 3
+
+
+def run_benchmark(benchmark, repeats_number):
+    """
+    Runs a benchmark case, keeping the best time of the repeats after a warm-up run.
+
+    :param benchmark: the benchmark case
+    :type benchmark: benchmarks.cases.Benchmark
+
+    :param repeats_number: the number of repeats
+    :type repeats_number: int
+
+    :return: the result in the form {'id': str, 'name': str, 'parameters': dict, 'items_number': int,
+     'seconds': float, 'item_microseconds': float}
+    :rtype: dict[str, object]
+    """
+    run, items_number = benchmark.setup()
+    run()
+
+    seconds = float('inf')
+    for _ in range(repeats_number):
+        gc.collect()
+        start_time = time.perf_counter()
+        run()
+        seconds = min(seconds, time.perf_counter() - start_time)
+
+    return {
+        'id': cases.get_case_id(benchmark),
+        'name': benchmark.name,
+        'parameters': benchmark.parameters,
+        'items_number': items_number,
+        'seconds': seconds,
+        'item_microseconds': seconds * 1e6 / items_number,
+    }
+
+
+def check_thresholds(results, thresholds):
+    """
+    Checks the results against the regression thresholds.
+
+    :param results: the results of the benchmark cases
+    :type results: list[dict[str, object]]
+
+    :param thresholds: the maximum time per item in microseconds, in the form {case_id: item_microseconds}
+    :type thresholds: dict[str, float]
+
+    :return: the regressions in the form {'id': str, 'item_microseconds': float, 'threshold': float}
+    :rtype: list[dict[str, object]]
+    """
+    regressions = []
+    for result in results:
+        threshold = thresholds.get(result['id'])
+        if threshold is not None and result['item_microseconds'] > threshold:
+            regressions.append({
+                'id': result['id'],
+                'item_microseconds': result['item_microseconds'],
+                'threshold': threshold,
+            })
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks',
+        description='Benchmarks the task generation and publishing, against the in-memory broker.',
+    )
+    parser.add_argument('--quick', action='store_true',
+                        help='sweep only the smaller learner counts')
+    parser.add_argument('--filter', default='',
+                        help='run only the cases whose identifier contains this text')
+    parser.add_argument('--repeats', type=int, default=REPEATS_NUMBER,
+                        help='number of repeats of each case, keeping the best time')
+    parser.add_argument('--output', default='benchmark-results.json',
+                        help='path of the JSON results')
+    parser.add_argument('--thresholds', default=THRESHOLDS_PATH,
+                        help='path of the JSON regression thresholds, in microseconds per item')
+    parser.add_argument('--update-thresholds', action='store_true',
+                        help='write the thresholds as {} times the measured times'.format(THRESHOLDS_FACTOR))
+    arguments = parser.parse_args()
+
+    results = []
+    for benchmark in cases.get_benchmarks(quick=arguments.quick):
+        if arguments.filter not in cases.get_case_id(benchmark):
+            continue
+
+        result = run_benchmark(benchmark, arguments.repeats)
+        results.append(result)
+        print('{:<80} {:>12.3f} us/item {:>10.3f} s'.format(
+            result['id'],
+            result['item_microseconds'],
+            result['seconds'],
+        ))
+
+    thresholds = {}
+    if os.path.exists(arguments.thresholds):
+        with open(arguments.thresholds) as thresholds_file:
+            thresholds = json.load(thresholds_file)
+
+    if arguments.update_thresholds:
+        thresholds.update({
+            result['id']: round(result['item_microseconds'] * THRESHOLDS_FACTOR, 3) for result in results
+        })
+        with open(arguments.thresholds, 'w') as thresholds_file:
+            json.dump(thresholds, thresholds_file, indent=2, sort_keys=True)
+            thresholds_file.write('\n')
+
+    regressions = check_thresholds(results, thresholds)
+    with open(arguments.output, 'w') as output_file:
+        json.dump({
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'results': results,
+            'regressions': regressions,
+        }, output_file, indent=2)
+
+    for regression in regressions:
+        print('REGRESSION {id}: {item_microseconds:.3f} us/item over {threshold:.3f}'.format(**regression))
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,328 @@
+import collections
+import json
+
+from scheduler import job_schema
+from scheduler import message_codecs
+from scheduler import tasks_cache
+from scheduler.amqp_manager import AMQPManager
+from scheduler.memory_broker import MemoryBroker
+from scheduler.tasks_generators.filter_tasks_generator import FilterTasksGenerator
+from scheduler.tasks_generators.fuser_tasks_generator import FuserTasksGenerator
+from scheduler.tasks_generators.learner_tasks_generator import LearnerTasksGenerator
+
+
+LEARNERS_NUMBERS = [10, 100, 1000, 10000, 100000, 1000000]
+QUICK_LEARNERS_NUMBERS = [10, 1000, 10000]
+PUBLISHED_LEARNERS_NUMBERS = [10, 1000, 100000]
+QUICK_PUBLISHED_LEARNERS_NUMBERS = [10, 1000]
+RANGE_STEPS = ['0.01', '0.0001', '0.000001', '0.00000001']
+PARAMETERS_NUMBERS = [1, 4, 16, 64]
+
+TASKS_NUMBER = 1000
+SINGLE_TASKS_NUMBER = 1000
+RANGE_CALLS_NUMBER = 1000
+ENCODED_TASKS_NUMBER = 10000
+VALIDATED_JOBS_NUMBER = 1000
+
+JOB = {
+    'job_name': 'benchmark',
+    'dataset_name': 'higgs',
+    'training_rate': 0.5,
+    'fusion_rate': 0.3,
+    'class_attribute': 'label',
+    'class_attribute_type': 'integer',
+    'true_class_value': '1',
+    'include_attributes': [],
+    'exclude_attributes': [],
+    'attributes_rate': 0.5,
+    'random_seed': 0,
+    'include_header': False,
+}
+
+PREDICT_PARAMETERS = [
+    {
+        'name': 'threshold',
+        'type': 'real',
+        'value': '0.5',
+    },
+]
+
+Benchmark = collections.namedtuple('Benchmark', ['name', 'parameters', 'setup'])
+Benchmark.__doc__ = """
+Defines a benchmark case.
+The setup function prepares the case, returning the function to time and the number of items it processes.
+"""
+
+
+def get_learn_parameters(parameters_number, step='0.001'):
+    """
+    Gets the learn parameters of a job, cycling over the text values, the integer ranges and the real ranges.
+
+    :param parameters_number: the number of parameters
+    :type parameters_number: int
+
+    :param step: the step of the real ranges
+    :type step: str
+
+    :return: the learn parameters, in the format of the job submission
+    :rtype: list[dict]
+    """
+    learn_parameters = []
+    for i in range(parameters_number):
+        if i % 3 == 0:
+            learn_parameters.append({
+                'name': 'text_{}'.format(i),
+                'type': 'text',
+                'values': ['SPUCrossover', 'KozaCrossover', 'UniformCrossover'],
+            })
+        elif i % 3 == 1:
+            learn_parameters.append({
+                'name': 'integer_{}'.format(i),
+                'type': 'integer',
+                'range': {'start': '1000', 'stop': '100000', 'step': '1'},
+            })
+        else:
+            learn_parameters.append({
+                'name': 'real_{}'.format(i),
+                'type': 'real',
+                'range': {'start': '0.0', 'stop': '1.0', 'step': step},
+            })
+    return learn_parameters
+
+
+def create_learner_tasks_generator(learners_number, learn_parameters):
+    return LearnerTasksGenerator(
+        tasks_number=learners_number,
+        sample_rate=0.1,
+        duration=60,
+        learn_parameters=learn_parameters,
+        **JOB
+    )
+
+
+def create_filter_tasks_generator():
+    return FilterTasksGenerator(
+        learner_outputs_number=TASKS_NUMBER,
+        threshold=0.5,
+        predict_parameters=PREDICT_PARAMETERS,
+        **JOB
+    )
+
+
+def create_fuser_tasks_generator():
+    return FuserTasksGenerator(
+        predict_parameters=PREDICT_PARAMETERS,
+        **JOB
+    )
+
+
+def consume(iterable):
+    for _ in iterable:
+        pass
+
+
+def setup_learner_tasks_iterate(learners_number, parameters_number=4, step='0.001'):
+    learn_parameters = get_learn_parameters(parameters_number, step)
+
+    def run():
+        consume(create_learner_tasks_generator(learners_number, learn_parameters))
+    return run, learners_number
+
+
+def setup_learner_tasks_serialize(learners_number):
+    learn_parameters = get_learn_parameters(4)
+
+    def run():
+        consume(create_learner_tasks_generator(learners_number, learn_parameters).serialize())
+    return run, learners_number
+
+
+def setup_learner_tasks_generate_batch(learners_number):
+    learn_parameters = get_learn_parameters(4)
+
+    def run():
+        create_learner_tasks_generator(learners_number, learn_parameters).generate_batch(learners_number)
+    return run, learners_number
+
+
+def setup_single_tasks_iterate(create_tasks_generator):
+    def run():
+        for _ in range(SINGLE_TASKS_NUMBER):
+            consume(create_tasks_generator())
+    return run, SINGLE_TASKS_NUMBER
+
+
+def setup_tasks_cache_hit(learners_number):
+    cache = tasks_cache.SerializedTasksCache(size=2 ** 30)
+    inputs = dict(JOB, tasks_number=learners_number, sample_rate=0.1, duration=60,
+                  learn_parameters=get_learn_parameters(4))
+    del inputs['job_name']
+    consume(cache.get_tasks(LearnerTasksGenerator, JOB['job_name'], inputs).serialize())
+
+    def run():
+        consume(cache.get_tasks(LearnerTasksGenerator, JOB['job_name'], inputs).serialize())
+    return run, learners_number
+
+
+def setup_get_range(step, value_type):
+    tasks_generator = create_learner_tasks_generator(1, [])
+
+    def run():
+        for _ in range(RANGE_CALLS_NUMBER):
+            values = tasks_generator._get_range('0', '1000', step, value_type)
+            len(values)
+            values[len(values) // 2]
+    return run, RANGE_CALLS_NUMBER
+
+
+def setup_encode(content_type, content_encoding):
+    # The tasks are smaller than the compression threshold, so every task is compressed here.
+    codec = message_codecs.MessageCodec(content_type, content_encoding, compression_threshold=0)
+    tasks = list(create_learner_tasks_generator(ENCODED_TASKS_NUMBER, get_learn_parameters(4)))
+
+    def run():
+        for task in tasks:
+            codec.encode(task)
+    return run, ENCODED_TASKS_NUMBER
+
+
+def setup_validate_job(parameters_number):
+    job = dict(
+        JOB,
+        name=JOB['job_name'],
+        sample_rate=0.1,
+        duration=60,
+        threshold=0.5,
+        learners_number=1000,
+        learn_parameters=get_learn_parameters(parameters_number),
+        predict_parameters=PREDICT_PARAMETERS,
+    )
+    del job['job_name']
+
+    def run():
+        for _ in range(VALIDATED_JOBS_NUMBER):
+            job_schema.validate_job(job)
+    return run, VALIDATED_JOBS_NUMBER
+
+
+def setup_publish_messages(learners_number, confirm):
+    broker = MemoryBroker()
+    amqp_manager = AMQPManager('localhost', transport=broker.connect)
+    queue_name = 'benchmark@learner.tasks'
+    bodies = list(create_learner_tasks_generator(learners_number, get_learn_parameters(4)).serialize())
+
+    def run():
+        amqp_manager.delete_queue(queue_name)
+        amqp_manager.create_queue(queue_name)
+        amqp_manager.publish_messages(queue_name, bodies, confirm=confirm)
+    return run, learners_number
+
+
+def is_codec_available(content_type, content_encoding):
+    try:
+        message_codecs.get_serializer(content_type)
+        if content_encoding is not None:
+            message_codecs.get_compressor(content_encoding)
+    except ValueError:
+        return False
+    return True
+
+
+def get_benchmarks(quick=False):
+    """
+    Gets the benchmark cases, sweeping the learner counts, the range granularities and the parameter counts.
+
+    :param quick: if True, it sweeps only the smaller learner counts
+    :type quick: bool
+
+    :return: the benchmark cases
+    :rtype: list[Benchmark]
+    """
+    learners_numbers = QUICK_LEARNERS_NUMBERS if quick else LEARNERS_NUMBERS
+    published_learners_numbers = QUICK_PUBLISHED_LEARNERS_NUMBERS if quick else PUBLISHED_LEARNERS_NUMBERS
+
+    benchmarks = []
+    for learners_number in learners_numbers:
+        parameters = {'learners_number': learners_number}
+        benchmarks += [
+            Benchmark('learner_tasks.iterate', parameters,
+                      lambda n=learners_number: setup_learner_tasks_iterate(n)),
+            Benchmark('learner_tasks.serialize', parameters,
+                      lambda n=learners_number: setup_learner_tasks_serialize(n)),
+            Benchmark('learner_tasks.generate_batch', parameters,
+                      lambda n=learners_number: setup_learner_tasks_generate_batch(n)),
+        ]
+
+    for parameters_number in PARAMETERS_NUMBERS:
+        benchmarks.append(Benchmark(
+            'learner_tasks.parameters',
+            {'parameters_number': parameters_number},
+            lambda n=parameters_number: setup_learner_tasks_iterate(TASKS_NUMBER, parameters_number=n),
+        ))
+
+    for step in RANGE_STEPS:
+        benchmarks += [
+            Benchmark('learner_tasks.range_step', {'step': step},
+                      lambda s=step: setup_learner_tasks_iterate(TASKS_NUMBER, parameters_number=3, step=s)),
+            Benchmark('get_range', {'step': step, 'value_type': 'real'},
+                      lambda s=step: setup_get_range(s, 'real')),
+        ]
+    benchmarks.append(Benchmark('get_range', {'step': '1', 'value_type': 'integer'},
+                                lambda: setup_get_range('1', 'integer')))
+
+    benchmarks += [
+        Benchmark('filter_tasks.iterate', {}, lambda: setup_single_tasks_iterate(create_filter_tasks_generator)),
+        Benchmark('fuser_tasks.iterate', {}, lambda: setup_single_tasks_iterate(create_fuser_tasks_generator)),
+    ]
+
+    for content_type in (message_codecs.JSON_CONTENT_TYPE, message_codecs.MSGPACK_CONTENT_TYPE,
+                         message_codecs.CBOR_CONTENT_TYPE):
+        for content_encoding in (None, message_codecs.ZLIB_CONTENT_ENCODING, message_codecs.LZ4_CONTENT_ENCODING):
+            if is_codec_available(content_type, content_encoding):
+                benchmarks.append(Benchmark(
+                    'encode',
+                    {'content_type': content_type, 'content_encoding': content_encoding},
+                    lambda t=content_type, e=content_encoding: setup_encode(t, e),
+                ))
+
+    for parameters_number in PARAMETERS_NUMBERS:
+        benchmarks.append(Benchmark(
+            'validate_job',
+            {'parameters_number': parameters_number},
+            lambda n=parameters_number: setup_validate_job(n),
+        ))
+
+    for learners_number in published_learners_numbers:
+        benchmarks.append(Benchmark(
+            'tasks_cache.serialize_hit',
+            {'learners_number': learners_number},
+            lambda n=learners_number: setup_tasks_cache_hit(n),
+        ))
+
+    for learners_number in published_learners_numbers:
+        for confirm in (False, True):
+            benchmarks.append(Benchmark(
+                'publish_messages',
+                {'learners_number': learners_number, 'confirm': confirm},
+                lambda n=learners_number, c=confirm: setup_publish_messages(n, c),
+            ))
+
+    return benchmarks
+
+
+def get_case_id(benchmark):
+    """
+    Gets the identifier of a benchmark case, e.g. 'publish_messages[confirm=true,learners_number=1000]'.
+
+    :param benchmark: the benchmark case
+    :type benchmark: Benchmark
+
+    :return: the identifier
+    :rtype: str
+    """
+    if not benchmark.parameters:
+        return benchmark.name
+    return '{}[{}]'.format(benchmark.name, ','.join(
+        '{}={}'.format(name, json.dumps(value).strip('"'))
+        for name, value in sorted(benchmark.parameters.items())
+    ))
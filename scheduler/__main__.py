@@ -1,10 +1,27 @@
 import json
 import os
 import ast
+import functools
+import hmac
+import itertools
+import queue
+import threading
 
 import flask
+import pika
 
 from scheduler import amqp_manager
+from scheduler import amqp_manager_pool
+from scheduler import async_amqp_manager
+from scheduler import job_publisher
+from scheduler import job_schema
+from scheduler import memory_broker
+from scheduler import message_codecs
+from scheduler import metrics
+from scheduler import profiling
+from scheduler import queues_statistics_cache
+from scheduler import task_spool
+from scheduler import tasks_cache
 from scheduler.tasks_generators.learner_tasks_generator import LearnerTasksGenerator
 from scheduler.tasks_generators.filter_tasks_generator import FilterTasksGenerator
 from scheduler.tasks_generators.fuser_tasks_generator import FuserTasksGenerator
@@ -14,29 +31,225 @@ LEARNER_TASKS_QUEUE_NAME = '{job_name_}@learner.tasks'
 FILTER_TASKS_QUEUE_NAME = '{job_name_}@filter.tasks'
 FUSER_TASKS_QUEUE_NAME = '{job_name_}@fuser.tasks'
 
+JOBS_BATCH_SIZE = 1000
+JOB_STATUS_CHUNK_SIZE = 500
+
 
 # App initialization.
 app = flask.Flask(__name__)
 
+# The pool and the background publisher are shared by all the requests of the process.
+amqp_broker = None
+amqp_broker_lock = threading.Lock()
+amqp_managers = None
+amqp_managers_lock = threading.Lock()
+jobs_publisher = None
+jobs_publisher_lock = threading.Lock()
+queues_statistics = None
+queues_statistics_lock = threading.Lock()
+profiles = None
+profiles_lock = threading.Lock()
+serialized_tasks = None
+serialized_tasks_lock = threading.Lock()
+tasks_spool = None
+tasks_spool_lock = threading.Lock()
+
+
+def get_amqp_broker():
+    global amqp_broker
+    with amqp_broker_lock:
+        if amqp_broker is None:
+            amqp_broker = memory_broker.MemoryBroker()
+        return amqp_broker
+
+
+def get_amqp_transports():
+    """
+    Gets the transports to the message broker: the network by default,
+    or a broker in the memory of the process if AMQP_TRANSPORT is 'memory'.
+
+    :return: the transport of AMQPManager and the one of AsyncAMQPManager
+    :rtype: ((str) -> pika.BlockingConnection,
+     (str) -> collections.abc.Awaitable[pika.adapters.asyncio_connection.AsyncioConnection])
+    """
+    if os.environ.get('AMQP_TRANSPORT') == 'memory':
+        return get_amqp_broker().connect, get_amqp_broker().connect_async
+    return amqp_manager.connect, async_amqp_manager.connect
+
+
+def get_amqp_manager_pool():
+    global amqp_managers
+    with amqp_managers_lock:
+        if amqp_managers is None:
+            amqp_managers = amqp_manager_pool.AMQPManagerPool(
+                hostname=os.environ.get('AMQP_HOSTNAME', 'rabbitmq'),
+                size=int(os.environ.get('AMQP_POOL_SIZE', amqp_manager_pool.POOL_SIZE)),
+                codec=get_message_codec(),
+                transport=get_amqp_transports()[0],
+            )
+        return amqp_managers
+
+
+def get_message_codec():
+    return message_codecs.MessageCodec(
+        content_type=os.environ.get('AMQP_CONTENT_TYPE', message_codecs.JSON_CONTENT_TYPE),
+        content_encoding=os.environ.get('AMQP_CONTENT_ENCODING') or None,
+    )
+
 
 def get_amqp_manager():
     if not hasattr(flask.g, 'amqp_manager'):
-        flask.g.amqp_manager = amqp_manager.AMQPManager(
-            hostname=os.environ.get('AMQP_HOSTNAME', 'rabbitmq'),
-        )
+        flask.g.amqp_manager = get_amqp_manager_pool().acquire()
     return flask.g.amqp_manager
 
 
 @app.teardown_appcontext
-def delete_amqp_manager(exception):
+def release_amqp_manager(exception):
     if hasattr(flask.g, 'amqp_manager'):
-        flask.g.amqp_manager.close()
+        get_amqp_manager_pool().release(flask.g.amqp_manager)
+
+
+def get_job_publisher():
+    global jobs_publisher
+    with jobs_publisher_lock:
+        if jobs_publisher is None:
+            # The asyncio publisher interleaves all the jobs on a single connection, instead of a thread per job.
+            if os.environ.get('JOB_PUBLISHER') == 'asyncio':
+                jobs_publisher = job_publisher.AsyncJobPublisher(
+                    connect=connect_async_amqp_manager,
+                    backlog_size=int(os.environ.get('JOB_PUBLISHER_BACKLOG', job_publisher.BACKLOG_SIZE)),
+                )
+            else:
+                jobs_publisher = job_publisher.JobPublisher(
+                    workers_number=int(os.environ.get('JOB_PUBLISHER_WORKERS', job_publisher.WORKERS_NUMBER)),
+                    backlog_size=int(os.environ.get('JOB_PUBLISHER_BACKLOG', job_publisher.BACKLOG_SIZE)),
+                )
+        return jobs_publisher
+
+
+def connect_async_amqp_manager():
+    return async_amqp_manager.AsyncAMQPManager.connect(
+        hostname=os.environ.get('AMQP_HOSTNAME', 'rabbitmq'),
+        codec=get_message_codec(),
+        transport=get_amqp_transports()[1],
+    )
+
+
+def get_queues_statistics_cache():
+    global queues_statistics
+    with queues_statistics_lock:
+        if queues_statistics is None:
+            queues_statistics = queues_statistics_cache.QueuesStatisticsCache(
+                get_queues_statistics=retrieve_queues_statistics,
+                ttl=float(os.environ.get('QUEUES_STATISTICS_TTL', queues_statistics_cache.STATISTICS_TTL)),
+            )
+        return queues_statistics
+
+
+def get_profile_store():
+    global profiles
+    with profiles_lock:
+        if profiles is None:
+            profiles = profiling.ProfileStore(
+                profiles_number=int(os.environ.get('PROFILES_NUMBER', profiling.PROFILES_NUMBER)),
+            )
+        return profiles
+
+
+def get_tasks_cache():
+    """
+    Gets the cache of the serialized tasks, disabled if TASKS_CACHE_SIZE is 0.
+
+    :return: the cache, None if disabled
+    :rtype: scheduler.tasks_cache.SerializedTasksCache
+    """
+    global serialized_tasks
+    with serialized_tasks_lock:
+        if serialized_tasks is None:
+            size = int(os.environ.get('TASKS_CACHE_SIZE', tasks_cache.CACHE_SIZE))
+            if size <= 0:
+                return None
+            serialized_tasks = tasks_cache.SerializedTasksCache(size=size)
+        return serialized_tasks
+
+
+def get_task_spool():
+    """
+    Gets the spool of the tasks published in background, enabled if JOB_SPOOL_PATH is set.
+
+    :return: the spool, None if disabled
+    :rtype: scheduler.task_spool.TaskSpool
+    """
+    global tasks_spool
+    with tasks_spool_lock:
+        if tasks_spool is None:
+            directory = os.environ.get('JOB_SPOOL_PATH')
+            if not directory:
+                return None
+            tasks_spool = task_spool.TaskSpool(
+                directory=directory,
+                connect=connect_amqp_manager,
+                segment_size=int(os.environ.get('JOB_SPOOL_SEGMENT_SIZE', task_spool.SEGMENT_SIZE)),
+            )
+        return tasks_spool
+
+
+def connect_amqp_manager():
+    return amqp_manager.AMQPManager(
+        hostname=os.environ.get('AMQP_HOSTNAME', 'rabbitmq'),
+        codec=get_message_codec(),
+        transport=get_amqp_transports()[0],
+    )
+
+
+def is_profiling_requested():
+    """
+    Checks if the job submission must be profiled, by the header X-Profile or, for all of them, by PROFILE_JOBS.
+
+    :return: True if profiled
+    :rtype: bool
+    """
+    return (flask.request.headers.get('X-Profile', '').lower() == 'true'
+            or os.environ.get('PROFILE_JOBS', '').lower() == 'true')
+
+
+def is_atomic_requested():
+    """
+    Checks if the tasks of the job must be published all or none, by the argument atomic or by JOB_PUBLISH_ATOMIC.
+
+    :return: True if atomic
+    :rtype: bool
+    """
+    return (flask.request.args.get('atomic', '').lower() == 'true'
+            or os.environ.get('JOB_PUBLISH_ATOMIC', '').lower() == 'true')
+
+
+def is_admin_authorized():
+    """
+    Checks the header X-Admin-Token against ADMIN_TOKEN, if set.
+
+    :return: True if authorized
+    :rtype: bool
+    """
+    admin_token = os.environ.get('ADMIN_TOKEN')
+    if not admin_token:
+        return True
+    return hmac.compare_digest(flask.request.headers.get('X-Admin-Token', '').encode(), admin_token.encode())
+
+
+def retrieve_queues_statistics(queue_names):
+    amqp_manager = get_amqp_manager_pool().acquire()
+    try:
+        return amqp_manager.queues_statistics(queue_names)
+    finally:
+        get_amqp_manager_pool().release(amqp_manager)
 
 
 @app.route('/job', methods=['POST'])
 def post_job():
     """
-    Posts a new job in the system.
+    Posts a new job in the system, with the fields in a form or, as JSON values, in an application/json body.
+    If JOB_SPOOL_PATH is set, the tasks are written to the spool on the disk and published in background.
     POST: /job
 
     :param name: the name of the job
@@ -95,103 +308,636 @@ def post_job():
     :param form['predict_parameters']: the list of parameters for the executor,
     in the form {'name': str, 'type': 'integer' | 'real' | 'text', 'value': object}
     :type form['predict_parameters']: list[object]
+
+    :param args['async']: if 'true', it publishes the job in background and returns its status,
+     available at /job/<job_id>/status
+    :type args['async']: str
+
+    :param args['atomic']: if 'true', or for all the jobs if JOB_PUBLISH_ATOMIC is 'true',
+     it publishes all the tasks of the job in a transaction, rolled back on failure, bypassing the spool
+    :type args['atomic']: str
+
+    :param headers['X-Profile']: if 'true', it profiles the submission, available at /admin/profiles/<profile_id>
+     with the identifier in the header X-Profile-Id of the response
+    :type headers['X-Profile']: str
+    """
+    return handle_profiled('POST /job', submit_job)
+
+
+@app.route('/jobs/batch', methods=['POST'])
+def post_jobs_batch():
+    """
+    Posts many jobs in the system at once, e.g. a parameter sweep.
+    All the jobs are validated before any queue is created, then the queues of all the jobs are declared together
+    and the tasks are published on the same channels, waiting for the confirmation of the broker.
+    POST: /jobs/batch
+
+    :param json: the list of the jobs, each one with the fields of post_job as JSON values
+    :type json: list[dict[str, object]]
+
+    :param headers['X-Profile']: if 'true', it profiles the submission, as in post_job
+    :type headers['X-Profile']: str
+    """
+    return handle_profiled('POST /jobs/batch', submit_jobs_batch)
+
+
+def handle_profiled(name, handle):
+    """
+    Handles a request, profiling it if requested.
+
+    :param name: the name of the profiled operation
+    :type name: str
+
+    :param handle: the function handling the request
+    :type handle: () -> object
+
+    :return: the response, with the identifier of the profile in the header X-Profile-Id if profiled
+    :rtype: object
+    """
+    if not is_profiling_requested():
+        return handle()
+
+    session = profiling.ProfileSession(name)
+    with session.profile():
+        response = flask.make_response(handle())
+    # The request is not profiled while another profiler is enabled, e.g. the one of a concurrent request.
+    if not session.is_profiled:
+        return response
+    get_profile_store().add(session)
+
+    response.headers['X-Profile-Id'] = session.session_id
+    return response
+
+
+def submit_jobs_batch():
+    """
+    Parses and publishes the jobs of the request, as described in post_jobs_batch.
+
+    :return: the response
+    :rtype: object
     """
-    amqp_manager = get_amqp_manager()
+    jobs = flask.request.get_json(silent=True)
+    if not isinstance(jobs, list) or not jobs:
+        return 'Invalid jobs: a non-empty JSON list is expected.', 400
+
+    batch_size = int(os.environ.get('JOBS_BATCH_SIZE', JOBS_BATCH_SIZE))
+    if len(jobs) > batch_size:
+        return 'Too many jobs: at most {} per batch.'.format(batch_size), 413
+
+    # Validates all the jobs before creating any queue, reporting all the invalid ones.
+    job_names = []
+    jobs_tasks = []
+    errors = []
+    with metrics.JOB_STAGE_SECONDS.time('parse'):
+        for index, job in enumerate(jobs):
+            try:
+                job = parse_job_spec(job)
+                if job['name'] in job_names:
+                    raise ValueError('duplicate job name {!r}'.format(job['name']))
+                jobs_tasks.append(get_job_tasks(job))
+                job_names.append(job['name'])
+            except (TypeError, ValueError, SyntaxError) as e:
+                errors.append({'index': index, 'error': 'Invalid job: {}.'.format(e)})
+    if errors:
+        return flask.jsonify({'errors': errors}), 400
+
+    confirmations = publish_jobs_tasks(get_amqp_manager(), jobs_tasks)
+
+    return flask.jsonify([
+        {
+            'name': job_name,
+            'queues': {
+                queue_name: confirmations[queue_name]._asdict()
+                for queue_name, _, _ in job_tasks
+            },
+        }
+        for job_name, job_tasks in zip(job_names, jobs_tasks)
+    ])
+
+
+def submit_job():
+    """
+    Parses and publishes the job of the request, as described in post_job.
 
-    name = flask.request.form.get('name')
+    :return: the response
+    :rtype: object
+    """
+    try:
+        with metrics.JOB_STAGE_SECONDS.time('parse'):
+            if flask.request.is_json:
+                job = parse_job_spec(flask.request.get_json(silent=True))
+            else:
+                job = parse_job(flask.request.form)
+            job_tasks = get_job_tasks(job)
+    except (TypeError, ValueError, SyntaxError) as e:
+        return 'Invalid job: {}.'.format(e), 400
+
+    if flask.request.args.get('async', '').lower() == 'true':
+        publisher = get_job_publisher()
+        if isinstance(publisher, job_publisher.AsyncJobPublisher):
+            publish = lambda amqp_manager, status: publish_job_tasks_async(amqp_manager, job_tasks, status)
+        else:
+            publish = lambda status: publish_job_in_background(job_tasks, status)
+
+        try:
+            job_status = publisher.submit(
+                job['name'],
+                {queue_name: tasks_number for queue_name, _, tasks_number in job_tasks},
+                publish,
+            )
+        except queue.Full as e:
+            return 'Job not submitted: {}.'.format(e), 503
+        location = flask.url_for('get_job_status', job_id=job_status.job_id)
+        return flask.jsonify(job_status.to_dict()), 202, {'Location': location}
+
+    if is_atomic_requested():
+        try:
+            publish_job_tasks_atomically(get_amqp_manager(), job_tasks)
+        except (pika.exceptions.AMQPError, OSError) as e:
+            return 'Job not created, its tasks were rolled back: {!r}.'.format(e), 503
+        return 'Job created correctly.'
+
+    # Writes the tasks to the spool, published in background even if the broker is unavailable.
+    spool = get_task_spool()
+    if spool is not None:
+        if not spool.is_draining:
+            return 'Job not spooled: the spool is not publishing its tasks.', 503
+        try:
+            with metrics.JOB_STAGE_SECONDS.time('spool'):
+                spool.append(
+                    (queue_name, body)
+                    for queue_name, tasks, _ in job_tasks
+                    for body in tasks.serialize()
+                )
+        except OSError as e:
+            return 'Job not spooled: {!r}.'.format(e), 503
+        return 'Job spooled correctly.', 202
+
+    publish_job_tasks(get_amqp_manager(), job_tasks)
 
-    dataset_name = flask.request.form.get('dataset_name')
-    training_rate = float(flask.request.form.get('training_rate'))
-    fusion_rate = float(flask.request.form.get('fusion_rate'))
-    sample_rate = float(flask.request.form.get('sample_rate'))
-    class_attribute = flask.request.form.get('class_attribute')
-    class_attribute_type = flask.request.form.get('class_attribute_type')
-    true_class_value = flask.request.form.get('true_class_value')
-    include_attributes = flask.request.form.getlist('include_attributes')
-    exclude_attributes = flask.request.form.getlist('exclude_attributes')
-    attributes_rate = float(flask.request.form.get('attributes_rate'))
-    random_seed = int(flask.request.form.get('random_seed'))
-    include_header = ast.literal_eval(flask.request.form.get('include_header'))
+    return 'Job created correctly.'
 
-    duration = int(flask.request.form.get('duration'))
-    threshold = float(flask.request.form.get('threshold'))
 
-    learners_number = int(flask.request.form.get('learners_number'))
-    learn_parameters = json.loads(flask.request.form.get('learn_parameters'))
+@app.route('/job/<job_id>/status', methods=['GET'])
+def get_job_status(job_id):
+    """
+    Gets the publishing status of a job submitted in background.
+    GET: /job/<job_id>/status
 
-    predict_parameters = json.loads(flask.request.form.get('predict_parameters'))
+    :param job_id: the identifier of the submission
+    :type job_id: str
+    """
+    job_status = get_job_publisher().get_status(job_id)
+    if job_status is None:
+        return 'Job not found.', 404
+    return flask.jsonify(job_status.to_dict())
+
+
+@app.route('/job/<job_name>/queues', methods=['GET'])
+def get_job_queues(job_name):
+    """
+    Gets the statistics of the queues of a job, cached for a short time.
+    GET: /job/<job_name>/queues
+
+    :param job_name: the name of the job
+    :type job_name: str
+    """
+    queue_names = [
+        queue_name.format(job_name_=job_name)
+        for queue_name in (LEARNER_TASKS_QUEUE_NAME, FILTER_TASKS_QUEUE_NAME, FUSER_TASKS_QUEUE_NAME)
+    ]
+    return flask.jsonify(get_queues_statistics_cache().get(queue_names))
+
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """
+    Gets the metrics of the scheduler in the Prometheus text format.
+    GET: /metrics
+    """
+    return metrics.REGISTRY.render(), 200, {'Content-Type': metrics.CONTENT_TYPE}
 
+
+@app.route('/admin/spool', methods=['GET'])
+def get_spool_status():
+    """
+    Gets the status of the spool, with 503 if its drainer is not running.
+    GET: /admin/spool
+    """
+    if not is_admin_authorized():
+        return 'Unauthorized.', 401
+
+    spool = get_task_spool()
+    if spool is None:
+        return 'Spool not enabled.', 404
+    status = spool.get_status()
+    return flask.jsonify(status), 200 if status['draining'] else 503
+
+
+@app.route('/admin/profiles', methods=['GET'])
+def get_profiles():
+    """
+    Lists the most recent profiles of the job submissions.
+    GET: /admin/profiles
+    """
+    if not is_admin_authorized():
+        return 'Unauthorized.', 401
+    return flask.jsonify(get_profile_store().list())
+
+
+@app.route('/admin/profiles/<profile_id>', methods=['GET'])
+def get_profile(profile_id):
+    """
+    Gets the profile of a job submission.
+    GET: /admin/profiles/<profile_id>
+
+    :param profile_id: the identifier of the profile
+    :type profile_id: str
+
+    :param args['format']: 'pstats' for the binary format of cProfile, loadable by pstats or snakeviz (default),
+     'text' for the most expensive functions
+    :type args['format']: str
+
+    :param args['sort']: the sort key of the text format, e.g. 'cumulative' (default) or 'tottime'
+    :type args['sort']: str
+    """
+    if not is_admin_authorized():
+        return 'Unauthorized.', 401
+
+    session = get_profile_store().get(profile_id)
+    if session is None:
+        return 'Profile not found.', 404
+
+    stats = session.get_stats()
+    profile_format = flask.request.args.get('format', 'pstats')
+    if profile_format == 'text':
+        try:
+            text = profiling.print_stats(stats, flask.request.args.get('sort', 'cumulative'))
+        except KeyError as e:
+            return 'Invalid sort key: {}.'.format(e), 400
+        return text, 200, {'Content-Type': 'text/plain; charset=utf-8'}
+    if profile_format != 'pstats':
+        return 'Invalid format: {}.'.format(profile_format), 400
+
+    return profiling.dump_stats(stats), 200, {
+        'Content-Type': 'application/octet-stream',
+        'Content-Disposition': 'attachment; filename={}.prof'.format(profile_id),
+    }
+
+
+def parse_job(form):
+    """
+    Parses the fields of a job.
+
+    :param form: the form of the request, with the fields described in post_job
+    :type form: werkzeug.datastructures.MultiDict
+
+    :return: the job in the form {field: value}
+    :rtype: dict[str, object]
+    """
+    return {
+        'name': form.get('name'),
+        'dataset_name': form.get('dataset_name'),
+        'training_rate': float(form.get('training_rate')),
+        'fusion_rate': float(form.get('fusion_rate')),
+        'sample_rate': float(form.get('sample_rate')),
+        'class_attribute': form.get('class_attribute'),
+        'class_attribute_type': form.get('class_attribute_type'),
+        'true_class_value': form.get('true_class_value'),
+        'include_attributes': form.getlist('include_attributes'),
+        'exclude_attributes': form.getlist('exclude_attributes'),
+        'attributes_rate': float(form.get('attributes_rate')),
+        'random_seed': int(form.get('random_seed')),
+        'include_header': ast.literal_eval(form.get('include_header')),
+        'duration': int(form.get('duration')),
+        'threshold': float(form.get('threshold')),
+        'learners_number': int(form.get('learners_number')),
+        'learn_parameters': json.loads(form.get('learn_parameters')),
+        'predict_parameters': json.loads(form.get('predict_parameters')),
+    }
+
+
+def parse_job_spec(spec):
+    """
+    Parses the fields of a job given as JSON values, e.g. in a JSON body or in a batch.
+    The job is validated against the schema compiled at startup, before any queue is created.
+
+    :param spec: the job, with the fields described in post_job
+    :type spec: dict[str, object]
+
+    :return: the job in the form {field: value}
+    :rtype: dict[str, object]
+
+    :raises ValueError: if the job does not match the schema
+    """
+    job_schema.validate_job(spec)
+
+    return {
+        'name': spec['name'],
+        'dataset_name': spec['dataset_name'],
+        'training_rate': float(spec['training_rate']),
+        'fusion_rate': float(spec['fusion_rate']),
+        'sample_rate': float(spec['sample_rate']),
+        'class_attribute': spec['class_attribute'],
+        'class_attribute_type': spec['class_attribute_type'],
+        'true_class_value': str(spec['true_class_value']),
+        'include_attributes': spec.get('include_attributes', []),
+        'exclude_attributes': spec.get('exclude_attributes', []),
+        'attributes_rate': float(spec['attributes_rate']),
+        'random_seed': spec['random_seed'],
+        'include_header': spec['include_header'],
+        'duration': spec['duration'],
+        'threshold': float(spec['threshold']),
+        'learners_number': spec['learners_number'],
+        'learn_parameters': spec['learn_parameters'],
+        'predict_parameters': spec['predict_parameters'],
+    }
+
+
+def get_job_tasks(job):
+    """
+    Creates the tasks generators of a job.
+
+    :param job: the job in the form {field: value}
+    :type job: dict[str, object]
+
+    :return: the list of the queue name, the tasks generator and the number of tasks, for each queue
+    :rtype: list[(str, scheduler.tasks_generators.tasks_generator.TasksGenerator, int)]
+    """
     # Retrieves the queues names.
-    learner_tasks_queue_name = LEARNER_TASKS_QUEUE_NAME.format(job_name_=name)
-    filter_tasks_queue_name = FILTER_TASKS_QUEUE_NAME.format(job_name_=name)
-    fuser_tasks_queue_name = FUSER_TASKS_QUEUE_NAME.format(job_name_=name)
+    learner_tasks_queue_name = LEARNER_TASKS_QUEUE_NAME.format(job_name_=job['name'])
+    filter_tasks_queue_name = FILTER_TASKS_QUEUE_NAME.format(job_name_=job['name'])
+    fuser_tasks_queue_name = FUSER_TASKS_QUEUE_NAME.format(job_name_=job['name'])
+
+    # Generates the learner tasks.
+    learner_tasks = get_tasks(LearnerTasksGenerator, job['name'], dict(
+        tasks_number=job['learners_number'],
+        dataset_name=job['dataset_name'],
+        training_rate=job['training_rate'],
+        fusion_rate=job['fusion_rate'],
+        sample_rate=job['sample_rate'],
+        class_attribute=job['class_attribute'],
+        class_attribute_type=job['class_attribute_type'],
+        true_class_value=job['true_class_value'],
+        include_attributes=job['include_attributes'],
+        exclude_attributes=job['exclude_attributes'],
+        attributes_rate=job['attributes_rate'],
+        random_seed=job['random_seed'],
+        include_header=job['include_header'],
+        duration=job['duration'],
+        learn_parameters=job['learn_parameters'],
+    ))
+
+    # Generates the filter task.
+    filter_tasks = get_tasks(FilterTasksGenerator, job['name'], dict(
+        learner_outputs_number=job['learners_number'],
+        dataset_name=job['dataset_name'],
+        training_rate=job['training_rate'],
+        fusion_rate=job['fusion_rate'],
+        class_attribute=job['class_attribute'],
+        class_attribute_type=job['class_attribute_type'],
+        true_class_value=job['true_class_value'],
+        include_attributes=job['include_attributes'],
+        exclude_attributes=job['exclude_attributes'],
+        attributes_rate=job['attributes_rate'],
+        random_seed=job['random_seed'],
+        include_header=job['include_header'],
+        threshold=job['threshold'],
+        predict_parameters=job['predict_parameters'],
+    ))
+
+    # Generates the fuser task.
+    fuser_tasks = get_tasks(FuserTasksGenerator, job['name'], dict(
+        dataset_name=job['dataset_name'],
+        training_rate=job['training_rate'],
+        fusion_rate=job['fusion_rate'],
+        class_attribute=job['class_attribute'],
+        class_attribute_type=job['class_attribute_type'],
+        true_class_value=job['true_class_value'],
+        include_attributes=job['include_attributes'],
+        exclude_attributes=job['exclude_attributes'],
+        attributes_rate=job['attributes_rate'],
+        random_seed=job['random_seed'],
+        include_header=job['include_header'],
+        predict_parameters=job['predict_parameters'],
+    ))
+
+    return [
+        (learner_tasks_queue_name, learner_tasks, job['learners_number']),
+        (filter_tasks_queue_name, filter_tasks, 1),
+        (fuser_tasks_queue_name, fuser_tasks, 1),
+    ]
+
+
+def get_tasks(generator_type, job_name, inputs):
+    """
+    Creates the tasks generator of a job, through the cache of the serialized tasks if enabled.
+
+    :param generator_type: the type of the tasks generator
+    :type generator_type: type
+
+    :param job_name: the name of the job
+    :type job_name: str
+
+    :param inputs: the arguments of the generator except the job name
+    :type inputs: dict[str, object]
+
+    :return: the tasks
+    :rtype: scheduler.tasks_generators.tasks_generator.TasksGenerator | scheduler.tasks_cache.CachedTasks
+    """
+    cache = get_tasks_cache()
+    if cache is None:
+        return generator_type(job_name=job_name, **inputs)
+    return cache.get_tasks(generator_type, job_name, inputs)
+
+
+def publish_job_tasks(amqp_manager, job_tasks, job_status=None):
+    """
+    Prepares the queues of a job and publishes its tasks.
+
+    :param amqp_manager: the AMQP manager
+    :type amqp_manager: scheduler.amqp_manager.AMQPManager
 
+    :param job_tasks: the tasks of the job, as returned by get_job_tasks
+    :type job_tasks: list[(str, scheduler.tasks_generators.tasks_generator.TasksGenerator, int)]
+
+    :param job_status: the status to update with the published tasks, None otherwise
+    :type job_status: scheduler.job_publisher.JobStatus
+    """
     # Prepares the queues.
-    amqp_manager.create_queue(learner_tasks_queue_name)
-    amqp_manager.create_queue(filter_tasks_queue_name)
-    amqp_manager.create_queue(fuser_tasks_queue_name)
-
-    # Generates and publishes the learner tasks.
-    learner_tasks = LearnerTasksGenerator(
-        job_name=name,
-        tasks_number=learners_number,
-        dataset_name=dataset_name,
-        training_rate=training_rate,
-        fusion_rate=fusion_rate,
-        sample_rate=sample_rate,
-        class_attribute=class_attribute,
-        class_attribute_type=class_attribute_type,
-        true_class_value=true_class_value,
-        include_attributes=include_attributes,
-        exclude_attributes=exclude_attributes,
-        attributes_rate=attributes_rate,
-        random_seed=random_seed,
-        include_header=include_header,
-        duration=duration,
-        learn_parameters=learn_parameters,
-    )
-    amqp_manager.publish_messages(learner_tasks_queue_name, learner_tasks)
-
-    # Generates and publishes the filter task.
-    filter_tasks = FilterTasksGenerator(
-        job_name=name,
-        learner_outputs_number=learners_number,
-        dataset_name=dataset_name,
-        training_rate=training_rate,
-        fusion_rate=fusion_rate,
-        class_attribute=class_attribute,
-        class_attribute_type=class_attribute_type,
-        true_class_value=true_class_value,
-        include_attributes=include_attributes,
-        exclude_attributes=exclude_attributes,
-        attributes_rate=attributes_rate,
-        random_seed=random_seed,
-        include_header=include_header,
-        threshold=threshold,
-        predict_parameters=predict_parameters,
-    )
-    amqp_manager.publish_messages(filter_tasks_queue_name, filter_tasks)
-
-    # Generates and publishes the fuser task.
-    fuser_tasks = FuserTasksGenerator(
-        job_name=name,
-        dataset_name=dataset_name,
-        training_rate=training_rate,
-        fusion_rate=fusion_rate,
-        class_attribute=class_attribute,
-        class_attribute_type=class_attribute_type,
-        true_class_value=true_class_value,
-        include_attributes=include_attributes,
-        exclude_attributes=exclude_attributes,
-        attributes_rate=attributes_rate,
-        random_seed=random_seed,
-        include_header=include_header,
-        predict_parameters=predict_parameters,
-    )
-    amqp_manager.publish_messages(fuser_tasks_queue_name, fuser_tasks)
+    with metrics.JOB_STAGE_SECONDS.time('declare'):
+        amqp_manager.create_queues([queue_name for queue_name, _, _ in job_tasks])
+
+    # Publishes the tasks, serialized once per job if sent as JSON.
+    # The tasks are generated and serialized while streamed, see the serialize and publish metrics of the manager.
+    # With a status, the tasks are counted once confirmed by the broker.
+    serialize = get_message_codec().content_type == message_codecs.JSON_CONTENT_TYPE
+    with metrics.JOB_STAGE_SECONDS.time('publish'):
+        for queue_name, tasks, _ in job_tasks:
+            messages = tasks.serialize() if serialize else tasks
+            if job_status is None:
+                amqp_manager.stream_messages(queue_name, messages)
+            else:
+                amqp_manager.stream_messages(
+                    queue_name,
+                    messages,
+                    confirm=True,
+                    on_confirmed=functools.partial(count_published, job_status, queue_name),
+                )
+
+
+def publish_job_tasks_atomically(amqp_manager, job_tasks):
+    """
+    Prepares the queues of a job and publishes all its tasks or none.
+    The tasks are published in a transaction, so the workers see no task until all of them are committed.
+    On failure the queues created for the job are purged and deleted, leaving no partial job to consume,
+    while the queues existing before, e.g. of an earlier submission of the job, are left untouched.
 
-    return 'Job created correctly.'
+    :param amqp_manager: the AMQP manager
+    :type amqp_manager: scheduler.amqp_manager.AMQPManager
+
+    :param job_tasks: the tasks of the job, as returned by get_job_tasks
+    :type job_tasks: list[(str, scheduler.tasks_generators.tasks_generator.TasksGenerator, int)]
+
+    :raises pika.exceptions.AMQPError: if the tasks are not published
+    """
+    queue_names = [queue_name for queue_name, _, _ in job_tasks]
+    serialize = get_message_codec().content_type == message_codecs.JSON_CONTENT_TYPE
+
+    # The uncommitted tasks are discarded by the broker, so only the queues missing before are rolled back.
+    with metrics.JOB_STAGE_SECONDS.time('declare'):
+        statistics = amqp_manager.queues_statistics(queue_names)
+    created_queue_names = [queue_name for queue_name in queue_names if statistics.get(queue_name) is None]
+    try:
+        with metrics.JOB_STAGE_SECONDS.time('declare'):
+            amqp_manager.create_queues(queue_names)
+
+        with metrics.JOB_STAGE_SECONDS.time('publish'):
+            amqp_manager.publish_transaction([
+                (queue_name, tasks.serialize() if serialize else tasks)
+                for queue_name, tasks, _ in job_tasks
+            ])
+    except BaseException:
+        with metrics.JOB_STAGE_SECONDS.time('rollback'):
+            rollback_job_queues(amqp_manager, created_queue_names)
+        raise
+
+
+def rollback_job_queues(amqp_manager, queue_names):
+    """
+    Purges and deletes the queues created for a job not published, as far as the broker is reachable.
+
+    :param amqp_manager: the AMQP manager
+    :type amqp_manager: scheduler.amqp_manager.AMQPManager
+
+    :param queue_names: the queue names
+    :type queue_names: list[str]
+    """
+    for queue_name in queue_names:
+        try:
+            amqp_manager.purge_queue(queue_name)
+            amqp_manager.delete_queue(queue_name)
+        except (pika.exceptions.AMQPError, OSError):
+            pass
+
+
+def publish_jobs_tasks(amqp_manager, jobs_tasks):
+    """
+    Prepares the queues of many jobs together and publishes their tasks, waiting for the confirmation of the broker.
+
+    :param amqp_manager: the AMQP manager
+    :type amqp_manager: scheduler.amqp_manager.AMQPManager
+
+    :param jobs_tasks: the tasks of each job, as returned by get_job_tasks
+    :type jobs_tasks: list[list[(str, scheduler.tasks_generators.tasks_generator.TasksGenerator, int)]]
+
+    :return: the confirmation of each queue
+    :rtype: dict[str, scheduler.amqp_manager.PublishConfirmation]
+    """
+    # Prepares the queues of all the jobs, with a single round trip to the broker.
+    with metrics.JOB_STAGE_SECONDS.time('declare'):
+        amqp_manager.create_queues([queue_name for job_tasks in jobs_tasks for queue_name, _, _ in job_tasks])
+
+    # Publishes the tasks on the confirm channel of the manager, shared by all the jobs.
+    serialize = get_message_codec().content_type == message_codecs.JSON_CONTENT_TYPE
+    confirmations = {}
+    with metrics.JOB_STAGE_SECONDS.time('publish'):
+        for job_tasks in jobs_tasks:
+            for queue_name, tasks, _ in job_tasks:
+                messages = tasks.serialize() if serialize else tasks
+                confirmations[queue_name] = amqp_manager.stream_messages(queue_name, messages, confirm=True)
+    return confirmations
+
+
+def publish_job_in_background(job_tasks, job_status):
+    """
+    Publishes the tasks of a job outside of the request, with a manager of the pool.
+
+    :param job_tasks: the tasks of the job, as returned by get_job_tasks
+    :type job_tasks: list[(str, scheduler.tasks_generators.tasks_generator.TasksGenerator, int)]
+
+    :param job_status: the status to update with the published tasks
+    :type job_status: scheduler.job_publisher.JobStatus
+    """
+    amqp_manager = get_amqp_manager_pool().acquire()
+    try:
+        publish_job_tasks(amqp_manager, job_tasks, job_status)
+    finally:
+        get_amqp_manager_pool().release(amqp_manager)
+
+
+async def publish_job_tasks_async(amqp_manager, job_tasks, job_status=None):
+    """
+    Prepares the queues of a job and publishes its tasks on asyncio, interleaved with the other jobs.
+
+    :param amqp_manager: the AMQP manager
+    :type amqp_manager: scheduler.async_amqp_manager.AsyncAMQPManager
+
+    :param job_tasks: the tasks of the job, as returned by get_job_tasks
+    :type job_tasks: list[(str, scheduler.tasks_generators.tasks_generator.TasksGenerator, int)]
+
+    :param job_status: the status to update with the published tasks, None otherwise
+    :type job_status: scheduler.job_publisher.JobStatus
+    """
+    # Prepares the queues.
+    with metrics.JOB_STAGE_SECONDS.time('declare'):
+        await amqp_manager.create_queues([queue_name for queue_name, _, _ in job_tasks])
+
+    # Publishes the tasks, serialized once per job if sent as JSON.
+    # With a status, the tasks are published in chunks, counted once confirmed by the broker.
+    serialize = get_message_codec().content_type == message_codecs.JSON_CONTENT_TYPE
+    with metrics.JOB_STAGE_SECONDS.time('publish'):
+        for queue_name, tasks, _ in job_tasks:
+            messages = tasks.serialize() if serialize else tasks
+            if job_status is None:
+                await amqp_manager.publish_messages(queue_name, messages)
+                continue
+            messages = iter(messages)
+            while True:
+                chunk = list(itertools.islice(messages, JOB_STATUS_CHUNK_SIZE))
+                if not chunk:
+                    break
+                confirmation = await amqp_manager.publish_messages(queue_name, chunk, confirm=True)
+                count_published(job_status, queue_name, confirmation)
+
+
+def count_published(job_status, queue_name, confirmation):
+    """
+    Counts the tasks of a queue confirmed by the broker in the status of their job.
+
+    :param job_status: the status of the job
+    :type job_status: scheduler.job_publisher.JobStatus
+
+    :param queue_name: the queue name
+    :type queue_name: str
+
+    :param confirmation: the confirmation of the tasks published
+    :type confirmation: scheduler.amqp_manager.PublishConfirmation
+    """
+    job_status.add_published(queue_name, confirmation.acknowledged)
 
 
 if __name__ == '__main__':
+    # Resumes publishing the tasks spooled before a restart.
+    get_task_spool()
     app.run(host='0.0.0.0', debug=False)
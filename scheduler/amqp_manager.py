@@ -1,30 +1,99 @@
-import json
+import collections
+import contextvars
+import functools
+import queue
+import threading
+import time
 
 import pika
 
+from scheduler import channel_pool
+from scheduler import metrics
+from scheduler import profiling
+from scheduler.message_codecs import MessageCodec
+
+
+PUBLISH_WINDOW_SIZE = 1000
+CONFIRM_TIMEOUT = 60
+CONFIRM_POLL_INTERVAL = 0.001
+
+STREAM_CHUNK_SIZE = 500
+STREAM_BUFFER_SIZE = 4
+BLOCKED_CONNECTION_TIMEOUT = 300
+BLOCKED_POLL_INTERVAL = 0.1
+
+DECLARE_TIMEOUT = 60
+DECLARE_POLL_INTERVAL = 0.001
+
+CONSUME_PREFETCH_COUNT = 100
+CONSUME_POLL_INTERVAL = 0.1
+
+
+PublishConfirmation = collections.namedtuple(
+    'PublishConfirmation',
+    ['published', 'acknowledged', 'rejected'],
+)
+PublishConfirmation.__doc__ = """
+Defines the broker confirmation of a batch of published messages.
+The messages neither acknowledged nor rejected were not confirmed before the timeout.
+"""
+
 
 class AMQPManager(object):
     """
     Implements a manager for the AMQP protocol.
     """
 
-    def __init__(self, hostname):
+    def __init__(self, hostname, codec=None, channels_number=channel_pool.CHANNELS_NUMBER, transport=None):
         """
         Initializes a manager connecting to the AMQP message broker.
 
         :param hostname: the hostname of the message broker
         :type hostname: str
+
+        :param codec: the codec of the published messages, JSON if None
+        :type codec: scheduler.message_codecs.MessageCodec
+
+        :param channels_number: the maximum number of channels kept open
+        :type channels_number: int
+
+        :param transport: the function opening a connection with the API of pika.BlockingConnection
+         to the message broker at the hostname, connect() if None
+        :type transport: (str) -> pika.BlockingConnection
         """
-        self.__connection = pika.BlockingConnection(
-            pika.ConnectionParameters(host=hostname),
+        self.__codec = codec or MessageCodec()
+        self.__connection = (transport or connect)(hostname)
+        self.__channels = channel_pool.ChannelPool(
+            open_channel=self.__open_channel,
+            size=channels_number,
+            is_busy=self.__is_channel_busy,
+            on_discard=self.__on_channel_discarded,
         )
-        self.__channels = {}
+        self.__unsettled_delivery_tags = {}
+
+        # The broker blocks the publishers when running low on memory or disk.
+        self.__blocked = False
+        self.__connection.add_on_connection_blocked_callback(self.__on_connection_blocked)
+        self.__connection.add_on_connection_unblocked_callback(self.__on_connection_unblocked)
 
     def close(self):
-        for _, channel in self.__channels.items():
-            channel.close()
+        self.__channels.close()
         self.__connection.close()
 
+    def is_open(self):
+        """
+        Checks if the connection is still open, processing the pending events such as the heartbeats.
+
+        :return: True if open, False otherwise
+        :rtype: bool
+        """
+        try:
+            self.__connection.process_data_events(time_limit=0)
+        except pika.exceptions.AMQPError:
+            return False
+        return self.__connection.is_open
+
+    @metrics.AMQP_OPERATION_SECONDS.timed('create_queue')
     def create_queue(
             self,
             queue_name,
@@ -35,13 +104,48 @@ class AMQPManager(object):
         :param queue_name: the queue name
         :type queue_name: str
         """
-        channel = self.__get_channel(queue_name)
+        channel = self.__channels.get(channel_pool.ADMIN_ROLE)
 
         channel.queue_declare(
             queue=queue_name,
             durable=True,
         )
 
+    @metrics.AMQP_OPERATION_SECONDS.timed('create_queues')
+    def create_queues(
+            self,
+            queue_names,
+    ):
+        """
+        Creates the queues, sending all the declarations before waiting for the replies of the broker.
+        The queues are always declared, since another manager may have deleted them.
+
+        :param queue_names: the queue names
+        :type queue_names: list[str]
+
+        :raises TimeoutError: if the broker does not reply in time
+        """
+        queue_names = list(dict.fromkeys(queue_names))
+        if not queue_names:
+            return
+
+        channel = self.__channels.get(channel_pool.ADMIN_ROLE)
+
+        declared_queue_names = []
+        self.__declare_queues(
+            channel,
+            queue_names,
+            lambda method_frame: declared_queue_names.append(method_frame.method.queue),
+            durable=True,
+        )
+
+        # Declares the remaining queues one by one, raising the error of the broker.
+        declared_queue_names = set(declared_queue_names)
+        for queue_name in queue_names:
+            if queue_name not in declared_queue_names:
+                self.create_queue(queue_name)
+
+    @metrics.AMQP_OPERATION_SECONDS.timed('queue_exists')
     def queue_exists(
             self,
             queue_name,
@@ -55,17 +159,13 @@ class AMQPManager(object):
         :return: True if exists, False otherwise
         :rtype: bool
         """
-        channel = self.__get_channel(queue_name)
-
         try:
-            channel.queue_declare(
-                queue=queue_name,
-                passive=True,
-            )
+            self.__declare_passive(queue_name)
             return True
         except Exception:
             return False
 
+    @metrics.AMQP_OPERATION_SECONDS.timed('queue_size')
     def queue_size(
             self,
             queue_name,
@@ -78,15 +178,62 @@ class AMQPManager(object):
 
         :return: the number of messages in the queue
         :rtype: int
-        """
-        channel = self.__get_channel(queue_name)
 
-        method_frame = channel.queue_declare(
-            queue=queue_name,
-            passive=True,
-        )
+        :raises pika.exceptions.ChannelClosedByBroker: if the queue does not exist
+        """
+        method_frame = self.__declare_passive(queue_name)
         return method_frame.method.message_count
 
+    @metrics.AMQP_OPERATION_SECONDS.timed('queues_statistics')
+    def queues_statistics(
+            self,
+            queue_names,
+    ):
+        """
+        Retrieves the statistics of the queues, sending all the requests before waiting for the replies of the broker.
+
+        :param queue_names: the queue names
+        :type queue_names: list[str]
+
+        :return: the statistics in the form {queue_name: {'messages_number': int, 'consumers_number': int}},
+         None for the queues not existing
+        :rtype: dict[str, dict[str, int]]
+
+        :raises TimeoutError: if the broker does not reply in time
+        """
+        statistics = {}
+        queue_names = list(dict.fromkeys(queue_names))
+        if not queue_names:
+            return statistics
+
+        def on_declare_ok(method_frame):
+            statistics[method_frame.method.queue] = {
+                'messages_number': method_frame.method.message_count,
+                'consumers_number': method_frame.method.consumer_count,
+            }
+
+        # The declarations are sent on a channel of their own, closed by the broker at the first missing queue.
+        channel = self.__connection.channel()
+        try:
+            self.__declare_queues(channel, queue_names, on_declare_ok, passive=True)
+        finally:
+            if channel.is_open:
+                channel.close()
+
+        # The remaining queues are checked one by one.
+        for queue_name in queue_names:
+            if queue_name in statistics:
+                continue
+            try:
+                method_frame = self.__declare_passive(queue_name)
+            except pika.exceptions.ChannelClosedByBroker:
+                statistics[queue_name] = None
+            else:
+                on_declare_ok(method_frame)
+
+        return statistics
+
+    @metrics.AMQP_OPERATION_SECONDS.timed('delete_queue')
     def delete_queue(
          self,
          queue_name,
@@ -97,46 +244,206 @@ class AMQPManager(object):
         :param queue_name: the queue name
         :type queue_name: str
         """
-        channel = self.__get_channel(queue_name)
+        channel = self.__channels.get(channel_pool.ADMIN_ROLE)
 
         channel.queue_delete(
             queue=queue_name,
         )
 
+    @metrics.AMQP_OPERATION_SECONDS.timed('purge_queue')
+    def purge_queue(
+            self,
+            queue_name,
+    ):
+        """
+        Removes all the messages ready in a queue.
+
+        :param queue_name: the queue name
+        :type queue_name: str
+
+        :return: the number of messages removed
+        :rtype: int
+        """
+        channel = self.__channels.get(channel_pool.ADMIN_ROLE)
+
+        method_frame = channel.queue_purge(
+            queue=queue_name,
+        )
+        return method_frame.method.message_count
+
+    @metrics.AMQP_OPERATION_SECONDS.timed('publish_messages')
     def publish_messages(
             self,
             queue_name,
             messages,
+            confirm=False,
+            window_size=PUBLISH_WINDOW_SIZE,
     ):
         """
         Publishes a message on the queue.
+        The messages are encoded by the codec, the ones already serialized as JSON bytes are only compressed.
+        In the confirm mode the messages are published on a channel with publisher confirms,
+        keeping at most window_size messages waiting for the confirmation of the broker.
 
         :param queue_name: the name of the queue
         :type queue_name: str
 
         :param messages: the list of the messages to publish
-        :type messages: list[object]
-        """
-        channel = self.__get_channel(queue_name)
-
-        for message in messages:
-            channel.basic_publish(
-                exchange='',
-                routing_key=queue_name,
-                body=json.dumps(message),
-                properties=pika.BasicProperties(
-                    content_type='application/json',
-                    delivery_mode=2  # Persistent message,
-                ),
-            )
+        :type messages: list[object | bytes]
+
+        :param confirm: if True, it waits for the broker to confirm the messages
+        :type confirm: bool
+
+        :param window_size: the maximum number of messages waiting for the confirmation
+        :type window_size: int
+
+        :return: the confirmation of the messages in the confirm mode, None otherwise
+        :rtype: PublishConfirmation
+
+        :raises ValueError: if the window size is less than 1
+        :raises TimeoutError: if the broker does not confirm the messages in time
+        """
+        check_window_size(window_size)
+
+        return self.__publish_bodies(queue_name, map(self.__encode, messages), confirm, window_size)
+
+    @metrics.AMQP_OPERATION_SECONDS.timed('stream_messages')
+    def stream_messages(
+            self,
+            queue_name,
+            messages,
+            confirm=False,
+            chunk_size=STREAM_CHUNK_SIZE,
+            buffer_size=STREAM_BUFFER_SIZE,
+            on_confirmed=None,
+    ):
+        """
+        Publishes a stream of messages on the queue, with a bounded memory.
+        The messages are pulled and encoded in chunks by a background thread,
+        keeping at most buffer_size chunks waiting to be published,
+        while the publishing is suspended as long as the broker blocks the connection.
+
+        :param queue_name: the name of the queue
+        :type queue_name: str
+
+        :param messages: the messages to publish
+        :type messages: collections.abc.Iterable[object | bytes]
+
+        :param confirm: if True, it waits for the broker to confirm the messages of each chunk
+        :type confirm: bool
+
+        :param chunk_size: the number of messages in a chunk
+        :type chunk_size: int
+
+        :param buffer_size: the maximum number of chunks waiting to be published
+        :type buffer_size: int
 
+        :param on_confirmed: the function called with the confirmation of each chunk in the confirm mode, None otherwise
+        :type on_confirmed: (PublishConfirmation) -> None
+
+        :return: the confirmation of the messages in the confirm mode, None otherwise
+        :rtype: PublishConfirmation
+
+        :raises pika.exceptions.ConnectionBlockedTimeout: if the connection stays blocked too long
+        :raises TimeoutError: if the broker does not confirm the messages in time
+        """
+        chunks = queue.Queue(maxsize=buffer_size)
+        stopped = threading.Event()
+        serializer = threading.Thread(
+            target=contextvars.copy_context().run,
+            args=(profiling.call, self.__serialize_chunks, messages, chunk_size, chunks, stopped),
+            daemon=True,
+        )
+        serializer.start()
+
+        confirmation = PublishConfirmation(published=0, acknowledged=0, rejected=0)
+        try:
+            while True:
+                chunk = chunks.get()
+                if chunk is None:
+                    break
+                if isinstance(chunk, Exception):
+                    raise chunk
+
+                self.__wait_unblocked()
+                chunk_confirmation = self.__publish_bodies(queue_name, chunk, confirm, PUBLISH_WINDOW_SIZE)
+                if confirm:
+                    confirmation = PublishConfirmation(*map(sum, zip(confirmation, chunk_confirmation)))
+                    if on_confirmed is not None:
+                        on_confirmed(chunk_confirmation)
+        finally:
+            stopped.set()
+            serializer.join()
+
+        return confirmation if confirm else None
+
+    @metrics.AMQP_OPERATION_SECONDS.timed('publish_transaction')
+    def publish_transaction(
+            self,
+            queues_messages,
+    ):
+        """
+        Publishes the messages of many queues in a transaction:
+        the broker enqueues all of them when committed, or none if the transaction fails.
+        The messages are encoded as in publish_messages.
+
+        :param queues_messages: the messages of each queue, in the form (queue_name, messages)
+        :type queues_messages: collections.abc.Iterable[(str, collections.abc.Iterable[object | bytes])]
+
+        :return: the number of messages committed on each queue
+        :rtype: dict[str, int]
+
+        :raises pika.exceptions.ConnectionBlockedTimeout: if the connection stays blocked too long
+        """
+        channel = self.__channels.get(channel_pool.TRANSACTION_ROLE)
+
+        published_numbers = {}
+        try:
+            self.__wait_unblocked()
+            for queue_name, messages in queues_messages:
+                start_time = time.perf_counter()
+                published = 0
+                published_bytes = 0
+                try:
+                    for body, properties in map(self.__encode, messages):
+                        channel.basic_publish(
+                            exchange='',
+                            routing_key=queue_name,
+                            body=body,
+                            properties=properties,
+                        )
+                        published += 1
+                        published_bytes += len(body)
+                finally:
+                    self.__observe_published(queue_name, published, published_bytes, start_time)
+                published_numbers[queue_name] = published_numbers.get(queue_name, 0) + published
+
+            channel.tx_commit()
+        except BaseException:
+            # Discards the messages published so far, unless the channel is lost with them.
+            if channel.is_open:
+                try:
+                    channel.tx_rollback()
+                except pika.exceptions.AMQPError:
+                    pass
+            raise
+
+        return published_numbers
+
+    @metrics.AMQP_OPERATION_SECONDS.timed('consume_messages')
     def consume_messages(
             self,
             queue_name,
             messages_number,
+            timeout=None,
+            inactivity_timeout=None,
+            prefetch_count=CONSUME_PREFETCH_COUNT,
     ):
         """
         Consumes the messages from the queue.
+        The messages are consumed in rounds of at most prefetch_count messages, each with its own consumer,
+        so the broker never pushes more than prefetch_count messages at once.
+        If a timeout expires the messages consumed so far are returned.
 
         :param queue_name: the queue name
         :type queue_name: str
@@ -144,26 +451,64 @@ class AMQPManager(object):
         :param messages_number: the number of messages to consume
         :type messages_number: int
 
+        :param timeout: the maximum time to consume the messages in seconds, None to wait indefinitely
+        :type timeout: float
+
+        :param inactivity_timeout: the maximum time to wait for the next message in seconds,
+         None to wait indefinitely
+        :type inactivity_timeout: float
+
+        :param prefetch_count: the maximum number of messages delivered by the broker ahead of consumption
+        :type prefetch_count: int
+
         :return: the messages and the delivery tags
         :rtype: (list[dict], list[str])
         """
-        channel = self.__get_channel(queue_name)
-
-        channel.basic_qos(prefetch_count=messages_number)
+        channel = self.__channels.get(channel_pool.CONSUME_ROLE, queue_name)
+        unsettled_delivery_tags = self.__unsettled_delivery_tags.setdefault(queue_name, set())
 
         messages = []
         delivery_tags = []
 
-        messages_count = 0
-        for method_frame, properties, body in channel.consume(queue=queue_name):
-            delivery_tags.append(method_frame.delivery_tag)
-            messages.append(json.loads(body.decode()))
-            messages_count += 1
-            if messages_count >= messages_number:
-                break
+        deadline = None if timeout is None else time.monotonic() + timeout
+        last_delivery_time = time.monotonic()
+        timed_out = False
+        while len(messages) < messages_number and not timed_out:
+            round_messages_number = min(prefetch_count, messages_number - len(messages))
+            channel.basic_qos(prefetch_count=round_messages_number)
+
+            try:
+                for method_frame, properties, body in channel.consume(
+                        queue=queue_name,
+                        inactivity_timeout=CONSUME_POLL_INTERVAL,
+                ):
+                    now = time.monotonic()
+                    if method_frame is not None:
+                        last_delivery_time = now
+                        delivery_tags.append(method_frame.delivery_tag)
+                        unsettled_delivery_tags.add(method_frame.delivery_tag)
+                        messages.append(self.__codec.decode(
+                            body,
+                            properties.content_type,
+                            properties.content_encoding,
+                        ))
+                        round_messages_number -= 1
+                        if round_messages_number == 0:
+                            break
+
+                    if deadline is not None and now >= deadline:
+                        timed_out = True
+                    if inactivity_timeout is not None and now - last_delivery_time >= inactivity_timeout:
+                        timed_out = True
+                    if timed_out:
+                        break
+            finally:
+                # Cancels the consumer, so the messages delivered but not consumed go back to the queue.
+                channel.cancel()
 
         return messages, delivery_tags
 
+    @metrics.AMQP_OPERATION_SECONDS.timed('acknowledge_messages')
     def acknowledge_messages(
             self,
             queue_name,
@@ -171,6 +516,7 @@ class AMQPManager(object):
     ):
         """
         Acknowledges the messages.
+        The contiguous delivery tags are acknowledged at once, when no other message of the channel is pending.
 
         :param queue_name: the queue name
         :type queue_name: str
@@ -178,21 +524,595 @@ class AMQPManager(object):
         :param delivery_tags: the delivery tags for the acknowledgement
         :type delivery_tags: list[str]
         """
-        channel = self.__get_channel(queue_name)
+        channel = self.__channels.get(channel_pool.CONSUME_ROLE, queue_name)
+        unsettled_delivery_tags = self.__unsettled_delivery_tags.setdefault(queue_name, set())
 
-        for delivery_tag in delivery_tags:
-            channel.basic_ack(delivery_tag=delivery_tag)
+        for delivery_tag, multiple in collapse_delivery_tags(unsettled_delivery_tags, delivery_tags):
+            channel.basic_ack(delivery_tag=delivery_tag, multiple=multiple)
+        unsettled_delivery_tags.difference_update(delivery_tags)
 
-    def __get_channel(self, queue_name):
+    @metrics.AMQP_OPERATION_SECONDS.timed('reject_messages')
+    def reject_messages(
+            self,
+            queue_name,
+            delivery_tags,
+            requeue=True,
+    ):
         """
-        Gets the channel for the queue.
+        Rejects the messages.
 
         :param queue_name: the queue name
         :type queue_name: str
 
-        :return: the queue channel
-        :rtype: pika.synchronous_connection.BlockingChannel
+        :param delivery_tags: the delivery tags for the rejection
+        :type delivery_tags: list[str]
+
+        :param requeue: if True, the broker delivers the messages again, otherwise it discards them
+        :type requeue: bool
+        """
+        channel = self.__channels.get(channel_pool.CONSUME_ROLE, queue_name)
+        unsettled_delivery_tags = self.__unsettled_delivery_tags.setdefault(queue_name, set())
+
+        for delivery_tag, multiple in collapse_delivery_tags(unsettled_delivery_tags, delivery_tags):
+            channel.basic_nack(delivery_tag=delivery_tag, multiple=multiple, requeue=requeue)
+        unsettled_delivery_tags.difference_update(delivery_tags)
+
+    def __open_channel(self, role):
+        """
+        Opens a channel for a role.
+
+        :param role: the role of the channel
+        :type role: str
+
+        :return: the channel, tracking the publisher confirms for the confirm role,
+         in the transactional mode for the transaction role
+        :rtype: pika.adapters.blocking_connection.BlockingChannel | PublisherConfirms
+        """
+        if role == channel_pool.CONFIRM_ROLE:
+            return PublisherConfirms(self.__connection)
+
+        channel = self.__connection.channel()
+        if role == channel_pool.TRANSACTION_ROLE:
+            channel.tx_select()
+        return channel
+
+    def __is_channel_busy(self, role, name, channel):
+        """
+        Checks if a channel holds messages not settled yet, which would be requeued if the channel is closed,
+        or published messages waiting for their confirmation, which would be lost.
+
+        :param role: the role of the channel
+        :type role: str
+
+        :param name: the name of the channel
+        :type name: str
+
+        :param channel: the channel
+        :type channel: pika.adapters.blocking_connection.BlockingChannel | PublisherConfirms
+
+        :return: True if busy, False otherwise
+        :rtype: bool
+        """
+        if role == channel_pool.CONSUME_ROLE:
+            return bool(self.__unsettled_delivery_tags.get(name))
+        if role == channel_pool.CONFIRM_ROLE:
+            return channel.pending_number > 0
+        return False
+
+    def __on_channel_discarded(self, role, name):
+        """
+        Forgets the delivery tags of a consume channel closed or lost.
+
+        :param role: the role of the channel
+        :type role: str
+
+        :param name: the name of the channel
+        :type name: str
+        """
+        if role == channel_pool.CONSUME_ROLE:
+            self.__unsettled_delivery_tags.pop(name, None)
+
+    def __wait_replies(self, channel, replies, replies_number):
+        """
+        Waits for the replies of the requests sent on the underlying channel, until the channel is closed.
+        On timeout the channel is closed, so its late replies are not taken for the ones of the next requests.
+
+        :param channel: the channel
+        :type channel: pika.adapters.blocking_connection.BlockingChannel
+
+        :param replies: the replies received so far, filled by the callbacks of the requests
+        :type replies: list
+
+        :param replies_number: the number of the requests
+        :type replies_number: int
+
+        :raises TimeoutError: if the broker does not reply in time
+        """
+        deadline = time.monotonic() + DECLARE_TIMEOUT
+        while len(replies) < replies_number and channel.is_open:
+            if time.monotonic() >= deadline:
+                error = TimeoutError('{} of {} replies received before the timeout'.format(
+                    len(replies),
+                    replies_number,
+                ))
+                channel.close()
+                raise error
+            self.__connection.process_data_events(time_limit=DECLARE_POLL_INTERVAL)
+
+    def __declare_queues(self, channel, queue_names, on_declare_ok, **arguments):
+        """
+        Declares the queues on a channel, sending all the declarations before waiting for the replies of the broker.
+        The BlockingChannel waits for each reply, so the declarations are sent on its underlying asynchronous channel.
+        It is an internal of pika, so without it the declarations are sent one by one on the BlockingChannel.
+        The declarations stop at the first one failing, since the broker closes the channel.
+
+        :param channel: the channel
+        :type channel: pika.adapters.blocking_connection.BlockingChannel
+
+        :param queue_names: the queue names
+        :type queue_names: list[str]
+
+        :param on_declare_ok: the function called with the Queue.DeclareOk frame of each queue declared
+        :type on_declare_ok: (pika.frame.Method) -> None
+
+        :param arguments: the other arguments of the declarations, e.g. passive or durable
+        :type arguments: dict[str, object]
+
+        :raises TimeoutError: if the broker does not reply in time
+        """
+        underlying_channel = get_underlying_channel(channel)
+        if underlying_channel is None:
+            for queue_name in queue_names:
+                try:
+                    on_declare_ok(channel.queue_declare(queue=queue_name, **arguments))
+                except pika.exceptions.ChannelClosedByBroker:
+                    return
+            return
+
+        replies = []
+
+        def on_reply(method_frame):
+            replies.append(method_frame)
+            on_declare_ok(method_frame)
+
+        for queue_name in queue_names:
+            underlying_channel.queue_declare(queue=queue_name, callback=on_reply, **arguments)
+        self.__wait_replies(channel, replies, len(queue_names))
+
+    def __declare_passive(self, queue_name):
+        """
+        Declares a queue passively, on a channel of its own,
+        since the broker closes the channel if the queue is missing, failing the other operations in progress on it.
+
+        :param queue_name: the queue name
+        :type queue_name: str
+
+        :return: the Queue.DeclareOk frame
+        :rtype: pika.frame.Method
+
+        :raises pika.exceptions.ChannelClosedByBroker: if the queue does not exist
+        """
+        channel = self.__connection.channel()
+        try:
+            return channel.queue_declare(
+                queue=queue_name,
+                passive=True,
+            )
+        finally:
+            if channel.is_open:
+                channel.close()
+
+    def __encode(self, message):
+        """
+        Encodes a message with the codec.
+
+        :param message: the message
+        :type message: object | bytes
+
+        :return: the body and its properties
+        :rtype: (bytes, pika.BasicProperties)
+        """
+        body, content_type, content_encoding = self.__codec.encode(message)
+        return body, get_message_properties(content_type, content_encoding)
+
+    def __serialize_chunks(
+            self,
+            messages,
+            chunk_size,
+            chunks,
+            stopped,
+    ):
+        """
+        Pulls the messages and puts them encoded in chunks, until the end or the stop.
+        The end is signaled by None, an error by the exception itself.
+
+        :param messages: the messages to serialize
+        :type messages: collections.abc.Iterable[object | bytes]
+
+        :param chunk_size: the number of messages in a chunk
+        :type chunk_size: int
+
+        :param chunks: the bounded queue of the chunks
+        :type chunks: queue.Queue
+
+        :param stopped: the event set when the chunks are no longer consumed
+        :type stopped: threading.Event
+        """
+        def put(item):
+            while not stopped.is_set():
+                try:
+                    chunks.put(item, timeout=BLOCKED_POLL_INTERVAL)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        try:
+            chunk = []
+            start_time = time.perf_counter()
+            for message in messages:
+                chunk.append(self.__encode(message))
+                if len(chunk) >= chunk_size:
+                    metrics.AMQP_SERIALIZE_SECONDS.observe(time.perf_counter() - start_time)
+                    if not put(chunk):
+                        return
+                    chunk = []
+                    start_time = time.perf_counter()
+            if chunk:
+                metrics.AMQP_SERIALIZE_SECONDS.observe(time.perf_counter() - start_time)
+                if not put(chunk):
+                    return
+            put(None)
+        except Exception as e:
+            put(e)
+
+    def __wait_unblocked(self):
+        """
+        Waits for the broker to unblock the connection, processing its events.
+
+        :raises pika.exceptions.ConnectionBlockedTimeout: if the connection stays blocked too long
+        """
+        self.__connection.process_data_events(time_limit=0)
+
+        deadline = time.monotonic() + BLOCKED_CONNECTION_TIMEOUT
+        while self.__blocked:
+            if time.monotonic() >= deadline:
+                raise pika.exceptions.ConnectionBlockedTimeout()
+            self.__connection.process_data_events(time_limit=BLOCKED_POLL_INTERVAL)
+
+    def __on_connection_blocked(self, connection, method_frame):
+        self.__blocked = True
+
+    def __on_connection_unblocked(self, connection, method_frame):
+        self.__blocked = False
+
+    def __publish_bodies(
+            self,
+            queue_name,
+            encoded_messages,
+            confirm,
+            window_size,
+    ):
+        """
+        Publishes the encoded messages on the queue.
+
+        :param queue_name: the name of the queue
+        :type queue_name: str
+
+        :param encoded_messages: the bodies of the messages and their properties
+        :type encoded_messages: collections.abc.Iterable[(bytes, pika.BasicProperties)]
+
+        :param confirm: if True, it waits for the broker to confirm the messages
+        :type confirm: bool
+
+        :param window_size: the maximum number of messages waiting for the confirmation
+        :type window_size: int
+
+        :return: the confirmation of the messages in the confirm mode, None otherwise
+        :rtype: PublishConfirmation
+
+        :raises TimeoutError: if the broker does not confirm the messages in time, aborting the batch
+        """
+        start_time = time.perf_counter()
+        published = 0
+        published_bytes = 0
+
+        if not confirm:
+            channel = self.__channels.get(channel_pool.PUBLISH_ROLE)
+            try:
+                for body, properties in encoded_messages:
+                    channel.basic_publish(
+                        exchange='',
+                        routing_key=queue_name,
+                        body=body,
+                        properties=properties,
+                    )
+                    published += 1
+                    published_bytes += len(body)
+            finally:
+                self.__observe_published(queue_name, published, published_bytes, start_time)
+            return None
+
+        publisher_confirms = self.__channels.get(channel_pool.CONFIRM_ROLE)
+        batch = ConfirmedBatch()
+
+        try:
+            for body, properties in encoded_messages:
+                publisher_confirms.wait(window_size - 1)
+                publisher_confirms.channel.basic_publish(
+                    exchange='',
+                    routing_key=queue_name,
+                    body=body,
+                    properties=properties,
+                )
+                publisher_confirms.add_pending(batch)
+                published += 1
+                published_bytes += len(body)
+            publisher_confirms.wait(0)
+        finally:
+            self.__observe_published(queue_name, published, published_bytes, start_time)
+
+        return PublishConfirmation(
+            published=published,
+            acknowledged=batch.acknowledged,
+            rejected=batch.rejected,
+        )
+
+    @staticmethod
+    def __observe_published(
+            queue_name,
+            published,
+            published_bytes,
+            start_time,
+    ):
+        """
+        Records the metrics of a batch of published messages.
+
+        :param queue_name: the name of the queue
+        :type queue_name: str
+
+        :param published: the number of messages published
+        :type published: int
+
+        :param published_bytes: the number of bytes of the message bodies published
+        :type published_bytes: int
+
+        :param start_time: the performance counter when the publishing started
+        :type start_time: float
+        """
+        metrics.AMQP_PUBLISH_SECONDS.observe(time.perf_counter() - start_time)
+        metrics.AMQP_PUBLISHED_MESSAGES.inc(published, (queue_name,))
+        metrics.AMQP_PUBLISHED_BYTES.inc(published_bytes, (queue_name,))
+
+
+def connect(hostname):
+    """
+    Opens a connection to the AMQP message broker over the network, the default transport of AMQPManager.
+
+    :param hostname: the hostname of the message broker
+    :type hostname: str
+
+    :return: the connection
+    :rtype: pika.BlockingConnection
+    """
+    return pika.BlockingConnection(
+        pika.ConnectionParameters(
+            host=hostname,
+            blocked_connection_timeout=BLOCKED_CONNECTION_TIMEOUT,
+        ),
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def get_underlying_channel(channel):
+    """
+    Gets the asynchronous channel underlying a BlockingChannel, to send requests without waiting for each reply.
+
+    :param channel: the channel
+    :type channel: pika.adapters.blocking_connection.BlockingChannel
+
+    :return: the underlying channel, None if missing, as an internal of pika which may change in any release
+    :rtype: pika.channel.Channel
+    """
+    underlying_channel = getattr(channel, '_impl', None)
+    if not callable(getattr(underlying_channel, 'queue_declare', None)):
+        return None
+    return underlying_channel
+
+
+def get_message_properties(content_type, content_encoding):
+    """
+    Gets the properties of the persistent messages, shared by all the messages with the same encoding.
+
+    :param content_type: the content type of the messages
+    :type content_type: str
+
+    :param content_encoding: the content encoding of the messages, None if not compressed
+    :type content_encoding: str
+
+    :return: the properties
+    :rtype: pika.BasicProperties
+    """
+    return pika.BasicProperties(
+        content_type=content_type,
+        content_encoding=content_encoding,
+        delivery_mode=2,  # Persistent message.
+    )
+
+
+def check_window_size(window_size):
+    """
+    Checks the size of a window of publisher confirms, that holds at least the message being published.
+
+    :param window_size: the maximum number of messages waiting for the confirmation
+    :type window_size: int
+
+    :raises ValueError: if the window size is less than 1
+    """
+    if window_size < 1:
+        raise ValueError('Window size {} must be at least 1'.format(window_size))
+
+
+def collapse_delivery_tags(unsettled_delivery_tags, delivery_tags):
+    """
+    Collapses the delivery tags to settle in the fewest acknowledgements or rejections.
+    A multiple settlement covers all the pending tags up to its own, so only the leading run
+    of the pending tags is collapsed; the tags after the first one left pending are settled one by one.
+
+    :param unsettled_delivery_tags: the delivery tags of the channel not settled yet
+    :type unsettled_delivery_tags: set[int]
+
+    :param delivery_tags: the delivery tags to settle
+    :type delivery_tags: list[int]
+
+    :return: the list of the settlements, in the form (delivery_tag, multiple)
+    :rtype: list[(int, bool)]
+    """
+    delivery_tags = set(delivery_tags)
+
+    settlements = []
+    leading_delivery_tags_number = 0
+    for delivery_tag in sorted(unsettled_delivery_tags | delivery_tags):
+        if delivery_tag not in delivery_tags:
+            break
+        leading_delivery_tags_number += 1
+        settlements = [(delivery_tag, leading_delivery_tags_number > 1)]
+
+    for delivery_tag in sorted(delivery_tags):
+        if leading_delivery_tags_number > 0:
+            leading_delivery_tags_number -= 1
+        else:
+            settlements.append((delivery_tag, False))
+
+    return settlements
+
+
+class ConfirmedBatch(object):
+    """
+    Counts the confirmations of the messages of a batch, by their delivery tags,
+    so the late confirmations of an earlier batch are not counted.
+    """
+
+    def __init__(self):
+        self.acknowledged = 0
+        self.rejected = 0
+
+
+class PendingConfirms(object):
+    """
+    Tracks the messages published in the confirm mode and waiting for their confirmation.
+    """
+
+    def __init__(self):
+        self.__pending = collections.OrderedDict()
+        self.__sequence_number = 0
+
+    @property
+    def pending_number(self):
+        return len(self.__pending)
+
+    def add_pending(self, batch):
+        """
+        Records a message just published, waiting for its confirmation.
+
+        :param batch: the batch of the message
+        :type batch: ConfirmedBatch
+
+        :return: the delivery tag of the message
+        :rtype: int
+        """
+        self.__sequence_number += 1
+        self.__pending[self.__sequence_number] = batch
+        return self.__sequence_number
+
+    def on_confirmation(self, method_frame):
+        """
+        Handles a Basic.Ack or Basic.Nack confirmation from the broker, counting it in the batch of each message.
+
+        :param method_frame: the confirmation frame
+        :type method_frame: pika.frame.Method
+        """
+        method = method_frame.method
+        if method.multiple:
+            batches = []
+            while self.__pending and next(iter(self.__pending)) <= method.delivery_tag:
+                batches.append(self.__pending.popitem(last=False)[1])
+        elif method.delivery_tag in self.__pending:
+            batches = [self.__pending.pop(method.delivery_tag)]
+        else:
+            batches = []
+
+        acknowledged = isinstance(method, pika.spec.Basic.Ack)
+        for batch in batches:
+            if acknowledged:
+                batch.acknowledged += 1
+            else:
+                batch.rejected += 1
+
+    def get_timeout_error(self):
+        """
+        Gets the error of the messages not confirmed in time.
+
+        :return: the error, listing the delivery tags of the messages waiting for the confirmation
+        :rtype: TimeoutError
+        """
+        return TimeoutError('{} messages not confirmed before the timeout, delivery tags {}'.format(
+            self.pending_number,
+            list(self.__pending),
+        ))
+
+
+class PublisherConfirms(PendingConfirms):
+    """
+    Tracks the publisher confirms of a channel without waiting for each message.
+    The BlockingChannel confirm mode waits for the confirmation of every message,
+    so the confirm mode is enabled on the underlying asynchronous channel.
+    """
+
+    def __init__(self, connection):
+        """
+        Opens a channel in the confirm mode.
+
+        :param connection: the connection to the message broker
+        :type connection: pika.BlockingConnection
+        """
+        super().__init__()
+
+        self.__connection = connection
+        self.channel = connection.channel()
+
+        selected = []
+        self.channel._impl.confirm_delivery(
+            ack_nack_callback=self.on_confirmation,
+            callback=selected.append,
+        )
+        while not selected:
+            self.__connection.process_data_events(time_limit=CONFIRM_POLL_INTERVAL)
+
+    @property
+    def is_open(self):
+        return self.channel.is_open
+
+    def close(self):
+        self.channel.close()
+
+    def wait(self, max_pending, timeout=CONFIRM_TIMEOUT):
+        """
+        Waits until at most max_pending messages are waiting for the confirmation.
+
+        :param max_pending: the maximum number of messages waiting for the confirmation
+        :type max_pending: int
+
+        :param timeout: the maximum time to wait in seconds
+        :type timeout: float
+
+        :raises TimeoutError: if the messages are not confirmed in time, closing the channel
+         so their late confirmations are not counted in the next batches
         """
-        if queue_name not in self.__channels:
-            self.__channels[queue_name] = self.__connection.channel()
-        return self.__channels[queue_name]
+        deadline = time.monotonic() + timeout
+        while self.pending_number > max_pending and self.channel.is_open:
+            if time.monotonic() >= deadline:
+                error = self.get_timeout_error()
+                self.channel.close()
+                raise error
+            self.__connection.process_data_events(time_limit=CONFIRM_POLL_INTERVAL)
@@ -0,0 +1,112 @@
+import queue
+import threading
+
+import pika
+
+from scheduler.thread_safe_amqp_manager import ThreadSafeAMQPManager
+
+
+POOL_SIZE = 8
+ACQUIRE_TIMEOUT = 30
+
+
+class AMQPManagerPool(object):
+    """
+    Implements a bounded pool of AMQP managers, keeping their connections and channels open across requests.
+    The pool and its managers are thread-safe, so it can be shared by the threads of a multi-threaded server.
+    """
+
+    def __init__(
+            self,
+            hostname,
+            size=POOL_SIZE,
+            codec=None,
+            transport=None,
+    ):
+        """
+        Initializes the pool, without opening any connection.
+
+        :param hostname: the hostname of the message broker
+        :type hostname: str
+
+        :param size: the maximum number of managers, idle or in use
+        :type size: int
+
+        :param codec: the codec of the published messages, JSON if None
+        :type codec: scheduler.message_codecs.MessageCodec
+
+        :param transport: the function opening a connection to the message broker, see AMQPManager
+        :type transport: (str) -> pika.BlockingConnection
+        """
+        self.__hostname = hostname
+        self.__codec = codec
+        self.__transport = transport
+        self.__idle_managers = queue.LifoQueue()
+        self.__slots = threading.BoundedSemaphore(size)
+
+    def acquire(self, timeout=ACQUIRE_TIMEOUT):
+        """
+        Acquires a manager, reusing an idle one if healthy or connecting a new one otherwise.
+
+        :param timeout: the maximum time to wait for a free manager in seconds
+        :type timeout: float
+
+        :return: the manager
+        :rtype: ThreadSafeAMQPManager
+
+        :raises TimeoutError: if no manager is released within the timeout
+        """
+        if not self.__slots.acquire(timeout=timeout):
+            raise TimeoutError('No AMQP manager available in the pool')
+
+        try:
+            while True:
+                try:
+                    manager = self.__idle_managers.get_nowait()
+                except queue.Empty:
+                    return ThreadSafeAMQPManager(self.__hostname, self.__codec, transport=self.__transport)
+
+                if manager.is_open():
+                    return manager
+                self.__close_manager(manager)
+        except Exception:
+            self.__slots.release()
+            raise
+
+    def release(self, manager):
+        """
+        Releases a manager to the pool, closing it if the connection was lost.
+
+        :param manager: the manager
+        :type manager: ThreadSafeAMQPManager
+        """
+        try:
+            if manager.is_open():
+                self.__idle_managers.put(manager)
+            else:
+                self.__close_manager(manager)
+        finally:
+            self.__slots.release()
+
+    def close(self):
+        """
+        Closes the idle managers.
+        """
+        while True:
+            try:
+                manager = self.__idle_managers.get_nowait()
+            except queue.Empty:
+                return
+            self.__close_manager(manager)
+
+    def __close_manager(self, manager):
+        """
+        Closes a manager, ignoring the errors of a connection already lost.
+
+        :param manager: the manager
+        :type manager: ThreadSafeAMQPManager
+        """
+        try:
+            manager.close()
+        except pika.exceptions.AMQPError:
+            pass
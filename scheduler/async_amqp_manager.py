@@ -0,0 +1,598 @@
+import asyncio
+import time
+
+import pika
+from pika.adapters.asyncio_connection import AsyncioConnection
+
+from scheduler import channel_pool
+from scheduler import metrics
+from scheduler.amqp_manager import CONFIRM_TIMEOUT, CONSUME_PREFETCH_COUNT, PUBLISH_WINDOW_SIZE, ConfirmedBatch, \
+    PendingConfirms, PublishConfirmation, check_window_size, collapse_delivery_tags, get_message_properties
+from scheduler.message_codecs import MessageCodec
+
+
+PUBLISH_YIELD_INTERVAL = 100
+PUBLISH_BUFFER_SIZE = 4 * 1024 * 1024
+PUBLISH_DRAIN_INTERVAL = 0.001
+
+
+class AsyncAMQPManager(object):
+    """
+    Implements a manager for the AMQP protocol on asyncio, with the same API of AMQPManager as coroutines.
+    All the jobs of a process share one connection and interleave on its event loop,
+    since publishing gives way to the other coroutines every PUBLISH_YIELD_INTERVAL messages,
+    and waits while more than PUBLISH_BUFFER_SIZE bytes are waiting to be written to the broker.
+    """
+
+    def __init__(self, connection, codec=None):
+        """
+        Initializes a manager on an open connection; connect() opens the connection to the message broker.
+
+        :param connection: the open connection, with the API of pika.adapters.asyncio_connection.AsyncioConnection
+        :type connection: pika.adapters.asyncio_connection.AsyncioConnection
+
+        :param codec: the codec of the published messages, JSON if None
+        :type codec: scheduler.message_codecs.MessageCodec
+        """
+        self.__connection = connection
+        self.__codec = codec or MessageCodec()
+        self.__channels = {}
+        self.__waiters = {}
+        self.__unsettled_delivery_tags = {}
+
+    @classmethod
+    async def connect(cls, hostname, codec=None, transport=None):
+        """
+        Connects to the AMQP message broker on the running event loop.
+
+        :param hostname: the hostname of the message broker
+        :type hostname: str
+
+        :param codec: the codec of the published messages, JSON if None
+        :type codec: scheduler.message_codecs.MessageCodec
+
+        :param transport: the coroutine function opening a connection with the API of
+         pika.adapters.asyncio_connection.AsyncioConnection to the message broker at the hostname, connect() if None
+        :type transport: (str) -> collections.abc.Awaitable[pika.adapters.asyncio_connection.AsyncioConnection]
+
+        :return: the manager
+        :rtype: AsyncAMQPManager
+
+        :raises pika.exceptions.AMQPConnectionError: if the connection fails
+        """
+        return cls(await (transport or connect)(hostname), codec)
+
+    async def close(self):
+        if not self.__connection.is_open:
+            return
+
+        closed = asyncio.get_running_loop().create_future()
+        self.__connection.add_on_close_callback(lambda connection, reason: closed.done() or closed.set_result(None))
+        self.__connection.close()
+        await closed
+
+    def is_open(self):
+        """
+        Checks if the connection is still open.
+
+        :return: True if open, False otherwise
+        :rtype: bool
+        """
+        return self.__connection.is_open
+
+    async def create_queue(
+            self,
+            queue_name,
+    ):
+        """
+        Creates a queue.
+
+        :param queue_name: the queue name
+        :type queue_name: str
+        """
+        channel = await self.__get_channel(channel_pool.ADMIN_ROLE)
+
+        await self.__call(channel, channel.queue_declare, queue=queue_name, durable=True)
+
+    async def create_queues(
+            self,
+            queue_names,
+    ):
+        """
+        Creates the queues, sending all the declarations before waiting for the replies of the broker.
+
+        :param queue_names: the queue names
+        :type queue_names: list[str]
+        """
+        await asyncio.gather(*[self.create_queue(queue_name) for queue_name in queue_names])
+
+    async def queue_exists(
+            self,
+            queue_name,
+    ):
+        """
+        Checks if a queue exists.
+
+        :param queue_name: the queue name
+        :type queue_name: str
+
+        :return: True if exists, False otherwise
+        :rtype: bool
+        """
+        try:
+            await self.queue_size(queue_name)
+            return True
+        except pika.exceptions.ChannelClosedByBroker:
+            return False
+
+    async def queue_size(
+            self,
+            queue_name,
+    ):
+        """
+        Retrieves the number of messages in the queue.
+        The queue is declared on a channel of its own, since the broker closes the channel if the queue is missing,
+        failing the other declarations in progress on it.
+
+        :param queue_name: the queue name
+        :type queue_name: str
+
+        :return: the number of messages in the queue
+        :rtype: int
+
+        :raises pika.exceptions.ChannelClosedByBroker: if the queue does not exist
+        """
+        channel = await self.__open_channel(channel_pool.ADMIN_ROLE)
+
+        try:
+            method_frame = await self.__call(channel, channel.queue_declare, queue=queue_name, passive=True)
+        finally:
+            if channel.is_open:
+                channel.close()
+        return method_frame.method.message_count
+
+    async def delete_queue(
+            self,
+            queue_name,
+    ):
+        """
+        Deletes a queue.
+
+        :param queue_name: the queue name
+        :type queue_name: str
+        """
+        channel = await self.__get_channel(channel_pool.ADMIN_ROLE)
+
+        await self.__call(channel, channel.queue_delete, queue=queue_name)
+
+    async def publish_messages(
+            self,
+            queue_name,
+            messages,
+            confirm=False,
+            window_size=PUBLISH_WINDOW_SIZE,
+    ):
+        """
+        Publishes the messages on the queue.
+        The messages are encoded by the codec, the ones already serialized as JSON bytes are only compressed.
+        In the confirm mode the messages are published on a channel with publisher confirms,
+        keeping at most window_size messages waiting for the confirmation of the broker.
+
+        :param queue_name: the name of the queue
+        :type queue_name: str
+
+        :param messages: the messages to publish
+        :type messages: collections.abc.Iterable[object | bytes]
+
+        :param confirm: if True, it waits for the broker to confirm the messages
+        :type confirm: bool
+
+        :param window_size: the maximum number of messages waiting for the confirmation
+        :type window_size: int
+
+        :return: the confirmation of the messages in the confirm mode, None otherwise
+        :rtype: PublishConfirmation
+
+        :raises ValueError: if the window size is less than 1
+        :raises TimeoutError: if the broker does not confirm the messages in time
+        """
+        check_window_size(window_size)
+
+        if confirm:
+            publisher_confirms = await self.__get_channel(channel_pool.CONFIRM_ROLE)
+            channel = publisher_confirms.channel
+            batch = ConfirmedBatch()
+        else:
+            channel = await self.__get_channel(channel_pool.PUBLISH_ROLE)
+
+        start_time = time.perf_counter()
+        published = 0
+        published_bytes = 0
+        try:
+            for message in messages:
+                if confirm:
+                    await publisher_confirms.wait(window_size - 1)
+                elif published % PUBLISH_YIELD_INTERVAL == 0:
+                    await self.__wait_written()
+
+                body, content_type, content_encoding = self.__codec.encode(message)
+                channel.basic_publish(
+                    exchange='',
+                    routing_key=queue_name,
+                    body=body,
+                    properties=get_message_properties(content_type, content_encoding),
+                )
+                published += 1
+                published_bytes += len(body)
+                if confirm:
+                    publisher_confirms.add_pending(batch)
+
+            if confirm:
+                await publisher_confirms.wait(0)
+        finally:
+            metrics.AMQP_PUBLISH_SECONDS.observe(time.perf_counter() - start_time)
+            metrics.AMQP_PUBLISHED_MESSAGES.inc(published, (queue_name,))
+            metrics.AMQP_PUBLISHED_BYTES.inc(published_bytes, (queue_name,))
+
+        if not confirm:
+            return None
+        return PublishConfirmation(
+            published=published,
+            acknowledged=batch.acknowledged,
+            rejected=batch.rejected,
+        )
+
+    async def consume_messages(
+            self,
+            queue_name,
+            messages_number,
+            timeout=None,
+            inactivity_timeout=None,
+            prefetch_count=CONSUME_PREFETCH_COUNT,
+    ):
+        """
+        Consumes the messages from the queue.
+        The messages are consumed in rounds of at most prefetch_count messages, each with its own consumer,
+        so the broker never pushes more than prefetch_count messages at once.
+        If a timeout expires the messages consumed so far are returned.
+
+        :param queue_name: the queue name
+        :type queue_name: str
+
+        :param messages_number: the number of messages to consume
+        :type messages_number: int
+
+        :param timeout: the maximum time to consume the messages in seconds, None to wait indefinitely
+        :type timeout: float
+
+        :param inactivity_timeout: the maximum time to wait for the next message in seconds,
+         None to wait indefinitely
+        :type inactivity_timeout: float
+
+        :param prefetch_count: the maximum number of messages delivered by the broker ahead of consumption
+        :type prefetch_count: int
+
+        :return: the messages and the delivery tags
+        :rtype: (list[dict], list[str])
+
+        :raises pika.exceptions.ChannelClosedByBroker: if the queue does not exist
+        """
+        loop = asyncio.get_running_loop()
+        channel = await self.__get_channel(channel_pool.CONSUME_ROLE, queue_name)
+        unsettled_delivery_tags = self.__unsettled_delivery_tags.setdefault(queue_name, set())
+
+        messages = []
+        delivery_tags = []
+
+        deadline = None if timeout is None else loop.time() + timeout
+        timed_out = False
+        while len(messages) < messages_number and not timed_out:
+            round_messages_number = min(prefetch_count, messages_number - len(messages))
+            await self.__call(channel, channel.basic_qos, prefetch_count=round_messages_number)
+
+            deliveries = asyncio.Queue()
+            consumer_tag = channel.basic_consume(
+                queue=queue_name,
+                on_message_callback=lambda _, method, properties, body: deliveries.put_nowait(
+                    (method, properties, body),
+                ),
+            )
+            try:
+                while round_messages_number > 0:
+                    wait_time = inactivity_timeout
+                    if deadline is not None:
+                        remaining_time = max(0, deadline - loop.time())
+                        wait_time = remaining_time if wait_time is None else min(wait_time, remaining_time)
+
+                    if not deliveries.empty():
+                        method, properties, body = deliveries.get_nowait()
+                    else:
+                        try:
+                            method, properties, body = await self.__wait(channel, deliveries.get(), wait_time)
+                        except asyncio.TimeoutError:
+                            timed_out = True
+                            break
+
+                    delivery_tags.append(method.delivery_tag)
+                    unsettled_delivery_tags.add(method.delivery_tag)
+                    messages.append(self.__codec.decode(
+                        body,
+                        properties.content_type,
+                        properties.content_encoding,
+                    ))
+                    round_messages_number -= 1
+            finally:
+                if channel.is_open:
+                    await self.__call(channel, channel.basic_cancel, consumer_tag=consumer_tag)
+
+                    # The messages delivered but not consumed go back to the queue.
+                    while not deliveries.empty():
+                        method, _, _ = deliveries.get_nowait()
+                        channel.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
+
+        return messages, delivery_tags
+
+    async def acknowledge_messages(
+            self,
+            queue_name,
+            delivery_tags,
+    ):
+        """
+        Acknowledges the messages.
+        The contiguous delivery tags are acknowledged at once, when no other message of the channel is pending.
+
+        :param queue_name: the queue name
+        :type queue_name: str
+
+        :param delivery_tags: the delivery tags for the acknowledgement
+        :type delivery_tags: list[str]
+        """
+        channel = await self.__get_channel(channel_pool.CONSUME_ROLE, queue_name)
+        unsettled_delivery_tags = self.__unsettled_delivery_tags.setdefault(queue_name, set())
+
+        for delivery_tag, multiple in collapse_delivery_tags(unsettled_delivery_tags, delivery_tags):
+            channel.basic_ack(delivery_tag=delivery_tag, multiple=multiple)
+        unsettled_delivery_tags.difference_update(delivery_tags)
+
+    async def reject_messages(
+            self,
+            queue_name,
+            delivery_tags,
+            requeue=True,
+    ):
+        """
+        Rejects the messages.
+
+        :param queue_name: the queue name
+        :type queue_name: str
+
+        :param delivery_tags: the delivery tags for the rejection
+        :type delivery_tags: list[str]
+
+        :param requeue: if True, the broker delivers the messages again, otherwise it discards them
+        :type requeue: bool
+        """
+        channel = await self.__get_channel(channel_pool.CONSUME_ROLE, queue_name)
+        unsettled_delivery_tags = self.__unsettled_delivery_tags.setdefault(queue_name, set())
+
+        for delivery_tag, multiple in collapse_delivery_tags(unsettled_delivery_tags, delivery_tags):
+            channel.basic_nack(delivery_tag=delivery_tag, multiple=multiple, requeue=requeue)
+        unsettled_delivery_tags.difference_update(delivery_tags)
+
+    async def __wait_written(self):
+        """
+        Gives way to the other coroutines, then waits until at most PUBLISH_BUFFER_SIZE bytes are waiting
+        to be written to the broker, so the output buffer of the connection stays bounded.
+        """
+        await asyncio.sleep(0)
+        while self.__connection.is_open and get_write_buffer_size(self.__connection) > PUBLISH_BUFFER_SIZE:
+            await asyncio.sleep(PUBLISH_DRAIN_INTERVAL)
+
+    async def __get_channel(self, role, name=None):
+        """
+        Gets the channel for a role, opening it if missing or closed.
+        The coroutines asking for the same channel while it is opening wait for the same opening.
+
+        :param role: the role of the channel
+        :type role: str
+
+        :param name: the name of the channel, e.g. the queue name for the consume role
+        :type name: str
+
+        :return: the channel, tracking the publisher confirms for the confirm role
+        :rtype: pika.channel.Channel | AsyncPublisherConfirms
+        """
+        opening = self.__channels.get((role, name))
+        if opening is None or (opening.done() and (opening.exception() is not None or not opening.result().is_open)):
+            if role == channel_pool.CONSUME_ROLE:
+                self.__unsettled_delivery_tags.pop(name, None)
+
+            opening = asyncio.ensure_future(self.__open_channel(role))
+            self.__channels[(role, name)] = opening
+        return await opening
+
+    async def __open_channel(self, role):
+        """
+        Opens a channel for a role.
+
+        :param role: the role of the channel
+        :type role: str
+
+        :return: the channel, tracking the publisher confirms for the confirm role
+        :rtype: pika.channel.Channel | AsyncPublisherConfirms
+        """
+        opened = asyncio.get_running_loop().create_future()
+        self.__connection.channel(on_open_callback=opened.set_result)
+        channel = await opened
+        channel.add_on_close_callback(self.__on_channel_closed)
+
+        if role == channel_pool.CONFIRM_ROLE:
+            publisher_confirms = AsyncPublisherConfirms(channel)
+            await self.__call(channel, channel.confirm_delivery, ack_nack_callback=publisher_confirms.on_confirmation)
+            return publisher_confirms
+        return channel
+
+    async def __call(self, channel, method, **kwargs):
+        """
+        Calls a method of a channel, waiting for the reply of the broker.
+
+        :param channel: the channel
+        :type channel: pika.channel.Channel
+
+        :param method: the method, accepting the callback of the reply
+        :type method: collections.abc.Callable
+
+        :return: the reply frame
+        :rtype: pika.frame.Method
+
+        :raises pika.exceptions.ChannelClosed: if the channel is closed before the reply
+        """
+        replied = asyncio.get_running_loop().create_future()
+        method(callback=lambda method_frame: replied.done() or replied.set_result(method_frame), **kwargs)
+        return await self.__wait(channel, replied)
+
+    async def __wait(self, channel, awaitable, timeout=None):
+        """
+        Waits for an awaitable, failing as soon as the channel is closed.
+
+        :param channel: the channel
+        :type channel: pika.channel.Channel
+
+        :param awaitable: the awaitable
+        :type awaitable: collections.abc.Awaitable
+
+        :param timeout: the maximum time to wait in seconds, None to wait indefinitely
+        :type timeout: float
+
+        :return: the result of the awaitable
+
+        :raises pika.exceptions.ChannelClosed: if the channel is closed before the result
+        :raises asyncio.TimeoutError: if the timeout expires
+        """
+        result = asyncio.ensure_future(awaitable)
+        closed = asyncio.get_running_loop().create_future()
+        waiters = self.__waiters.setdefault(channel.channel_number, set())
+        waiters.add(closed)
+        try:
+            await asyncio.wait([result, closed], timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            waiters.discard(closed)
+
+        if result.done():
+            return result.result()
+        result.cancel()
+        if closed.done():
+            raise closed.exception()
+        raise asyncio.TimeoutError()
+
+    def __on_channel_closed(self, channel, reason):
+        """
+        Fails the coroutines waiting on a closed channel.
+
+        :param channel: the closed channel
+        :type channel: pika.channel.Channel
+
+        :param reason: the reason of the closing
+        :type reason: pika.exceptions.ChannelClosed
+        """
+        for closed in self.__waiters.pop(channel.channel_number, ()):
+            if not closed.done():
+                closed.set_exception(reason)
+
+
+async def connect(hostname):
+    """
+    Opens a connection to the AMQP message broker over the network, the default transport of AsyncAMQPManager.
+
+    :param hostname: the hostname of the message broker
+    :type hostname: str
+
+    :return: the connection
+    :rtype: pika.adapters.asyncio_connection.AsyncioConnection
+
+    :raises pika.exceptions.AMQPConnectionError: if the connection fails
+    """
+    loop = asyncio.get_running_loop()
+    opened = loop.create_future()
+
+    def on_open_error(connection, error):
+        if not isinstance(error, BaseException):
+            error = pika.exceptions.AMQPConnectionError(error)
+        opened.set_exception(error)
+
+    AsyncioConnection(
+        pika.ConnectionParameters(host=hostname),
+        on_open_callback=opened.set_result,
+        on_open_error_callback=on_open_error,
+        custom_ioloop=loop,
+    )
+    return await opened
+
+
+def get_write_buffer_size(connection):
+    """
+    Gets the number of bytes waiting to be written to the broker by a connection.
+
+    :param connection: the connection
+    :type connection: pika.adapters.asyncio_connection.AsyncioConnection
+
+    :return: the size of the output buffer, 0 for the connections without a network transport
+    :rtype: int
+    """
+    transport = getattr(connection, '_transport', None)
+    if transport is None:
+        return 0
+    return transport.get_write_buffer_size()
+
+
+class AsyncPublisherConfirms(PendingConfirms):
+    """
+    Tracks the publisher confirms of a channel on asyncio.
+    """
+
+    def __init__(self, channel):
+        """
+        Initializes the tracking of a channel, to be put in the confirm mode with on_confirmation() as callback.
+
+        :param channel: the channel
+        :type channel: pika.channel.Channel
+        """
+        super().__init__()
+
+        self.channel = channel
+        self.__confirmed = asyncio.Event()
+
+    @property
+    def is_open(self):
+        return self.channel.is_open
+
+    def close(self):
+        self.channel.close()
+
+    def on_confirmation(self, method_frame):
+        super().on_confirmation(method_frame)
+        self.__confirmed.set()
+
+    async def wait(self, max_pending, timeout=CONFIRM_TIMEOUT):
+        """
+        Waits until at most max_pending messages are waiting for the confirmation.
+
+        :param max_pending: the maximum number of messages waiting for the confirmation
+        :type max_pending: int
+
+        :param timeout: the maximum time to wait in seconds
+        :type timeout: float
+
+        :raises TimeoutError: if the messages are not confirmed in time, closing the channel
+         so their late confirmations are not counted in the next batches
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while self.pending_number > max_pending and self.channel.is_open:
+            self.__confirmed.clear()
+            try:
+                await asyncio.wait_for(self.__confirmed.wait(), max(deadline - loop.time(), 0))
+            except asyncio.TimeoutError:
+                error = self.get_timeout_error()
+                self.channel.close()
+                raise error
@@ -0,0 +1,104 @@
+import collections
+
+
+CHANNELS_NUMBER = 16
+
+ADMIN_ROLE = 'admin'
+PUBLISH_ROLE = 'publish'
+CONFIRM_ROLE = 'confirm'
+CONSUME_ROLE = 'consume'
+TRANSACTION_ROLE = 'transaction'
+
+
+class ChannelPool(object):
+    """
+    Implements a bounded pool of the channels of a connection, picked by role.
+    The least recently used channels are closed when the pool is full, unless busy.
+    """
+
+    def __init__(
+            self,
+            open_channel,
+            size=CHANNELS_NUMBER,
+            is_busy=None,
+            on_discard=None,
+    ):
+        """
+        Initializes the pool.
+
+        :param open_channel: the function opening a channel for a role
+        :type open_channel: (str) -> pika.adapters.blocking_connection.BlockingChannel
+
+        :param size: the maximum number of channels, exceeded only if all the channels are busy
+        :type size: int
+
+        :param is_busy: the function checking if the channel of a role and a name cannot be closed
+        :type is_busy: (str, str, pika.adapters.blocking_connection.BlockingChannel) -> bool
+
+        :param on_discard: the function notified when the channel of a role and a name is closed or lost
+        :type on_discard: (str, str) -> None
+        """
+        self.__open_channel = open_channel
+        self.__size = size
+        self.__is_busy = is_busy or (lambda role, name, channel: False)
+        self.__on_discard = on_discard or (lambda role, name: None)
+
+        self.__channels = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self.__channels)
+
+    def get(self, role, name=None):
+        """
+        Gets the channel of a role, opening it if missing or closed by the broker.
+
+        :param role: the role of the channel, 'admin' | 'publish' | 'confirm' | 'consume' | 'transaction'
+        :type role: str
+
+        :param name: the name distinguishing the channels of the same role, e.g. the consumed queue
+        :type name: str
+
+        :return: the channel
+        :rtype: pika.adapters.blocking_connection.BlockingChannel
+        """
+        key = (role, name)
+        channel = self.__channels.get(key)
+
+        if channel is not None and not channel.is_open:
+            del self.__channels[key]
+            self.__on_discard(role, name)
+            channel = None
+
+        if channel is None:
+            self.__evict()
+            channel = self.__open_channel(role)
+            self.__channels[key] = channel
+        else:
+            self.__channels.move_to_end(key)
+
+        return channel
+
+    def close(self):
+        """
+        Closes all the channels.
+        """
+        while self.__channels:
+            (role, name), channel = self.__channels.popitem(last=False)
+            if channel.is_open:
+                channel.close()
+            self.__on_discard(role, name)
+
+    def __evict(self):
+        """
+        Closes the least recently used channels not busy, until there is room for a new channel.
+        """
+        for (role, name), channel in list(self.__channels.items()):
+            if len(self.__channels) < self.__size:
+                return
+            if self.__is_busy(role, name, channel):
+                continue
+
+            del self.__channels[(role, name)]
+            if channel.is_open:
+                channel.close()
+            self.__on_discard(role, name)
@@ -0,0 +1,386 @@
+import asyncio
+import collections
+import queue
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+WORKERS_NUMBER = 4
+STATUSES_NUMBER = 1000
+BACKLOG_SIZE = 100
+
+
+class JobStatus(object):
+    """
+    Defines the publishing status of a job.
+    """
+
+    def __init__(
+            self,
+            job_id,
+            job_name,
+            tasks_numbers,
+    ):
+        """
+        Initializes the status of a job waiting to be published.
+
+        :param job_id: the identifier of the submission
+        :type job_id: str
+
+        :param job_name: the name of the job
+        :type job_name: str
+
+        :param tasks_numbers: the number of tasks to publish for each queue, in the form {queue_name: tasks_number}
+        :type tasks_numbers: dict[str, int]
+        """
+        self.job_id = job_id
+        self.job_name = job_name
+        self.state = 'queued'
+        self.error = None
+
+        self.__tasks_numbers = dict(tasks_numbers)
+        self.__published_tasks_numbers = {queue_name: 0 for queue_name in tasks_numbers}
+
+    def add_published(self, queue_name, tasks_number):
+        """
+        Counts the tasks published on the queue, once the broker confirmed them.
+
+        :param queue_name: the queue name
+        :type queue_name: str
+
+        :param tasks_number: the number of tasks confirmed
+        :type tasks_number: int
+        """
+        self.__published_tasks_numbers[queue_name] += tasks_number
+
+    def to_dict(self):
+        """
+        Gets the status as a dictionary.
+
+        :return: the status in the form {'job_id': str, 'job_name': str, 'state': str, 'error': str,
+         'queues': {queue_name: {'tasks_number': int, 'published_tasks_number': int}}}
+        :rtype: dict[str, object]
+        """
+        return {
+            'job_id': self.job_id,
+            'job_name': self.job_name,
+            'state': self.state,
+            'error': self.error,
+            'queues': {
+                queue_name: {
+                    'tasks_number': tasks_number,
+                    'published_tasks_number': self.__published_tasks_numbers[queue_name],
+                }
+                for queue_name, tasks_number in self.__tasks_numbers.items()
+            },
+        }
+
+
+class JobStatuses(object):
+    """
+    Keeps the statuses of the most recent jobs submitted.
+    """
+
+    def __init__(self, statuses_number=STATUSES_NUMBER):
+        """
+        Initializes the statuses.
+
+        :param statuses_number: the number of most recent job statuses to keep
+        :type statuses_number: int
+        """
+        self.__statuses = collections.OrderedDict()
+        self.__statuses_number = statuses_number
+        self.__lock = threading.Lock()
+
+    def create(
+            self,
+            job_name,
+            tasks_numbers,
+    ):
+        """
+        Creates the status of a job just submitted, forgetting the oldest one if full.
+
+        :param job_name: the name of the job
+        :type job_name: str
+
+        :param tasks_numbers: the number of tasks to publish for each queue, in the form {queue_name: tasks_number}
+        :type tasks_numbers: dict[str, int]
+
+        :return: the status of the job
+        :rtype: JobStatus
+        """
+        job_status = JobStatus(uuid.uuid4().hex, job_name, tasks_numbers)
+
+        with self.__lock:
+            self.__statuses[job_status.job_id] = job_status
+            while len(self.__statuses) > self.__statuses_number:
+                self.__statuses.popitem(last=False)
+
+        return job_status
+
+    def get(self, job_id):
+        """
+        Gets the status of a job.
+
+        :param job_id: the identifier of the submission
+        :type job_id: str
+
+        :return: the status of the job, None if unknown
+        :rtype: JobStatus
+        """
+        with self.__lock:
+            return self.__statuses.get(job_id)
+
+
+class JobPublisher(object):
+    """
+    Implements a background publisher of jobs, so the submission does not wait for the tasks to be published.
+    """
+
+    def __init__(
+            self,
+            workers_number=WORKERS_NUMBER,
+            statuses_number=STATUSES_NUMBER,
+            backlog_size=BACKLOG_SIZE,
+    ):
+        """
+        Initializes the publisher.
+
+        :param workers_number: the number of jobs published concurrently
+        :type workers_number: int
+
+        :param statuses_number: the number of most recent job statuses to keep
+        :type statuses_number: int
+
+        :param backlog_size: the maximum number of jobs waiting for a worker
+        :type backlog_size: int
+        """
+        self.__executor = ThreadPoolExecutor(max_workers=workers_number)
+        self.__statuses = JobStatuses(statuses_number)
+        self.__slots = threading.BoundedSemaphore(workers_number + backlog_size)
+
+    def submit(
+            self,
+            job_name,
+            tasks_numbers,
+            publish,
+    ):
+        """
+        Submits a job to be published in background.
+
+        :param job_name: the name of the job
+        :type job_name: str
+
+        :param tasks_numbers: the number of tasks to publish for each queue, in the form {queue_name: tasks_number}
+        :type tasks_numbers: dict[str, int]
+
+        :param publish: the function publishing the job, updating its status
+        :type publish: (JobStatus) -> None
+
+        :return: the status of the job
+        :rtype: JobStatus
+
+        :raises queue.Full: if the backlog is full
+        """
+        if not self.__slots.acquire(blocking=False):
+            raise queue.Full('the backlog of the jobs to publish is full')
+        job_status = self.__statuses.create(job_name, tasks_numbers)
+
+        try:
+            self.__executor.submit(self.__publish, publish, job_status, self.__slots)
+        except BaseException:
+            self.__slots.release()
+            raise
+        return job_status
+
+    def get_status(self, job_id):
+        """
+        Gets the status of a job.
+
+        :param job_id: the identifier of the submission
+        :type job_id: str
+
+        :return: the status of the job, None if unknown
+        :rtype: JobStatus
+        """
+        return self.__statuses.get(job_id)
+
+    def shutdown(self, wait=True):
+        """
+        Stops accepting jobs.
+
+        :param wait: if True, it waits for the submitted jobs to be published
+        :type wait: bool
+        """
+        self.__executor.shutdown(wait=wait)
+
+    @staticmethod
+    def __publish(publish, job_status, slots):
+        """
+        Publishes a job, recording the outcome in its status.
+
+        :param publish: the function publishing the job, updating its status
+        :type publish: (JobStatus) -> None
+
+        :param job_status: the status of the job
+        :type job_status: JobStatus
+
+        :param slots: the semaphore bounding the backlog, released once the job is published
+        :type slots: threading.BoundedSemaphore
+        """
+        job_status.state = 'publishing'
+        try:
+            publish(job_status)
+        except Exception as e:
+            job_status.error = repr(e)
+            job_status.state = 'failed'
+        else:
+            job_status.state = 'completed'
+        finally:
+            slots.release()
+
+
+class AsyncJobPublisher(object):
+    """
+    Implements a background publisher of jobs on an asyncio event loop,
+    interleaving all the jobs on the single connection of an AsyncAMQPManager.
+    """
+
+    def __init__(
+            self,
+            connect,
+            statuses_number=STATUSES_NUMBER,
+            backlog_size=BACKLOG_SIZE,
+    ):
+        """
+        Initializes the publisher, starting the thread of its event loop.
+
+        :param connect: the coroutine function connecting a manager, called again if the connection is lost
+        :type connect: () -> collections.abc.Awaitable[scheduler.async_amqp_manager.AsyncAMQPManager]
+
+        :param statuses_number: the number of most recent job statuses to keep
+        :type statuses_number: int
+
+        :param backlog_size: the maximum number of jobs being published
+        :type backlog_size: int
+        """
+        self.__connect = connect
+        self.__statuses = JobStatuses(statuses_number)
+        self.__backlog_size = backlog_size
+        self.__connecting = None
+        self.__futures = set()
+        self.__lock = threading.Lock()
+
+        self.__loop = asyncio.new_event_loop()
+        self.__thread = threading.Thread(target=self.__loop.run_forever, daemon=True)
+        self.__thread.start()
+
+    def submit(
+            self,
+            job_name,
+            tasks_numbers,
+            publish,
+    ):
+        """
+        Submits a job to be published in background.
+
+        :param job_name: the name of the job
+        :type job_name: str
+
+        :param tasks_numbers: the number of tasks to publish for each queue, in the form {queue_name: tasks_number}
+        :type tasks_numbers: dict[str, int]
+
+        :param publish: the coroutine function publishing the job with the manager, updating its status
+        :type publish: (scheduler.async_amqp_manager.AsyncAMQPManager, JobStatus) -> collections.abc.Awaitable
+
+        :return: the status of the job
+        :rtype: JobStatus
+
+        :raises queue.Full: if the backlog is full
+        """
+        with self.__lock:
+            if len(self.__futures) >= self.__backlog_size:
+                raise queue.Full('the backlog of the jobs to publish is full')
+            job_status = self.__statuses.create(job_name, tasks_numbers)
+
+            future = asyncio.run_coroutine_threadsafe(self.__publish(publish, job_status), self.__loop)
+            self.__futures.add(future)
+        future.add_done_callback(self.__on_published)
+        return job_status
+
+    def get_status(self, job_id):
+        """
+        Gets the status of a job.
+
+        :param job_id: the identifier of the submission
+        :type job_id: str
+
+        :return: the status of the job, None if unknown
+        :rtype: JobStatus
+        """
+        return self.__statuses.get(job_id)
+
+    def shutdown(self, wait=True):
+        """
+        Stops the event loop, closing the connection.
+
+        :param wait: if True, it waits for the submitted jobs to be published
+        :type wait: bool
+        """
+        if not self.__thread.is_alive():
+            return
+
+        with self.__lock:
+            futures = list(self.__futures)
+        for future in futures:
+            if wait:
+                future.exception()
+            else:
+                future.cancel()
+
+        asyncio.run_coroutine_threadsafe(self.__close(), self.__loop).result()
+        self.__loop.call_soon_threadsafe(self.__loop.stop)
+        self.__thread.join()
+        self.__loop.close()
+
+    def __on_published(self, future):
+        with self.__lock:
+            self.__futures.discard(future)
+
+    async def __get_amqp_manager(self):
+        """
+        Gets the manager, connecting it if missing or closed.
+        The jobs asking for the manager while it is connecting wait for the same connection.
+
+        :return: the manager
+        :rtype: scheduler.async_amqp_manager.AsyncAMQPManager
+        """
+        connecting = self.__connecting
+        if connecting is None or (connecting.done() and (
+                connecting.exception() is not None or not connecting.result().is_open())):
+            self.__connecting = asyncio.ensure_future(self.__connect())
+        return await asyncio.shield(self.__connecting)
+
+    async def __publish(self, publish, job_status):
+        """
+        Publishes a job, recording the outcome in its status.
+
+        :param publish: the coroutine function publishing the job with the manager, updating its status
+        :type publish: (scheduler.async_amqp_manager.AsyncAMQPManager, JobStatus) -> collections.abc.Awaitable
+
+        :param job_status: the status of the job
+        :type job_status: JobStatus
+        """
+        job_status.state = 'publishing'
+        try:
+            await publish(await self.__get_amqp_manager(), job_status)
+        except Exception as e:
+            job_status.error = repr(e)
+            job_status.state = 'failed'
+        else:
+            job_status.state = 'completed'
+
+    async def __close(self):
+        if self.__connecting is not None and self.__connecting.done() and self.__connecting.exception() is None:
+            await self.__connecting.result().close()
@@ -0,0 +1,313 @@
+from scheduler.tasks_generators.tasks_generator import convert_string, get_range
+
+
+VALUE_TYPES = ['integer', 'real', 'text']
+RANGE_TYPES = ['integer', 'real']
+
+NUMBER_OR_STRING = {'type': ['number', 'string']}
+SCALAR = {'type': ['number', 'string', 'boolean']}
+RATE = {'type': 'number', 'minimum': 0, 'maximum': 1}
+NAMES = {'type': 'array', 'items': {'type': 'string'}}
+
+LEARN_PARAMETER_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'name': {'type': 'string', 'minLength': 1},
+        'type': {'enum': VALUE_TYPES},
+        'values': {'type': 'array', 'items': SCALAR, 'minItems': 1},
+        'range': {
+            'type': 'object',
+            'properties': {
+                'start': NUMBER_OR_STRING,
+                'stop': NUMBER_OR_STRING,
+                'step': NUMBER_OR_STRING,
+            },
+            'required': ['start', 'stop', 'step'],
+        },
+    },
+    'required': ['name', 'type'],
+    'anyOf': [
+        {'required': ['values']},
+        {'required': ['range'], 'properties': {'type': {'enum': RANGE_TYPES}}},
+    ],
+}
+
+PREDICT_PARAMETER_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'name': {'type': 'string', 'minLength': 1},
+        'type': {'enum': VALUE_TYPES},
+        'value': SCALAR,
+    },
+    'required': ['name', 'type', 'value'],
+}
+
+JOB_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'name': {'type': 'string', 'minLength': 1},
+        'dataset_name': {'type': 'string', 'minLength': 1},
+        'training_rate': RATE,
+        'fusion_rate': RATE,
+        'sample_rate': RATE,
+        'class_attribute': {'type': 'string'},
+        'class_attribute_type': {'enum': VALUE_TYPES},
+        'true_class_value': SCALAR,
+        'include_attributes': NAMES,
+        'exclude_attributes': NAMES,
+        'attributes_rate': RATE,
+        'random_seed': {'type': 'integer'},
+        'include_header': {'type': 'boolean'},
+        'duration': {'type': 'integer', 'minimum': 0},
+        'threshold': {'type': 'number'},
+        'learners_number': {'type': 'integer', 'minimum': 1},
+        'learn_parameters': {'type': 'array', 'items': LEARN_PARAMETER_SCHEMA},
+        'predict_parameters': {'type': 'array', 'items': PREDICT_PARAMETER_SCHEMA},
+    },
+    'required': [
+        'name', 'dataset_name', 'training_rate', 'fusion_rate', 'sample_rate', 'class_attribute',
+        'class_attribute_type', 'true_class_value', 'attributes_rate', 'random_seed', 'include_header',
+        'duration', 'threshold', 'learners_number', 'learn_parameters', 'predict_parameters',
+    ],
+    'additionalProperties': False,
+}
+
+JSON_TYPES = {
+    'object': (dict,),
+    'array': (list,),
+    'string': (str,),
+    'number': (int, float),
+    'integer': (int,),
+    'boolean': (bool,),
+    'null': (type(None),),
+}
+
+
+def compile_schema(schema):
+    """
+    Compiles a JSON schema into a validator, so a document is checked without interpreting the schema again.
+    It supports the keywords type, enum, minimum, maximum, minLength, minItems, items, properties, required,
+    additionalProperties (as a boolean) and anyOf.
+
+    :param schema: the JSON schema
+    :type schema: dict[str, object]
+
+    :return: the validator, raising ValueError with the path of the first invalid value
+    :rtype: (object) -> None
+    """
+    validate_value = compile_checks(schema)
+
+    def validate(value):
+        validate_value(value, None)
+    return validate
+
+
+def compile_checks(schema):
+    """
+    Compiles a JSON schema into the checks of a value, as described in compile_schema.
+
+    :param schema: the JSON schema
+    :type schema: dict[str, object]
+
+    :return: the function checking a value at a path
+    :rtype: (object, tuple | None) -> None
+    """
+    checks = []
+
+    if 'type' in schema:
+        type_names = schema['type'] if isinstance(schema['type'], list) else [schema['type']]
+        types = tuple(json_type for type_name in type_names for json_type in JSON_TYPES[type_name])
+        # The booleans are integers in Python, but not numbers in JSON.
+        allows_boolean = 'boolean' in type_names
+        type_description = ' or '.join(type_names)
+
+        def check_type(value, path):
+            if not isinstance(value, types) or (isinstance(value, bool) and not allows_boolean):
+                raise ValueError('{}: {!r} is not of type {}'.format(format_path(path), value, type_description))
+        checks.append(check_type)
+
+    if 'enum' in schema:
+        enum = schema['enum']
+
+        def check_enum(value, path):
+            if value not in enum:
+                raise ValueError('{}: {!r} is not one of {}'.format(format_path(path), value, enum))
+        checks.append(check_enum)
+
+    if 'minimum' in schema:
+        minimum = schema['minimum']
+
+        def check_minimum(value, path):
+            if isinstance(value, (int, float)) and value < minimum:
+                raise ValueError('{}: {!r} is less than {}'.format(format_path(path), value, minimum))
+        checks.append(check_minimum)
+
+    if 'maximum' in schema:
+        maximum = schema['maximum']
+
+        def check_maximum(value, path):
+            if isinstance(value, (int, float)) and value > maximum:
+                raise ValueError('{}: {!r} is greater than {}'.format(format_path(path), value, maximum))
+        checks.append(check_maximum)
+
+    if 'minLength' in schema:
+        min_length = schema['minLength']
+
+        def check_min_length(value, path):
+            if isinstance(value, str) and len(value) < min_length:
+                raise ValueError('{}: {!r} is shorter than {}'.format(format_path(path), value, min_length))
+        checks.append(check_min_length)
+
+    if 'minItems' in schema:
+        min_items = schema['minItems']
+
+        def check_min_items(value, path):
+            if isinstance(value, list) and len(value) < min_items:
+                raise ValueError('{}: fewer than {} items'.format(format_path(path), min_items))
+        checks.append(check_min_items)
+
+    if 'items' in schema:
+        validate_item = compile_checks(schema['items'])
+
+        def check_items(value, path):
+            if isinstance(value, list):
+                for i, item in enumerate(value):
+                    validate_item(item, (path, i))
+        checks.append(check_items)
+
+    if 'required' in schema:
+        required = schema['required']
+
+        def check_required(value, path):
+            if isinstance(value, dict):
+                for name in required:
+                    if name not in value:
+                        raise ValueError('{}: missing property {!r}'.format(format_path(path), name))
+        checks.append(check_required)
+
+    if 'properties' in schema:
+        validate_properties = {name: compile_checks(property_schema)
+                               for name, property_schema in schema['properties'].items()}
+        additional_properties = schema.get('additionalProperties', True)
+
+        def check_properties(value, path):
+            if isinstance(value, dict):
+                for name, property_value in value.items():
+                    validate_property = validate_properties.get(name)
+                    if validate_property is not None:
+                        validate_property(property_value, (path, name))
+                    elif not additional_properties:
+                        raise ValueError('{}: unexpected property {!r}'.format(format_path(path), name))
+        checks.append(check_properties)
+
+    if 'anyOf' in schema:
+        validators = [compile_checks(subschema) for subschema in schema['anyOf']]
+
+        def check_any_of(value, path):
+            errors = []
+            for validator in validators:
+                try:
+                    validator(value, path)
+                    return
+                except ValueError as e:
+                    errors.append(str(e))
+            raise ValueError(' and '.join(errors))
+        checks.append(check_any_of)
+
+    # Avoids a call per value in the common case of a single check.
+    if len(checks) == 1:
+        return checks[0]
+
+    def check_all(value, path):
+        for check in checks:
+            check(value, path)
+    return check_all
+
+
+def format_path(path):
+    """
+    Formats the path of a value, kept as nested (parent path, key) pairs so it is built only on errors.
+
+    :param path: the path, None for the document
+    :type path: tuple | None
+
+    :return: the path, e.g. '$.learn_parameters[0].range'
+    :rtype: str
+    """
+    keys = []
+    while path is not None:
+        path, key = path
+        keys.append('[{}]'.format(key) if isinstance(key, int) else '.{}'.format(key))
+    return '$' + ''.join(reversed(keys))
+
+
+validate_job_schema = compile_schema(JOB_SCHEMA)
+
+
+def validate_job(job):
+    """
+    Validates a job against the schema, then checks what the schema cannot express:
+    the values of the parameters fit their types and the ranges of the learn parameters are not empty.
+
+    :param job: the job
+    :type job: object
+
+    :raises ValueError: with the path of the first invalid value
+    """
+    validate_job_schema(job)
+
+    for i, parameter in enumerate(job['learn_parameters']):
+        path = ((None, 'learn_parameters'), i)
+        # The values of a parameter take precedence over its range.
+        if 'values' in parameter:
+            for j, value in enumerate(parameter['values']):
+                check_value(value, parameter['type'], ((path, 'values'), j))
+        else:
+            check_range(parameter['range'], parameter['type'], (path, 'range'))
+
+    for i, parameter in enumerate(job['predict_parameters']):
+        check_value(parameter['value'], parameter['type'], (((None, 'predict_parameters'), i), 'value'))
+
+
+def check_value(value, value_type, path):
+    """
+    Checks that a value can be converted to its type, as the tasks generators do.
+
+    :param value: the value
+    :type value: object
+
+    :param value_type: the type of the value between 'integer', 'real' and 'text'
+    :type value_type: str
+
+    :param path: the path of the value
+    :type path: tuple
+
+    :raises ValueError: if the value does not fit the type
+    """
+    try:
+        convert_string(value, value_type)
+    except ValueError as e:
+        raise ValueError('{}: {}'.format(format_path(path), e))
+
+
+def check_range(value_range, value_type, path):
+    """
+    Checks that a range of values is valid and not empty.
+
+    :param value_range: the range in the form {'start': object, 'stop': object, 'step': object}
+    :type value_range: dict[str, object]
+
+    :param value_type: the type of the values between 'integer' and 'real'
+    :type value_type: str
+
+    :param path: the path of the range
+    :type path: tuple
+
+    :raises ValueError: if the range is invalid or empty
+    """
+    try:
+        values = get_range(value_range['start'], value_range['stop'], value_range['step'], value_type)
+    except ValueError as e:
+        raise ValueError('{}: {}'.format(format_path(path), e))
+    if len(values) == 0:
+        raise ValueError('{}: {!r} is empty'.format(format_path(path), value_range))
@@ -0,0 +1,966 @@
+import asyncio
+import collections
+import itertools
+import threading
+import time
+
+import pika
+
+
+class MemoryBroker(object):
+    """
+    Implements an in-memory message broker, standing in for RabbitMQ in tests and benchmarks.
+    Only the default exchange is supported: a message is routed to the queue named by its routing key.
+    """
+
+    def __init__(self):
+        self.__queues = {}
+        self.__lock = threading.RLock()
+
+    def connect(self, hostname=None):
+        """
+        Opens a connection to the broker, the transport of AMQPManager.
+
+        :param hostname: the hostname of the message broker, ignored
+        :type hostname: str
+
+        :return: the connection
+        :rtype: MemoryBlockingConnection
+        """
+        return MemoryBlockingConnection(self)
+
+    async def connect_async(self, hostname=None):
+        """
+        Opens a connection to the broker on the running event loop, the transport of AsyncAMQPManager.
+
+        :param hostname: the hostname of the message broker, ignored
+        :type hostname: str
+
+        :return: the connection
+        :rtype: MemoryAsyncConnection
+        """
+        return MemoryAsyncConnection(self, asyncio.get_running_loop())
+
+    def declare_queue(
+            self,
+            queue_name,
+            passive=False,
+            durable=False,
+    ):
+        """
+        Declares a queue, creating it if missing.
+
+        :param queue_name: the queue name
+        :type queue_name: str
+
+        :param passive: if True, it only checks that the queue exists
+        :type passive: bool
+
+        :param durable: if True, the queue survives a restart of the broker
+        :type durable: bool
+
+        :return: the number of messages ready and the number of consumers
+        :rtype: (int, int)
+
+        :raises pika.exceptions.ChannelClosedByBroker: if the queue is missing in the passive mode
+        """
+        with self.__lock:
+            if queue_name not in self.__queues:
+                if passive:
+                    raise get_not_found_error(queue_name)
+                self.__queues[queue_name] = MemoryQueue(queue_name, durable)
+
+            queue = self.__queues[queue_name]
+            return len(queue.messages), len(queue.consumers)
+
+    def delete_queue(self, queue_name):
+        """
+        Deletes a queue, with its messages and consumers.
+
+        :param queue_name: the queue name
+        :type queue_name: str
+
+        :return: the number of messages deleted
+        :rtype: int
+        """
+        with self.__lock:
+            queue = self.__queues.pop(queue_name, None)
+            if queue is None:
+                return 0
+
+            for consumer in queue.consumers:
+                consumer.cancel()
+            return len(queue.messages)
+
+    def purge_queue(self, queue_name):
+        """
+        Deletes the messages ready in a queue.
+
+        :param queue_name: the queue name
+        :type queue_name: str
+
+        :return: the number of messages deleted
+        :rtype: int
+
+        :raises pika.exceptions.ChannelClosedByBroker: if the queue is missing
+        """
+        with self.__lock:
+            queue = self.__get_queue(queue_name)
+
+            messages_number = len(queue.messages)
+            queue.messages.clear()
+            return messages_number
+
+    def publish(
+            self,
+            queue_name,
+            body,
+            properties,
+    ):
+        """
+        Publishes a message on a queue.
+
+        :param queue_name: the queue name
+        :type queue_name: str
+
+        :param body: the body of the message
+        :type body: bytes
+
+        :param properties: the properties of the message
+        :type properties: pika.BasicProperties
+
+        :return: True if routed, False if the queue is missing
+        :rtype: bool
+        """
+        with self.__lock:
+            queue = self.__queues.get(queue_name)
+            if queue is None:
+                return False
+
+            queue.messages.append((body, properties, False))
+            self.__dispatch(queue)
+            return True
+
+    def requeue(
+            self,
+            queue_name,
+            messages,
+    ):
+        """
+        Puts back at the head of a queue the messages delivered but not acknowledged.
+
+        :param queue_name: the queue name
+        :type queue_name: str
+
+        :param messages: the messages in the form (body, properties), in delivery order
+        :type messages: list[(bytes, pika.BasicProperties)]
+        """
+        with self.__lock:
+            queue = self.__queues.get(queue_name)
+            if queue is None:
+                return
+
+            queue.messages.extendleft((body, properties, True) for body, properties in reversed(messages))
+            self.__dispatch(queue)
+
+    def add_consumer(
+            self,
+            queue_name,
+            consumer,
+    ):
+        """
+        Adds a consumer to a queue, delivering it the messages ready.
+
+        :param queue_name: the queue name
+        :type queue_name: str
+
+        :param consumer: the consumer
+        :type consumer: MemoryConsumer
+
+        :raises pika.exceptions.ChannelClosedByBroker: if the queue is missing
+        """
+        with self.__lock:
+            queue = self.__get_queue(queue_name)
+
+            queue.consumers.append(consumer)
+            self.__dispatch(queue)
+
+    def remove_consumer(
+            self,
+            queue_name,
+            consumer,
+    ):
+        """
+        Removes a consumer from a queue.
+
+        :param queue_name: the queue name
+        :type queue_name: str
+
+        :param consumer: the consumer
+        :type consumer: MemoryConsumer
+        """
+        with self.__lock:
+            queue = self.__queues.get(queue_name)
+            if queue is not None and consumer in queue.consumers:
+                queue.consumers.remove(consumer)
+
+    def dispatch(self, queue_name):
+        """
+        Delivers the messages ready in a queue to the consumers with room for them.
+
+        :param queue_name: the queue name
+        :type queue_name: str
+        """
+        with self.__lock:
+            queue = self.__queues.get(queue_name)
+            if queue is not None:
+                self.__dispatch(queue)
+
+    def __get_queue(self, queue_name):
+        """
+        Gets a queue.
+
+        :param queue_name: the queue name
+        :type queue_name: str
+
+        :return: the queue
+        :rtype: MemoryQueue
+
+        :raises pika.exceptions.ChannelClosedByBroker: if the queue is missing
+        """
+        if queue_name not in self.__queues:
+            raise get_not_found_error(queue_name)
+        return self.__queues[queue_name]
+
+    @staticmethod
+    def __dispatch(queue):
+        """
+        Delivers the messages ready in a queue, to the consumers in turn.
+
+        :param queue: the queue
+        :type queue: MemoryQueue
+        """
+        while queue.messages and queue.consumers:
+            for _ in range(len(queue.consumers)):
+                consumer = queue.consumers[0]
+                queue.consumers.rotate(-1)
+                if consumer.has_capacity():
+                    break
+            else:
+                return
+
+            body, properties, redelivered = queue.messages.popleft()
+            consumer.deliver(body, properties, redelivered)
+
+
+class MemoryQueue(object):
+    """
+    Defines a queue of the in-memory broker.
+    """
+
+    def __init__(self, name, durable):
+        self.name = name
+        self.durable = durable
+        self.messages = collections.deque()
+        self.consumers = collections.deque()
+
+
+class MemoryConsumer(object):
+    """
+    Defines a consumer of the in-memory broker, attached to a channel.
+    """
+
+    def __init__(
+            self,
+            channel,
+            queue_name,
+            consumer_tag,
+            prefetch_count,
+            on_delivery,
+    ):
+        """
+        Initializes the consumer.
+
+        :param channel: the channel of the consumer
+        :type channel: MemoryChannel
+
+        :param queue_name: the consumed queue name
+        :type queue_name: str
+
+        :param consumer_tag: the consumer tag
+        :type consumer_tag: str
+
+        :param prefetch_count: the maximum number of messages not acknowledged, 0 for no limit
+        :type prefetch_count: int
+
+        :param on_delivery: the function receiving the deliveries
+        :type on_delivery: (pika.spec.Basic.Deliver, pika.BasicProperties, bytes) -> None
+        """
+        self.channel = channel
+        self.queue_name = queue_name
+        self.consumer_tag = consumer_tag
+        self.prefetch_count = prefetch_count
+        self.unacknowledged_number = 0
+        self.__on_delivery = on_delivery
+
+    def has_capacity(self):
+        return self.prefetch_count == 0 or self.unacknowledged_number < self.prefetch_count
+
+    def deliver(self, body, properties, redelivered):
+        self.unacknowledged_number += 1
+        delivery_tag = self.channel.add_unacknowledged(self, body, properties)
+        method = pika.spec.Basic.Deliver(
+            consumer_tag=self.consumer_tag,
+            delivery_tag=delivery_tag,
+            redelivered=redelivered,
+            exchange='',
+            routing_key=self.queue_name,
+        )
+        self.__on_delivery(method, properties, body)
+
+    def cancel(self):
+        self.channel.remove_consumer(self.consumer_tag)
+
+
+class MemoryChannel(object):
+    """
+    Implements the state of a channel of the in-memory broker: consumers, delivery tags, publisher confirms
+    and transactions.
+    The subclasses expose it with the API of the pika channels.
+    """
+
+    def __init__(self, broker, channel_number):
+        """
+        Initializes an open channel.
+
+        :param broker: the broker
+        :type broker: MemoryBroker
+
+        :param channel_number: the channel number
+        :type channel_number: int
+        """
+        self._broker = broker
+        self.channel_number = channel_number
+
+        self.is_open = True
+        self.__prefetch_count = 0
+        self.__delivery_tags = itertools.count(1)
+        self.__unacknowledged = collections.OrderedDict()
+        self.__consumers = {}
+        self.__consumer_tags = itertools.count(1)
+        self.__lock = threading.RLock()
+
+        self._confirm_mode = False
+        self.__publish_sequence_numbers = itertools.count(1)
+        self._transaction = None
+
+    @property
+    def is_closed(self):
+        return not self.is_open
+
+    def add_unacknowledged(self, consumer, body, properties):
+        """
+        Records a message delivered to a consumer of the channel.
+
+        :return: the delivery tag
+        :rtype: int
+        """
+        with self.__lock:
+            delivery_tag = next(self.__delivery_tags)
+            self.__unacknowledged[delivery_tag] = (consumer, body, properties)
+            return delivery_tag
+
+    def remove_consumer(self, consumer_tag):
+        """
+        Removes a consumer of the channel, e.g. when its queue is deleted.
+
+        :param consumer_tag: the consumer tag
+        :type consumer_tag: str
+        """
+        with self.__lock:
+            consumer = self.__consumers.pop(consumer_tag, None)
+        if consumer is not None:
+            self._broker.remove_consumer(consumer.queue_name, consumer)
+
+    def _set_qos(self, prefetch_count):
+        self.__prefetch_count = prefetch_count
+
+    def _add_consumer(self, queue_name, on_delivery, consumer_tag=None):
+        """
+        Adds a consumer on the channel.
+
+        :return: the consumer tag
+        :rtype: str
+        """
+        with self.__lock:
+            consumer_tag = consumer_tag or 'ctag{}.{}'.format(self.channel_number, next(self.__consumer_tags))
+            consumer = MemoryConsumer(self, queue_name, consumer_tag, self.__prefetch_count, on_delivery)
+            self.__consumers[consumer_tag] = consumer
+        self._broker.add_consumer(queue_name, consumer)
+        return consumer_tag
+
+    def _publish(self, routing_key, body, properties):
+        """
+        Publishes a message.
+
+        :return: the publish sequence number in the confirm mode, None otherwise
+        :rtype: int
+        """
+        if self._transaction is not None:
+            self._transaction.append((routing_key, body, properties or pika.BasicProperties()))
+            return None
+
+        self._broker.publish(routing_key, body, properties or pika.BasicProperties())
+        if self._confirm_mode:
+            return next(self.__publish_sequence_numbers)
+        return None
+
+    def _select_transaction(self):
+        if self._transaction is None:
+            self._transaction = []
+
+    def _end_transaction(self, commit):
+        """
+        Commits or rolls back the messages published in the transaction, starting a new one.
+
+        :param commit: if True, it publishes the messages, otherwise it discards them
+        :type commit: bool
+
+        :raises pika.exceptions.ChannelClosedByBroker: if the channel is not transactional
+        """
+        if self._transaction is None:
+            raise pika.exceptions.ChannelClosedByBroker(406, 'PRECONDITION_FAILED - channel is not transactional')
+
+        messages, self._transaction = self._transaction, []
+        if commit:
+            for routing_key, body, properties in messages:
+                self._broker.publish(routing_key, body, properties)
+
+    def _settle(self, delivery_tag, multiple, requeue):
+        """
+        Acknowledges or rejects the delivered messages.
+
+        :param delivery_tag: the delivery tag, 0 with multiple for all the messages
+        :type delivery_tag: int
+
+        :param multiple: if True, it settles all the messages up to the delivery tag
+        :type multiple: bool
+
+        :param requeue: None to acknowledge, True to reject requeueing, False to reject discarding
+        :type requeue: bool
+
+        :raises pika.exceptions.ChannelClosedByBroker: if the delivery tag is unknown
+        """
+        with self.__lock:
+            if multiple:
+                delivery_tags = [
+                    tag for tag in self.__unacknowledged if delivery_tag == 0 or tag <= delivery_tag
+                ]
+            elif delivery_tag in self.__unacknowledged:
+                delivery_tags = [delivery_tag]
+            else:
+                raise pika.exceptions.ChannelClosedByBroker(
+                    406,
+                    'PRECONDITION_FAILED - unknown delivery tag {}'.format(delivery_tag),
+                )
+
+            settled = [self.__unacknowledged.pop(tag) for tag in delivery_tags]
+
+        self.__release(settled, requeue)
+
+    def _close(self):
+        """
+        Closes the channel, requeueing the messages not acknowledged.
+        """
+        with self.__lock:
+            if not self.is_open:
+                return
+            self.is_open = False
+            self._transaction = None
+
+            consumers = list(self.__consumers.values())
+            self.__consumers.clear()
+            settled = list(self.__unacknowledged.values())
+            self.__unacknowledged.clear()
+
+        for consumer in consumers:
+            self._broker.remove_consumer(consumer.queue_name, consumer)
+        self.__release(settled, True)
+
+    def _cancel_consumer(self, consumer_tag):
+        with self.__lock:
+            consumer = self.__consumers.pop(consumer_tag, None)
+        if consumer is not None:
+            self._broker.remove_consumer(consumer.queue_name, consumer)
+
+    def __release(self, settled, requeue):
+        """
+        Releases the settled messages, freeing the capacity of their consumers.
+
+        :param settled: the settled messages in the form (consumer, body, properties)
+        :type settled: list[(MemoryConsumer, bytes, pika.BasicProperties)]
+
+        :param requeue: True to put the messages back in their queues
+        :type requeue: bool
+        """
+        requeued = collections.OrderedDict()
+        for consumer, body, properties in settled:
+            consumer.unacknowledged_number -= 1
+            if requeue:
+                requeued.setdefault(consumer.queue_name, []).append((body, properties))
+
+        for queue_name, messages in requeued.items():
+            self._broker.requeue(queue_name, messages)
+        for queue_name in {consumer.queue_name for consumer, _, _ in settled}:
+            self._broker.dispatch(queue_name)
+
+
+class MemoryAsyncConnection(object):
+    """
+    Implements a connection to the in-memory broker with the API of pika.adapters.asyncio_connection.AsyncioConnection.
+    The callbacks are scheduled on the event loop, as if the replies came from the network.
+    """
+
+    def __init__(self, broker, loop):
+        """
+        Initializes an open connection.
+
+        :param broker: the broker
+        :type broker: MemoryBroker
+
+        :param loop: the event loop running the callbacks, with call_soon_threadsafe()
+        :type loop: asyncio.AbstractEventLoop | MemoryCallbacks
+        """
+        self.__broker = broker
+        self.__loop = loop
+        self.__channels = []
+        self.__channel_numbers = itertools.count(1)
+        self.__on_close_callbacks = []
+
+        self.is_open = True
+
+    @property
+    def is_closed(self):
+        return not self.is_open
+
+    def channel(self, channel_number=None, on_open_callback=None):
+        if not self.is_open:
+            raise pika.exceptions.ConnectionWrongStateError('Connection is closed')
+
+        channel = MemoryAsyncChannel(self.__broker, channel_number or next(self.__channel_numbers), self.__loop)
+        self.__channels.append(channel)
+        self.__loop.call_soon_threadsafe(on_open_callback, channel)
+        return channel
+
+    def add_on_close_callback(self, callback):
+        self.__on_close_callbacks.append(callback)
+
+    def close(self, reply_code=200, reply_text='Normal shutdown'):
+        if not self.is_open:
+            return
+        self.is_open = False
+
+        for channel in self.__channels:
+            channel.close()
+        reason = pika.exceptions.ConnectionClosedByClient(reply_code, reply_text)
+        for callback in self.__on_close_callbacks:
+            self.__loop.call_soon_threadsafe(callback, self, reason)
+
+
+class MemoryAsyncChannel(MemoryChannel):
+    """
+    Implements a channel of the in-memory broker with the API of pika.channel.Channel.
+    """
+
+    def __init__(self, broker, channel_number, loop):
+        super().__init__(broker, channel_number)
+
+        self.__loop = loop
+        self.__on_close_callbacks = []
+        self.__on_confirmation = None
+
+    def add_on_close_callback(self, callback):
+        self.__on_close_callbacks.append(callback)
+
+    def close(self, reply_code=0, reply_text='Normal shutdown'):
+        self.__close(pika.exceptions.ChannelClosedByClient(reply_code, reply_text))
+
+    def queue_declare(self, queue, passive=False, durable=False, exclusive=False, auto_delete=False,
+                      arguments=None, callback=None):
+        self.__call(
+            lambda: pika.spec.Queue.DeclareOk(queue, *self._broker.declare_queue(queue, passive, durable)),
+            callback,
+        )
+
+    def queue_delete(self, queue, if_unused=False, if_empty=False, callback=None):
+        self.__call(lambda: pika.spec.Queue.DeleteOk(self._broker.delete_queue(queue)), callback)
+
+    def queue_purge(self, queue, callback=None):
+        self.__call(lambda: pika.spec.Queue.PurgeOk(self._broker.purge_queue(queue)), callback)
+
+    def basic_qos(self, prefetch_size=0, prefetch_count=0, global_qos=False, callback=None):
+        def set_qos():
+            self._set_qos(prefetch_count)
+            return pika.spec.Basic.QosOk()
+        self.__call(set_qos, callback)
+
+    def confirm_delivery(self, ack_nack_callback, callback=None):
+        def select():
+            self._confirm_mode = True
+            self.__on_confirmation = ack_nack_callback
+            return pika.spec.Confirm.SelectOk()
+        self.__call(select, callback)
+
+    def tx_select(self, callback=None):
+        def select():
+            self._select_transaction()
+            return pika.spec.Tx.SelectOk()
+        self.__call(select, callback)
+
+    def tx_commit(self, callback=None):
+        def commit():
+            self._end_transaction(commit=True)
+            return pika.spec.Tx.CommitOk()
+        self.__call(commit, callback)
+
+    def tx_rollback(self, callback=None):
+        def rollback():
+            self._end_transaction(commit=False)
+            return pika.spec.Tx.RollbackOk()
+        self.__call(rollback, callback)
+
+    def basic_publish(self, exchange, routing_key, body, properties=None, mandatory=False):
+        self.__check_open()
+
+        sequence_number = self._publish(routing_key, body, properties)
+        if sequence_number is not None:
+            self.__loop.call_soon_threadsafe(
+                self.__on_confirmation,
+                pika.frame.Method(self.channel_number, pika.spec.Basic.Ack(delivery_tag=sequence_number)),
+            )
+
+    def basic_consume(self, queue, on_message_callback, auto_ack=False, exclusive=False, consumer_tag=None,
+                      arguments=None, callback=None):
+        self.__check_open()
+
+        def on_delivery(method, properties, body):
+            self.__loop.call_soon_threadsafe(on_message_callback, self, method, properties, body)
+
+        try:
+            consumer_tag = self._add_consumer(queue, on_delivery, consumer_tag)
+        except pika.exceptions.ChannelClosedByBroker as e:
+            self.__loop.call_soon_threadsafe(self.__close, e)
+            return consumer_tag
+        if callback is not None:
+            self.__loop.call_soon_threadsafe(
+                callback,
+                pika.frame.Method(self.channel_number, pika.spec.Basic.ConsumeOk(consumer_tag)),
+            )
+        return consumer_tag
+
+    def basic_cancel(self, consumer_tag='', callback=None):
+        def cancel():
+            self._cancel_consumer(consumer_tag)
+            return pika.spec.Basic.CancelOk(consumer_tag)
+        self.__call(cancel, callback)
+
+    def basic_ack(self, delivery_tag=0, multiple=False):
+        self.__settle(delivery_tag, multiple, None)
+
+    def basic_nack(self, delivery_tag=0, multiple=False, requeue=True):
+        self.__settle(delivery_tag, multiple, requeue)
+
+    def basic_reject(self, delivery_tag=0, requeue=True):
+        self.__settle(delivery_tag, False, requeue)
+
+    def __settle(self, delivery_tag, multiple, requeue):
+        self.__check_open()
+        try:
+            self._settle(delivery_tag, multiple, requeue)
+        except pika.exceptions.ChannelClosedByBroker as e:
+            self.__loop.call_soon_threadsafe(self.__close, e)
+
+    def __call(self, method, callback):
+        """
+        Executes a synchronous method of the protocol, replying with its result or closing the channel on error.
+
+        :param method: the function executing the method and returning its reply
+        :type method: () -> pika.amqp_object.Method
+
+        :param callback: the function receiving the reply frame
+        :type callback: (pika.frame.Method) -> None
+        """
+        self.__check_open()
+        try:
+            reply = method()
+        except pika.exceptions.ChannelClosedByBroker as e:
+            self.__loop.call_soon_threadsafe(self.__close, e)
+            return
+        if callback is not None:
+            self.__loop.call_soon_threadsafe(self.__reply, callback, pika.frame.Method(self.channel_number, reply))
+
+    def __reply(self, callback, method_frame):
+        # The replies following an error are lost with the channel, as with a broker over the network.
+        if self.is_open:
+            callback(method_frame)
+
+    def __check_open(self):
+        if not self.is_open:
+            raise pika.exceptions.ChannelWrongStateError('Channel is closed.')
+
+    def __close(self, reason):
+        if not self.is_open:
+            return
+        self._close()
+        for callback in self.__on_close_callbacks:
+            callback(self, reason)
+
+
+class MemoryCallbacks(object):
+    """
+    Defines the queue of the callbacks of a blocking connection, run while processing the data events.
+    It stands in for the event loop of MemoryAsyncConnection, and can be fed by any thread.
+    """
+
+    def __init__(self):
+        self.__callbacks = collections.deque()
+        self.__condition = threading.Condition()
+
+    def call_soon_threadsafe(self, callback, *args):
+        with self.__condition:
+            self.__callbacks.append((callback, args))
+            self.__condition.notify()
+
+    def run(self, timeout=0):
+        """
+        Runs the callbacks pending, waiting for one at most timeout seconds if none is pending.
+
+        :param timeout: the maximum time to wait in seconds, None to wait indefinitely
+        :type timeout: float
+        """
+        with self.__condition:
+            if timeout != 0:
+                self.__condition.wait_for(lambda: self.__callbacks, timeout)
+            callbacks = list(self.__callbacks)
+            self.__callbacks.clear()
+
+        for callback, args in callbacks:
+            callback(*args)
+
+
+class MemoryBlockingConnection(object):
+    """
+    Implements a connection to the in-memory broker with the API of pika.BlockingConnection.
+    The in-memory broker never blocks the publishers.
+    """
+
+    def __init__(self, broker):
+        """
+        Initializes an open connection.
+
+        :param broker: the broker
+        :type broker: MemoryBroker
+        """
+        self.__callbacks = MemoryCallbacks()
+        self._impl = MemoryAsyncConnection(broker, self.__callbacks)
+
+    @property
+    def is_open(self):
+        return self._impl.is_open
+
+    @property
+    def is_closed(self):
+        return not self._impl.is_open
+
+    def channel(self, channel_number=None):
+        opened = []
+        self._impl.channel(channel_number, on_open_callback=opened.append)
+        while not opened:
+            self.process_data_events()
+        return MemoryBlockingChannel(self, opened[0])
+
+    def process_data_events(self, time_limit=0):
+        if not self._impl.is_open:
+            raise pika.exceptions.ConnectionWrongStateError('Connection is closed')
+        self.__callbacks.run(time_limit)
+
+    def sleep(self, duration):
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            self.process_data_events(time_limit=deadline - time.monotonic())
+
+    def add_on_connection_blocked_callback(self, callback):
+        pass
+
+    def add_on_connection_unblocked_callback(self, callback):
+        pass
+
+    def close(self, reply_code=200, reply_text='Normal shutdown'):
+        if not self._impl.is_open:
+            raise pika.exceptions.ConnectionWrongStateError('Connection is closed')
+        self._impl.close(reply_code, reply_text)
+        self.__callbacks.run()
+
+
+class MemoryBlockingChannel(object):
+    """
+    Implements a channel of the in-memory broker with the API of pika.adapters.blocking_connection.BlockingChannel,
+    waiting for the replies of the underlying MemoryAsyncChannel.
+    """
+
+    def __init__(self, connection, impl):
+        """
+        Initializes an open channel.
+
+        :param connection: the connection of the channel
+        :type connection: MemoryBlockingConnection
+
+        :param impl: the underlying asynchronous channel
+        :type impl: MemoryAsyncChannel
+        """
+        self.connection = connection
+        self._impl = impl
+        self._impl.add_on_close_callback(self.__on_closed)
+
+        self.__closing_reason = None
+        self.__consumer_tag = None
+        self.__deliveries = collections.deque()
+
+    @property
+    def channel_number(self):
+        return self._impl.channel_number
+
+    @property
+    def is_open(self):
+        return self._impl.is_open
+
+    @property
+    def is_closed(self):
+        return not self._impl.is_open
+
+    def close(self, reply_code=0, reply_text='Normal shutdown'):
+        self._impl.close(reply_code, reply_text)
+        self.connection.process_data_events()
+
+    def queue_declare(self, queue, passive=False, durable=False, exclusive=False, auto_delete=False,
+                      arguments=None):
+        return self.__call(self._impl.queue_declare, queue=queue, passive=passive, durable=durable)
+
+    def queue_delete(self, queue, if_unused=False, if_empty=False):
+        return self.__call(self._impl.queue_delete, queue=queue)
+
+    def queue_purge(self, queue):
+        return self.__call(self._impl.queue_purge, queue=queue)
+
+    def basic_qos(self, prefetch_size=0, prefetch_count=0, global_qos=False):
+        self.__call(self._impl.basic_qos, prefetch_count=prefetch_count)
+
+    def basic_publish(self, exchange, routing_key, body, properties=None, mandatory=False):
+        self._impl.basic_publish(exchange, routing_key, body, properties)
+
+    def tx_select(self):
+        return self.__call(self._impl.tx_select)
+
+    def tx_commit(self):
+        return self.__call(self._impl.tx_commit)
+
+    def tx_rollback(self):
+        return self.__call(self._impl.tx_rollback)
+
+    def basic_ack(self, delivery_tag=0, multiple=False):
+        self._impl.basic_ack(delivery_tag, multiple)
+        self.connection.process_data_events()
+
+    def basic_nack(self, delivery_tag=0, multiple=False, requeue=True):
+        self._impl.basic_nack(delivery_tag, multiple, requeue)
+        self.connection.process_data_events()
+
+    def consume(self, queue, inactivity_timeout=None):
+        """
+        Consumes the queue, yielding (None, None, None) after inactivity_timeout seconds without messages.
+        The consumer is kept across the calls until cancel().
+        """
+        if self.__consumer_tag is None:
+            self.__consumer_tag = self._impl.basic_consume(
+                queue=queue,
+                on_message_callback=lambda _, method, properties, body: self.__deliveries.append(
+                    (method, properties, body),
+                ),
+            )
+
+        while self.__consumer_tag is not None:
+            deadline = None if inactivity_timeout is None else time.monotonic() + inactivity_timeout
+            while not self.__deliveries:
+                self.__check_open()
+                if deadline is not None and time.monotonic() >= deadline:
+                    break
+                self.connection.process_data_events(
+                    time_limit=None if deadline is None else deadline - time.monotonic(),
+                )
+
+            if self.__deliveries:
+                yield self.__deliveries.popleft()
+            else:
+                yield None, None, None
+
+    def cancel(self):
+        """
+        Cancels the consumer, requeueing the messages delivered but not consumed.
+
+        :return: the number of messages requeued
+        :rtype: int
+        """
+        if self.__consumer_tag is None:
+            return 0
+
+        self.__call(self._impl.basic_cancel, consumer_tag=self.__consumer_tag)
+        self.__consumer_tag = None
+
+        self.connection.process_data_events()
+        requeued_messages_number = len(self.__deliveries)
+        while self.__deliveries:
+            method, _, _ = self.__deliveries.popleft()
+            self._impl.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
+        return requeued_messages_number
+
+    def __call(self, method, **kwargs):
+        """
+        Calls a method of the underlying channel, waiting for the reply.
+
+        :return: the reply frame
+        :rtype: pika.frame.Method
+
+        :raises pika.exceptions.ChannelClosed: if the channel is closed before the reply
+        """
+        self.__check_open()
+
+        replies = []
+        method(callback=replies.append, **kwargs)
+        while not replies:
+            self.__check_open()
+            self.connection.process_data_events()
+        return replies[0]
+
+    def __check_open(self):
+        if self.__closing_reason is not None:
+            raise self.__closing_reason
+        if not self._impl.is_open:
+            raise pika.exceptions.ChannelWrongStateError('Channel is closed.')
+
+    def __on_closed(self, channel, reason):
+        if isinstance(reason, pika.exceptions.ChannelClosedByBroker):
+            self.__closing_reason = reason
+        self.__consumer_tag = None
+
+
+def get_not_found_error(queue_name):
+    """
+    Gets the error of the broker for a missing queue.
+
+    :param queue_name: the queue name
+    :type queue_name: str
+
+    :return: the error
+    :rtype: pika.exceptions.ChannelClosedByBroker
+    """
+    return pika.exceptions.ChannelClosedByBroker(404, "NOT_FOUND - no queue '{}' in vhost '/'".format(queue_name))
@@ -0,0 +1,153 @@
+import json
+import zlib
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:
+    cbor2 = None
+
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+
+JSON_CONTENT_TYPE = 'application/json'
+MSGPACK_CONTENT_TYPE = 'application/msgpack'
+CBOR_CONTENT_TYPE = 'application/cbor'
+
+ZLIB_CONTENT_ENCODING = 'zlib'
+LZ4_CONTENT_ENCODING = 'lz4'
+
+COMPRESSION_THRESHOLD = 16384
+
+
+class MessageCodec(object):
+    """
+    Implements the encoding of the message bodies, according to their content type and content encoding.
+    """
+
+    def __init__(
+            self,
+            content_type=JSON_CONTENT_TYPE,
+            content_encoding=None,
+            compression_threshold=COMPRESSION_THRESHOLD,
+    ):
+        """
+        Initializes the codec.
+
+        :param content_type: the format of the encoded messages, 'application/json' | 'application/msgpack' |
+         'application/cbor'
+        :type content_type: str
+
+        :param content_encoding: the compression of the encoded messages, 'zlib' | 'lz4', None otherwise
+        :type content_encoding: str
+
+        :param compression_threshold: the minimum size in bytes of the compressed bodies
+        :type compression_threshold: int
+
+        :raises ValueError: if the content type or the content encoding is not supported
+        """
+        serialize, _ = get_serializer(content_type)
+        if content_encoding is not None:
+            get_compressor(content_encoding)
+
+        self.content_type = content_type
+        self.content_encoding = content_encoding
+        self.__serialize = serialize
+        self.__compression_threshold = compression_threshold
+
+    def encode(self, message):
+        """
+        Encodes a message.
+        The messages already serialized as JSON bytes are only compressed.
+
+        :param message: the message
+        :type message: object | bytes
+
+        :return: the body, its content type and its content encoding, None if not compressed
+        :rtype: (bytes, str, str)
+        """
+        if isinstance(message, bytes):
+            body = message
+            content_type = JSON_CONTENT_TYPE
+        else:
+            body = self.__serialize(message)
+            content_type = self.content_type
+
+        if self.content_encoding is None or len(body) < self.__compression_threshold:
+            return body, content_type, None
+
+        compress, _ = get_compressor(self.content_encoding)
+        return compress(body), content_type, self.content_encoding
+
+    @staticmethod
+    def decode(body, content_type, content_encoding):
+        """
+        Decodes a message, according to the properties it was published with.
+
+        :param body: the body
+        :type body: bytes
+
+        :param content_type: the content type of the body, None for JSON
+        :type content_type: str
+
+        :param content_encoding: the content encoding of the body, None if not compressed
+        :type content_encoding: str
+
+        :return: the message
+        :rtype: object
+
+        :raises ValueError: if the content type or the content encoding is not supported
+        """
+        if content_encoding is not None:
+            _, decompress = get_compressor(content_encoding)
+            body = decompress(body)
+
+        _, deserialize = get_serializer(content_type or JSON_CONTENT_TYPE)
+        return deserialize(body)
+
+
+def get_serializer(content_type):
+    """
+    Gets the functions serializing and deserializing a content type.
+
+    :param content_type: the content type
+    :type content_type: str
+
+    :return: the serialization and deserialization functions
+    :rtype: ((object) -> bytes, (bytes) -> object)
+
+    :raises ValueError: if the content type is not supported
+    """
+    if content_type == JSON_CONTENT_TYPE:
+        return lambda message: json.dumps(message).encode(), json.loads
+    elif content_type == MSGPACK_CONTENT_TYPE and msgpack is not None:
+        return msgpack.packb, msgpack.unpackb
+    elif content_type == CBOR_CONTENT_TYPE and cbor2 is not None:
+        return cbor2.dumps, cbor2.loads
+    raise ValueError('Content type {} not supported'.format(content_type))
+
+
+def get_compressor(content_encoding):
+    """
+    Gets the functions compressing and decompressing a content encoding.
+
+    :param content_encoding: the content encoding
+    :type content_encoding: str
+
+    :return: the compression and decompression functions
+    :rtype: ((bytes) -> bytes, (bytes) -> bytes)
+
+    :raises ValueError: if the content encoding is not supported
+    """
+    if content_encoding == ZLIB_CONTENT_ENCODING:
+        return zlib.compress, zlib.decompress
+    elif content_encoding == LZ4_CONTENT_ENCODING and lz4 is not None:
+        return lz4.frame.compress, lz4.frame.decompress
+    raise ValueError('Content encoding {} not supported'.format(content_encoding))
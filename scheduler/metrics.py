@@ -0,0 +1,328 @@
+import abc
+import bisect
+import collections
+import contextlib
+import functools
+import threading
+import time
+
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+SERIES_NUMBER = 1000
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Metric(object, metaclass=abc.ABCMeta):
+    """
+    Defines a metric in the Prometheus format, with a series of values for each combination of label values.
+    At most SERIES_NUMBER series are kept, forgetting the least recently updated ones,
+    so the labels with unbounded values (e.g. the queue names) do not grow the memory indefinitely.
+    """
+
+    type = None
+
+    def __init__(
+            self,
+            name,
+            documentation,
+            label_names=(),
+    ):
+        """
+        Initializes the metric.
+
+        :param name: the name of the metric
+        :type name: str
+
+        :param documentation: the description of the metric
+        :type documentation: str
+
+        :param label_names: the names of the labels
+        :type label_names: collections.abc.Sequence[str]
+        """
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+
+        self._series = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def render(self):
+        """
+        Renders the metric in the Prometheus text format.
+
+        :return: the lines of the metric
+        :rtype: list[str]
+        """
+        lines = [
+            '# HELP {} {}'.format(self.name, self.documentation.replace('\\', r'\\').replace('\n', r'\n')),
+            '# TYPE {} {}'.format(self.name, self.type),
+        ]
+        with self._lock:
+            series = [(label_values, list(values)) for label_values, values in self._series.items()]
+        for label_values, values in series:
+            lines += self._render_series(dict(zip(self.label_names, label_values)), values)
+        return lines
+
+    def _update(self, label_values, update):
+        """
+        Updates the series of the label values, creating it if missing.
+
+        :param label_values: the values of the labels, in the order of the label names
+        :type label_values: tuple
+
+        :param update: the function updating the values of the series in place
+        :type update: (list) -> None
+        """
+        with self._lock:
+            values = self._series.get(label_values)
+            if values is None:
+                values = self._series[label_values] = self._create_values()
+                if len(self._series) > SERIES_NUMBER:
+                    self._series.popitem(last=False)
+            elif len(self._series) > 1:
+                self._series.move_to_end(label_values)
+            update(values)
+
+    @abc.abstractmethod
+    def _create_values(self):
+        """
+        Creates the values of a new series.
+
+        :return: the values, updated in place
+        :rtype: list
+        """
+        pass
+
+    @abc.abstractmethod
+    def _render_series(self, labels, values):
+        """
+        Renders a series in the Prometheus text format.
+
+        :param labels: the labels of the series in the form {name: value}
+        :type labels: dict[str, str]
+
+        :param values: the values of the series
+        :type values: list
+
+        :return: the lines of the series
+        :rtype: list[str]
+        """
+        pass
+
+
+class Counter(Metric):
+    """
+    Defines a counter, a value only increasing.
+    """
+
+    type = 'counter'
+
+    def inc(self, amount=1, label_values=()):
+        """
+        Increments the counter.
+
+        :param amount: the increment
+        :type amount: float
+
+        :param label_values: the values of the labels, in the order of the label names
+        :type label_values: tuple
+        """
+        def update(values):
+            values[0] += amount
+        self._update(label_values, update)
+
+    def _create_values(self):
+        return [0]
+
+    def _render_series(self, labels, values):
+        return ['{}{} {}'.format(self.name, format_labels(labels), values[0])]
+
+
+class Histogram(Metric):
+    """
+    Defines a histogram, counting the observations in cumulative buckets.
+    """
+
+    type = 'histogram'
+
+    def __init__(
+            self,
+            name,
+            documentation,
+            label_names=(),
+            buckets=LATENCY_BUCKETS,
+    ):
+        """
+        Initializes the histogram.
+
+        :param buckets: the upper bounds of the buckets, in ascending order
+        :type buckets: collections.abc.Sequence[float]
+        """
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, label_values=()):
+        """
+        Observes a value.
+
+        :param value: the value, e.g. a duration in seconds
+        :type value: float
+
+        :param label_values: the values of the labels, in the order of the label names
+        :type label_values: tuple
+        """
+        index = bisect.bisect_left(self.buckets, value)
+
+        def update(values):
+            values[index] += 1
+            values[-1] += value
+        self._update(label_values, update)
+
+    @contextlib.contextmanager
+    def time(self, *label_values):
+        """
+        Observes the duration of a block in seconds.
+
+        :param label_values: the values of the labels, in the order of the label names
+        :type label_values: tuple
+        """
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start_time, label_values)
+
+    def timed(self, *label_values):
+        """
+        Decorates a function, observing the duration of its calls in seconds.
+
+        :param label_values: the values of the labels, in the order of the label names
+        :type label_values: tuple
+
+        :return: the decorator
+        :rtype: (collections.abc.Callable) -> collections.abc.Callable
+        """
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                start_time = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    self.observe(time.perf_counter() - start_time, label_values)
+            return wrapper
+        return decorator
+
+    def _create_values(self):
+        # The count of each bucket, then of the values above the last bucket, then the sum.
+        return [0] * (len(self.buckets) + 2)
+
+    def _render_series(self, labels, values):
+        lines = []
+        count = 0
+        for bucket, bucket_count in zip(self.buckets + (float('inf'),), values):
+            count += bucket_count
+            bucket_labels = dict(labels, le='+Inf' if bucket == float('inf') else repr(float(bucket)))
+            lines.append('{}_bucket{} {}'.format(self.name, format_labels(bucket_labels), count))
+        lines.append('{}_sum{} {}'.format(self.name, format_labels(labels), repr(float(values[-1]))))
+        lines.append('{}_count{} {}'.format(self.name, format_labels(labels), count))
+        return lines
+
+
+class MetricsRegistry(object):
+    """
+    Collects the metrics exposed together.
+    """
+
+    def __init__(self):
+        self.__metrics = []
+
+    def counter(self, name, documentation, label_names=()):
+        counter = Counter(name, documentation, label_names)
+        self.__metrics.append(counter)
+        return counter
+
+    def histogram(self, name, documentation, label_names=(), buckets=LATENCY_BUCKETS):
+        histogram = Histogram(name, documentation, label_names, buckets)
+        self.__metrics.append(histogram)
+        return histogram
+
+    def render(self):
+        """
+        Renders all the metrics in the Prometheus text format.
+
+        :return: the text
+        :rtype: str
+        """
+        lines = []
+        for metric in self.__metrics:
+            lines += metric.render()
+        return '\n'.join(lines) + '\n'
+
+
+def format_labels(labels):
+    """
+    Formats the labels of a series in the Prometheus text format.
+
+    :param labels: the labels in the form {name: value}
+    :type labels: dict[str, object]
+
+    :return: the labels, e.g. '{queue="gpfunction@learner.tasks"}', empty if none
+    :rtype: str
+    """
+    if not labels:
+        return ''
+    return '{{{}}}'.format(','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n'))
+        for name, value in labels.items()
+    ))
+
+
+REGISTRY = MetricsRegistry()
+
+JOB_STAGE_SECONDS = REGISTRY.histogram(
+    'scheduler_job_stage_seconds',
+    'Time spent in each stage of a job submission.',
+    ['stage'],
+)
+AMQP_OPERATION_SECONDS = REGISTRY.histogram(
+    'scheduler_amqp_operation_seconds',
+    'Time spent in each operation of the AMQP manager.',
+    ['operation'],
+)
+AMQP_SERIALIZE_SECONDS = REGISTRY.histogram(
+    'scheduler_amqp_serialize_seconds',
+    'Time spent generating and encoding a chunk of streamed messages.',
+)
+AMQP_PUBLISH_SECONDS = REGISTRY.histogram(
+    'scheduler_amqp_publish_seconds',
+    'Time spent publishing a batch of messages, waiting for the confirmations if any.',
+)
+AMQP_PUBLISHED_MESSAGES = REGISTRY.counter(
+    'scheduler_amqp_published_messages_total',
+    'Number of messages published.',
+    ['queue'],
+)
+AMQP_PUBLISHED_BYTES = REGISTRY.counter(
+    'scheduler_amqp_published_bytes_total',
+    'Number of bytes of the message bodies published.',
+    ['queue'],
+)
+TASKS_CACHE_LOOKUPS = REGISTRY.counter(
+    'scheduler_tasks_cache_lookups_total',
+    'Number of lookups of serialized tasks in the cache, by result.',
+    ['result'],
+)
+SPOOL_APPENDED_MESSAGES = REGISTRY.counter(
+    'scheduler_spool_appended_messages_total',
+    'Number of tasks written to the spool.',
+)
+SPOOL_DRAINED_MESSAGES = REGISTRY.counter(
+    'scheduler_spool_drained_messages_total',
+    'Number of tasks of the spool published and confirmed by the broker.',
+)
+SPOOL_DRAIN_FAILURES = REGISTRY.counter(
+    'scheduler_spool_drain_failures_total',
+    'Number of batches of the spool failed to publish, retried later.',
+)
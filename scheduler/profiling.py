@@ -0,0 +1,210 @@
+import collections
+import contextlib
+import contextvars
+import cProfile
+import io
+import marshal
+import pstats
+import sys
+import threading
+import time
+import uuid
+
+
+PROFILES_NUMBER = 20
+PRINTED_FUNCTIONS_NUMBER = 50
+
+# Since Python 3.12 a profiler sees the calls of all the threads, and only one can be enabled at once.
+PROCESS_WIDE_PROFILER = sys.version_info >= (3, 12)
+
+current_session = contextvars.ContextVar('current_session', default=None)
+profiled_thread = threading.local()
+
+
+class ProfileSession(object):
+    """
+    Defines the profiling of an operation spanning many threads, e.g. a job submission.
+    Each thread joining the session is profiled separately, and the profiles are merged at the end.
+    With a process-wide profiler, the profile of the first thread covers the other ones,
+    and the calls of the unrelated threads running meanwhile.
+    """
+
+    def __init__(self, name):
+        """
+        Initializes the session.
+
+        :param name: the name of the profiled operation
+        :type name: str
+        """
+        self.session_id = uuid.uuid4().hex
+        self.name = name
+        self.created = time.time()
+        self.seconds = None
+
+        self.__profiles = []
+        self.__lock = threading.Lock()
+
+    @property
+    def is_profiled(self):
+        with self.__lock:
+            return bool(self.__profiles)
+
+    @contextlib.contextmanager
+    def profile(self):
+        """
+        Profiles the current thread within the block, as part of the session.
+        The threads started in the block with a copy of the context join the session by call().
+        If another profiler is already enabled, e.g. the one of a concurrent session, the block runs without profiling.
+        """
+        profile = cProfile.Profile()
+        token = current_session.set(self)
+        profiled_thread.active = True
+        start_time = time.perf_counter()
+        try:
+            profile.enable()
+        except ValueError:
+            profile = None
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+            profiled_thread.active = False
+            current_session.reset(token)
+            with self.__lock:
+                if profile is not None:
+                    self.__profiles.append(profile)
+                self.seconds = max(self.seconds or 0, time.perf_counter() - start_time)
+
+    def get_stats(self):
+        """
+        Gets the statistics merged from all the threads.
+
+        :return: the statistics, None if not profiled
+        :rtype: pstats.Stats
+        """
+        with self.__lock:
+            profiles = list(self.__profiles)
+        if not profiles:
+            return None
+
+        stats = pstats.Stats(profiles[0], stream=io.StringIO())
+        for profile in profiles[1:]:
+            stats.add(profile)
+        return stats
+
+    def to_dict(self):
+        return {
+            'profile_id': self.session_id,
+            'name': self.name,
+            'created': self.created,
+            'seconds': self.seconds,
+        }
+
+
+class ProfileStore(object):
+    """
+    Keeps the most recent profiles.
+    """
+
+    def __init__(self, profiles_number=PROFILES_NUMBER):
+        """
+        Initializes the store.
+
+        :param profiles_number: the number of most recent profiles to keep
+        :type profiles_number: int
+        """
+        self.__sessions = collections.OrderedDict()
+        self.__profiles_number = profiles_number
+        self.__lock = threading.Lock()
+
+    def add(self, session):
+        """
+        Adds the profile of a session, forgetting the oldest one if full.
+
+        :param session: the finished session
+        :type session: ProfileSession
+        """
+        with self.__lock:
+            self.__sessions[session.session_id] = session
+            while len(self.__sessions) > self.__profiles_number:
+                self.__sessions.popitem(last=False)
+
+    def get(self, profile_id):
+        """
+        Gets a profile.
+
+        :param profile_id: the identifier of the profile
+        :type profile_id: str
+
+        :return: the session, None if unknown
+        :rtype: ProfileSession
+        """
+        with self.__lock:
+            return self.__sessions.get(profile_id)
+
+    def list(self):
+        """
+        Lists the profiles, from the most recent.
+
+        :return: the profiles in the form {'profile_id': str, 'name': str, 'created': float, 'seconds': float}
+        :rtype: list[dict[str, object]]
+        """
+        with self.__lock:
+            sessions = list(self.__sessions.values())
+        return [session.to_dict() for session in reversed(sessions)]
+
+
+def call(function, *args, **kwargs):
+    """
+    Calls a function, profiling it if the context belongs to a session and the thread is not profiled yet.
+    The threads serving a session, e.g. the I/O thread of a manager, run their work through it
+    with a copy of the context of the caller.
+    With a process-wide profiler the thread is already profiled by the session, so the function is only called.
+
+    :param function: the function
+    :type function: collections.abc.Callable
+
+    :return: the result of the function
+    """
+    session = current_session.get()
+    if session is None or PROCESS_WIDE_PROFILER or getattr(profiled_thread, 'active', False):
+        return function(*args, **kwargs)
+
+    with session.profile():
+        return function(*args, **kwargs)
+
+
+def dump_stats(stats):
+    """
+    Dumps the statistics in the binary format of pstats, the one of cProfile -o.
+
+    :param stats: the statistics
+    :type stats: pstats.Stats
+
+    :return: the binary statistics
+    :rtype: bytes
+    """
+    return marshal.dumps(stats.stats)
+
+
+def print_stats(stats, sort_key='cumulative', functions_number=PRINTED_FUNCTIONS_NUMBER):
+    """
+    Prints the statistics of the most expensive functions as text.
+
+    :param stats: the statistics
+    :type stats: pstats.Stats
+
+    :param sort_key: the sort key of pstats, e.g. 'cumulative' or 'tottime'
+    :type sort_key: str
+
+    :param functions_number: the number of functions printed
+    :type functions_number: int
+
+    :return: the text
+    :rtype: str
+    """
+    stream = io.StringIO()
+    stats.stream = stream
+    stats.sort_stats(sort_key).print_stats(functions_number)
+    return stream.getvalue()
@@ -0,0 +1,131 @@
+import collections
+import threading
+import time
+
+
+STATISTICS_TTL = 1
+STATISTICS_CACHE_SIZE = 10000
+
+
+class QueuesStatisticsCache(object):
+    """
+    Implements a short-lived cache of the queues statistics.
+    The concurrent requests of the same queues wait for a single retrieval.
+    The expired statistics are dropped at each retrieval, and at most size queues are kept.
+    """
+
+    def __init__(
+            self,
+            get_queues_statistics,
+            ttl=STATISTICS_TTL,
+            size=STATISTICS_CACHE_SIZE,
+    ):
+        """
+        Initializes the cache.
+
+        :param get_queues_statistics: the function retrieving the statistics of a list of queues
+        :type get_queues_statistics: (list[str]) -> dict[str, dict[str, int]]
+
+        :param ttl: the time to live of the statistics in seconds
+        :type ttl: float
+
+        :param size: the maximum number of queues kept
+        :type size: int
+        """
+        self.__get_queues_statistics = get_queues_statistics
+        self.__ttl = ttl
+        self.__size = size
+
+        # The statistics in the order of their expiration, as they all live for the same time.
+        self.__statistics = collections.OrderedDict()
+        self.__retrievals = {}
+        self.__lock = threading.Lock()
+
+    def get(self, queue_names):
+        """
+        Gets the statistics of the queues, retrieving the ones expired or missing.
+
+        :param queue_names: the queue names
+        :type queue_names: list[str]
+
+        :return: the statistics in the form {queue_name: statistics}
+        :rtype: dict[str, dict[str, int]]
+        """
+        retrieved_queue_names = []
+        retrievals = set()
+        with self.__lock:
+            for queue_name in queue_names:
+                if self.__get_fresh(queue_name) is not None:
+                    continue
+                if queue_name in self.__retrievals:
+                    retrievals.add(self.__retrievals[queue_name])
+                else:
+                    retrieved_queue_names.append(queue_name)
+
+            retrieval = threading.Event()
+            for queue_name in retrieved_queue_names:
+                self.__retrievals[queue_name] = retrieval
+
+        if retrieved_queue_names:
+            try:
+                self.__retrieve(retrieved_queue_names)
+            finally:
+                with self.__lock:
+                    for queue_name in retrieved_queue_names:
+                        del self.__retrievals[queue_name]
+                retrieval.set()
+
+        for other_retrieval in retrievals:
+            other_retrieval.wait()
+
+        # Retrieves the statistics missing after a failed retrieval of another request.
+        with self.__lock:
+            statistics = {queue_name: self.__get_fresh(queue_name) for queue_name in queue_names}
+        missing_queue_names = [queue_name for queue_name, entry in statistics.items() if entry is None]
+        if missing_queue_names:
+            self.__retrieve(missing_queue_names)
+            with self.__lock:
+                statistics.update({queue_name: self.__get_fresh(queue_name) for queue_name in missing_queue_names})
+
+        return {queue_name: entry[0] for queue_name, entry in statistics.items()}
+
+    def __retrieve(self, queue_names):
+        """
+        Retrieves the statistics of the queues and stores them, dropping the expired ones and the oldest ones
+        beyond the size.
+
+        :param queue_names: the queue names
+        :type queue_names: list[str]
+        """
+        statistics = self.__get_queues_statistics(queue_names)
+        now = time.monotonic()
+        expiration_time = now + self.__ttl
+        with self.__lock:
+            for queue_name in queue_names:
+                self.__statistics[queue_name] = (statistics.get(queue_name), expiration_time)
+                self.__statistics.move_to_end(queue_name)
+
+            while self.__statistics:
+                _, oldest_expiration_time = next(iter(self.__statistics.values()))
+                if now < oldest_expiration_time and len(self.__statistics) <= self.__size:
+                    break
+                self.__statistics.popitem(last=False)
+
+    def __get_fresh(self, queue_name):
+        """
+        Gets the entry of a queue if not expired, to call holding the lock.
+
+        :param queue_name: the queue name
+        :type queue_name: str
+
+        :return: the entry in the form (statistics,), None if expired or missing
+        :rtype: (dict[str, int],)
+        """
+        if queue_name not in self.__statistics:
+            return None
+
+        statistics, expiration_time = self.__statistics[queue_name]
+        if time.monotonic() >= expiration_time:
+            del self.__statistics[queue_name]
+            return None
+        return statistics,
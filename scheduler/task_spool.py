@@ -0,0 +1,624 @@
+import errno
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import zlib
+
+import pika
+
+from scheduler import metrics
+
+
+SEGMENT_SIZE = 64 * 1024 * 1024
+BATCH_SIZE = 1000
+RETRY_INTERVAL = 5
+ALLOCATION_CHUNK_SIZE = 1024 * 1024
+STAGING_SIZE = 4 * 1024 * 1024
+
+SEGMENT_NAME = '{:020d}.segment'
+SEGMENT_SUFFIX = '.segment'
+CHECKPOINT_NAME = 'checkpoint'
+
+# A record is a header (type, queue name length, body length, CRC-32 of the name and the body),
+# the queue name and the body. A zero type marks the end of the records of a segment.
+RECORD_HEADER = struct.Struct('<BHII')
+TASK_RECORD = 1
+COMMIT_RECORD = 2
+CHECKPOINT = struct.Struct('<QQ')
+# A staged record is a header (queue name length, body length), the queue name and the body.
+STAGED_RECORD_HEADER = struct.Struct('<HI')
+
+logger = logging.getLogger(__name__)
+
+
+class SpoolSegment(object):
+    """
+    Defines a segment of the spool, a file of fixed size mapped in memory and filled with records.
+    """
+
+    def __init__(
+            self,
+            directory,
+            sequence,
+            size=None,
+    ):
+        """
+        Opens the segment, creating it filled with zeros if the size is given.
+        The blocks of a new segment are allocated at once, so a full disk fails here with an OSError,
+        rather than with a SIGBUS when the mapped memory is written.
+
+        :param directory: the directory of the spool
+        :type directory: str
+
+        :param sequence: the sequence number of the segment
+        :type sequence: int
+
+        :param size: the size of the new segment in bytes, None to open an existing one
+        :type size: int
+        """
+        self.sequence = sequence
+        self.path = os.path.join(directory, SEGMENT_NAME.format(sequence))
+
+        with open(self.path, 'r+b' if size is None else 'w+b') as segment_file:
+            if size is not None:
+                try:
+                    allocate(segment_file, size)
+                except BaseException:
+                    os.remove(self.path)
+                    raise
+            self.size = os.fstat(segment_file.fileno()).st_size
+            self.__map = mmap.mmap(segment_file.fileno(), self.size)
+
+    def write(self, offset, record_type, queue_name=b'', body=b''):
+        """
+        Writes a record.
+
+        :param offset: the offset of the record
+        :type offset: int
+
+        :param record_type: the type of the record, TASK_RECORD or COMMIT_RECORD
+        :type record_type: int
+
+        :param queue_name: the encoded queue name
+        :type queue_name: bytes
+
+        :param body: the body of the message
+        :type body: bytes
+
+        :return: the offset after the record
+        :rtype: int
+        """
+        checksum = zlib.crc32(body, zlib.crc32(queue_name))
+        RECORD_HEADER.pack_into(self.__map, offset, record_type, len(queue_name), len(body), checksum)
+        offset += RECORD_HEADER.size
+        self.__map[offset:offset + len(queue_name)] = queue_name
+        offset += len(queue_name)
+        self.__map[offset:offset + len(body)] = body
+        return offset + len(body)
+
+    def read(self, offset):
+        """
+        Reads a record.
+
+        :param offset: the offset of the record
+        :type offset: int
+
+        :return: the type, the queue name and the body of the record and the offset after it,
+         None at the end of the records or on a corrupted record
+        :rtype: (int, str, bytes, int)
+        """
+        if offset + RECORD_HEADER.size > self.size:
+            return None
+        record_type, queue_name_length, body_length, checksum = RECORD_HEADER.unpack_from(self.__map, offset)
+        offset += RECORD_HEADER.size
+        end_offset = offset + queue_name_length + body_length
+        if record_type not in (TASK_RECORD, COMMIT_RECORD) or end_offset > self.size:
+            return None
+
+        queue_name = self.__map[offset:offset + queue_name_length]
+        body = self.__map[offset + queue_name_length:end_offset]
+        if zlib.crc32(body, zlib.crc32(queue_name)) != checksum:
+            return None
+        return record_type, queue_name.decode(), body, end_offset
+
+    def has_room(self, offset, size):
+        return offset + size <= self.size
+
+    def clear(self, offset, end_offset=None):
+        """
+        Fills the segment with zeros from the offset, discarding the records not committed.
+
+        :param offset: the start of the range
+        :type offset: int
+
+        :param end_offset: the end of the range, None for the end of the segment
+        :type end_offset: int
+        """
+        end_offset = self.size if end_offset is None else end_offset
+        self.__map[offset:end_offset] = bytes(end_offset - offset)
+
+    def flush(self, start_offset, end_offset):
+        """
+        Writes the modified range to the disk.
+        """
+        start_offset -= start_offset % mmap.ALLOCATIONGRANULARITY
+        self.__map.flush(start_offset, end_offset - start_offset)
+
+    def close(self):
+        self.__map.close()
+
+    def delete(self):
+        self.close()
+        os.remove(self.path)
+
+
+class TaskSpool(object):
+    """
+    Implements a durable spool of tasks, written to the disk before being published.
+    The tasks are appended to segment files mapped in memory, and the tasks of an append are published only
+    once all written. A background drainer publishes them in batches with publisher confirms, saving the position
+    of the last confirmed batch, so a restarted spool resumes from it.
+    The tasks are published at least once: the batch interrupted by a failure or a restart is published again.
+    """
+
+    def __init__(
+            self,
+            directory,
+            connect,
+            segment_size=SEGMENT_SIZE,
+            batch_size=BATCH_SIZE,
+            retry_interval=RETRY_INTERVAL,
+            staging_size=STAGING_SIZE,
+    ):
+        """
+        Initializes the spool, recovering the tasks not yet published, and starts the drainer.
+
+        :param directory: the directory of the segment files
+        :type directory: str
+
+        :param connect: the function connecting a manager for the drainer
+        :type connect: () -> scheduler.amqp_manager.AMQPManager
+
+        :param segment_size: the size of the segment files in bytes
+        :type segment_size: int
+
+        :param batch_size: the maximum number of tasks published in a batch
+        :type batch_size: int
+
+        :param retry_interval: the time in seconds waited before publishing again after a failure
+        :type retry_interval: float
+
+        :param staging_size: the size in bytes of the tasks of an append kept in memory before taking the lock,
+         the next ones being staged in a temporary file
+        :type staging_size: int
+        """
+        self.__directory = directory
+        self.__connect = connect
+        self.__segment_size = segment_size
+        self.__batch_size = batch_size
+        self.__retry_interval = retry_interval
+        self.__staging_size = staging_size
+
+        self.last_error = None
+        self.__failing = False
+
+        self.__segments = {}
+        self.__append_lock = threading.Lock()
+        self.__lock = threading.Lock()
+        self.__changed = threading.Condition(self.__lock)
+        self.__stopped = threading.Event()
+
+        os.makedirs(directory, exist_ok=True)
+        self.__recover()
+
+        self.__drainer = threading.Thread(target=self.__drain, daemon=True)
+        self.__drainer.start()
+
+    def append(self, messages):
+        """
+        Appends tasks to the spool, returning once they are written to the disk.
+        The tasks of an append are all published, or none if interrupted before the end.
+
+        :param messages: the tasks serialized as JSON, in the form (queue_name, body)
+        :type messages: collections.abc.Iterable[(str, bytes)]
+
+        :return: the number of tasks appended
+        :rtype: int
+        """
+        # Generates the tasks before taking the lock, so the appends only wait for each other to copy the records,
+        # staging them in a temporary file beyond the staging size so a large job is not held in memory.
+        with StagedRecords(self.__directory, self.__staging_size) as records:
+            for queue_name, body in messages:
+                records.add(queue_name.encode(), body)
+
+            return self.__append_records(records)
+
+    def __append_records(self, records):
+        """
+        Appends the records of the tasks staged and commits them.
+
+        :param records: the records in the form (queue_name, body)
+        :type records: StagedRecords
+
+        :return: the number of tasks appended
+        :rtype: int
+        """
+        # The appends are serialized, while the drainer keeps publishing the committed tasks.
+        with self.__append_lock:
+            sequence, offset = self.__committed
+            segment = self.__segments[sequence]
+            flushed = [(segment, offset)]
+
+            messages_number = 0
+            try:
+                for queue_name, body in records:
+                    segment, offset = self.__reserve(segment, offset, len(queue_name) + len(body), flushed)
+                    offset = segment.write(offset, TASK_RECORD, queue_name, body)
+                    messages_number += 1
+                segment, offset = self.__reserve(segment, offset, 0, flushed)
+                offset = segment.write(offset, COMMIT_RECORD)
+
+                for flushed_segment, start_offset in flushed:
+                    flushed_segment.flush(start_offset, offset if flushed_segment is segment else flushed_segment.size)
+            except BaseException:
+                # Discards the tasks of the interrupted append.
+                with self.__lock:
+                    self.__discard(sequence, self.__committed[1], offset if segment.sequence == sequence else None)
+                raise
+
+            with self.__changed:
+                self.__committed = (segment.sequence, offset)
+                self.__changed.notify_all()
+
+        metrics.SPOOL_APPENDED_MESSAGES.inc(messages_number)
+        return messages_number
+
+    @property
+    def is_draining(self):
+        """
+        Checks if the drainer is running, even if failing to publish.
+
+        :return: True if running, False otherwise
+        :rtype: bool
+        """
+        return self.__drainer.is_alive()
+
+    def get_status(self):
+        """
+        Gets the status of the spool.
+
+        :return: the status in the form {'draining': bool, 'drained': bool, 'failing': bool, 'last_error': str},
+         failing if the last batch failed to publish
+        :rtype: dict[str, object]
+        """
+        with self.__lock:
+            drained = self.__drained == self.__committed
+        last_error = self.last_error
+        return {
+            'draining': self.is_draining,
+            'drained': drained,
+            'failing': self.__failing,
+            'last_error': None if last_error is None else repr(last_error),
+        }
+
+    def wait_drained(self, timeout=None):
+        """
+        Waits for all the appended tasks to be published.
+
+        :param timeout: the maximum time to wait in seconds, None to wait indefinitely
+        :type timeout: float
+
+        :return: True if drained, False on timeout
+        :rtype: bool
+        """
+        with self.__changed:
+            return self.__changed.wait_for(lambda: self.__drained == self.__committed, timeout)
+
+    def close(self):
+        """
+        Stops the drainer and closes the segment files, keeping the tasks not published for the next start.
+        """
+        self.__stopped.set()
+        with self.__changed:
+            self.__changed.notify_all()
+        self.__drainer.join()
+
+        with self.__lock:
+            for segment in self.__segments.values():
+                segment.close()
+            self.__segments.clear()
+
+    def __recover(self):
+        """
+        Opens the segments, resuming from the checkpoint and discarding the tasks of the interrupted appends.
+        """
+        sequences = sorted(
+            int(name[:-len(SEGMENT_SUFFIX)])
+            for name in os.listdir(self.__directory) if name.endswith(SEGMENT_SUFFIX)
+        )
+        for sequence in sequences:
+            self.__segments[sequence] = SpoolSegment(self.__directory, sequence)
+
+        checkpoint_path = os.path.join(self.__directory, CHECKPOINT_NAME)
+        if os.path.exists(checkpoint_path):
+            with open(checkpoint_path, 'rb') as checkpoint_file:
+                self.__drained = CHECKPOINT.unpack(checkpoint_file.read())
+        elif sequences:
+            self.__drained = (sequences[0], 0)
+        else:
+            self.__drained = (0, 0)
+
+        if self.__drained[0] not in self.__segments:
+            self.__segments[self.__drained[0]] = SpoolSegment(
+                self.__directory, self.__drained[0], self.__segment_size,
+            )
+
+        # Finds the end of the last complete append.
+        self.__committed = self.__drained
+        position = self.__drained
+        while True:
+            record = self.__read(position)
+            if record is None:
+                break
+            record_type, _, _, position = record
+            if record_type == COMMIT_RECORD:
+                self.__committed = position
+
+        self.__discard(*self.__committed)
+        self.__delete_drained_segments()
+
+    def __discard(self, sequence, offset, end_offset=None):
+        """
+        Discards the records from a position, up to an offset of its segment if known.
+        """
+        self.__segments[sequence].clear(offset, end_offset)
+        for other_sequence in [other for other in self.__segments if other > sequence]:
+            self.__segments.pop(other_sequence).delete()
+
+    def __reserve(self, segment, offset, data_size, flushed):
+        """
+        Gets the position of a record, in a new segment if the current one is full.
+
+        :return: the segment and the offset of the record
+        :rtype: (SpoolSegment, int)
+        """
+        record_size = RECORD_HEADER.size + data_size
+        if segment.has_room(offset, record_size):
+            return segment, offset
+
+        segment = SpoolSegment(self.__directory, segment.sequence + 1, max(self.__segment_size, record_size))
+        with self.__lock:
+            self.__segments[segment.sequence] = segment
+        flushed.append((segment, 0))
+        return segment, 0
+
+    def __read(self, position):
+        """
+        Reads the record at a position, moving to the next segment at the end of one.
+
+        :return: the type, the queue name and the body of the record and the position after it,
+         None at the end of the records
+        :rtype: (int, str, bytes, (int, int))
+        """
+        sequence, offset = position
+        while sequence in self.__segments:
+            record = self.__segments[sequence].read(offset)
+            if record is not None:
+                record_type, queue_name, body, offset = record
+                return record_type, queue_name, body, (sequence, offset)
+            sequence, offset = sequence + 1, 0
+        return None
+
+    def __read_batch(self):
+        """
+        Reads the next batch of the committed tasks.
+
+        :return: the tasks in the form (queue_name, body), and the position after them
+        :rtype: (list[(str, bytes)], (int, int))
+
+        :raises ValueError: if a committed record is corrupted
+        """
+        with self.__lock:
+            position = self.__drained
+            committed = self.__committed
+
+        messages = []
+        while position != committed and len(messages) < self.__batch_size:
+            record = self.__read(position)
+            if record is None:
+                raise ValueError('Corrupted record at position {} of the spool'.format(position))
+            record_type, queue_name, body, position = record
+            if record_type == TASK_RECORD:
+                messages.append((queue_name, body))
+        return messages, position
+
+    def __drain(self):
+        """
+        Publishes the committed tasks in batches, until closed.
+        Any failure is logged and the batch retried, so the drainer keeps running.
+        """
+        amqp_manager = None
+        while not self.__stopped.is_set():
+            with self.__changed:
+                self.__changed.wait_for(
+                    lambda: self.__drained != self.__committed or self.__stopped.is_set(),
+                    self.__retry_interval,
+                )
+            if self.__stopped.is_set():
+                break
+            if self.__drained == self.__committed:
+                continue
+
+            try:
+                messages, position = self.__read_batch()
+                if messages:
+                    if amqp_manager is None:
+                        amqp_manager = self.__connect()
+                    self.__publish(amqp_manager, messages)
+                self.__save_checkpoint(position)
+            except Exception as e:
+                logger.exception('Failed to publish the spooled tasks, retrying in %s seconds', self.__retry_interval)
+                self.last_error = e
+                self.__failing = True
+                metrics.SPOOL_DRAIN_FAILURES.inc()
+                if amqp_manager is not None:
+                    try:
+                        amqp_manager.close()
+                    except Exception:
+                        pass
+                    amqp_manager = None
+                self.__stopped.wait(self.__retry_interval)
+                continue
+
+            self.__failing = False
+            metrics.SPOOL_DRAINED_MESSAGES.inc(len(messages))
+            with self.__changed:
+                self.__drained = position
+                self.__delete_drained_segments()
+                self.__changed.notify_all()
+
+        if amqp_manager is not None:
+            try:
+                amqp_manager.close()
+            except Exception:
+                pass
+
+    @staticmethod
+    def __publish(amqp_manager, messages):
+        """
+        Publishes a batch of tasks, grouped by queue in order, waiting for the confirmation of the broker.
+
+        :raises pika.exceptions.NackError: if the broker rejects some tasks
+        """
+        amqp_manager.create_queues(list(dict.fromkeys(queue_name for queue_name, _ in messages)))
+
+        i = 0
+        while i < len(messages):
+            queue_name = messages[i][0]
+            bodies = []
+            while i < len(messages) and messages[i][0] == queue_name:
+                bodies.append(messages[i][1])
+                i += 1
+
+            confirmation = amqp_manager.publish_messages(queue_name, bodies, confirm=True)
+            if confirmation.acknowledged < len(bodies):
+                raise pika.exceptions.NackError(bodies[confirmation.acknowledged:])
+
+    def __save_checkpoint(self, position):
+        """
+        Saves the position of the published tasks, replacing atomically the previous checkpoint.
+        """
+        checkpoint_path = os.path.join(self.__directory, CHECKPOINT_NAME)
+        with open(checkpoint_path + '.tmp', 'wb') as checkpoint_file:
+            checkpoint_file.write(CHECKPOINT.pack(*position))
+            checkpoint_file.flush()
+            os.fsync(checkpoint_file.fileno())
+        os.replace(checkpoint_path + '.tmp', checkpoint_path)
+
+    def __delete_drained_segments(self):
+        for sequence in [sequence for sequence in self.__segments if sequence < self.__drained[0]]:
+            self.__segments.pop(sequence).delete()
+
+
+class StagedRecords(object):
+    """
+    Stages the records of an append, kept in memory up to a size, the next ones written to a temporary file.
+    """
+
+    def __init__(
+            self,
+            directory,
+            size,
+    ):
+        """
+        Initializes the records.
+
+        :param directory: the directory of the temporary file, created only if the records exceed the size
+        :type directory: str
+
+        :param size: the size in bytes of the records kept in memory
+        :type size: int
+        """
+        self.__directory = directory
+        self.__size = size
+        self.__records = []
+        self.__records_size = 0
+        self.__file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def add(self, queue_name, body):
+        """
+        Adds a record.
+
+        :param queue_name: the queue name
+        :type queue_name: bytes
+
+        :param body: the body of the task
+        :type body: bytes
+        """
+        if self.__file is None and self.__records_size + len(queue_name) + len(body) <= self.__size:
+            self.__records.append((queue_name, body))
+            self.__records_size += len(queue_name) + len(body)
+            return
+
+        if self.__file is None:
+            self.__file = tempfile.TemporaryFile(dir=self.__directory)
+        self.__file.write(STAGED_RECORD_HEADER.pack(len(queue_name), len(body)))
+        self.__file.write(queue_name)
+        self.__file.write(body)
+
+    def __iter__(self):
+        yield from self.__records
+
+        if self.__file is None:
+            return
+        self.__file.flush()
+        self.__file.seek(0)
+        while True:
+            header = self.__file.read(STAGED_RECORD_HEADER.size)
+            if not header:
+                return
+            queue_name_size, body_size = STAGED_RECORD_HEADER.unpack(header)
+            yield self.__file.read(queue_name_size), self.__file.read(body_size)
+
+    def close(self):
+        """
+        Removes the temporary file, if any.
+        """
+        if self.__file is not None:
+            self.__file.close()
+
+
+def allocate(segment_file, size):
+    """
+    Allocates the blocks of a new file, writing zeros on the file systems not supporting posix_fallocate.
+
+    :param segment_file: the file, empty
+    :type segment_file: io.BufferedRandom
+
+    :param size: the size of the file in bytes
+    :type size: int
+
+    :raises OSError: if the disk is full
+    """
+    if hasattr(os, 'posix_fallocate'):
+        try:
+            os.posix_fallocate(segment_file.fileno(), 0, size)
+            return
+        except OSError as e:
+            if e.errno not in (errno.EOPNOTSUPP, errno.EINVAL):
+                raise
+
+    zeros = bytes(ALLOCATION_CHUNK_SIZE)
+    for offset in range(0, size, len(zeros)):
+        segment_file.write(zeros[:size - offset])
+    segment_file.flush()
+    os.fsync(segment_file.fileno())
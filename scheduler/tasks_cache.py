@@ -0,0 +1,179 @@
+import collections
+import hashlib
+import json
+import threading
+import uuid
+
+from scheduler import metrics
+
+
+CACHE_SIZE = 64 * 1024 * 1024
+
+
+class SerializedTasksCache(object):
+    """
+    Keeps the tasks serialized as JSON of the most recent jobs, so an identical job submitted again
+    is published without generating and serializing its tasks.
+    The tasks are keyed by the inputs of their generator except the job name,
+    stored with a marker in place of the job name, and patched with the name of each submission.
+    At most size bytes of tasks are kept, forgetting the least recently used ones.
+    """
+
+    def __init__(self, size=CACHE_SIZE):
+        """
+        Initializes the cache.
+
+        :param size: the maximum number of bytes of the cached tasks
+        :type size: int
+        """
+        self.__size = size
+        self.__used_size = 0
+        self.__entries = collections.OrderedDict()
+        self.__lock = threading.Lock()
+
+        # The marker is random, so it cannot appear in the other fields of a task.
+        self.__marker = uuid.uuid4().hex
+        self.__serialized_marker = json.dumps(self.__marker).encode()
+
+    def get_tasks(self, generator_type, job_name, inputs):
+        """
+        Gets the tasks of a job, served from the cache when serialized.
+        The generator is created at once, so the invalid inputs are reported before publishing.
+
+        :param generator_type: the type of the tasks generator
+        :type generator_type: type
+
+        :param job_name: the name of the job
+        :type job_name: str
+
+        :param inputs: the arguments of the generator except the job name
+        :type inputs: dict[str, object]
+
+        :return: the tasks
+        :rtype: CachedTasks
+        """
+        def create_tasks(name):
+            return generator_type(job_name=name, **inputs)
+        return CachedTasks(self, get_inputs_key(generator_type, inputs), job_name, create_tasks)
+
+    def serialize(self, key, job_name, create_tasks):
+        """
+        Iterates the tasks serialized as JSON, generating and caching them if missing.
+
+        :param key: the key of the inputs of the generator
+        :type key: str
+
+        :param job_name: the name of the job
+        :type job_name: str
+
+        :param create_tasks: the function creating the tasks generator of a job name
+        :type create_tasks: (str) -> scheduler.tasks_generators.tasks_generator.TasksGenerator
+
+        :return: the tasks serialized as JSON
+        :rtype: collections.abc.Iterator[bytes]
+        """
+        with self.__lock:
+            bodies = self.__entries.get(key)
+            if bodies is not None:
+                self.__entries.move_to_end(key)
+        metrics.TASKS_CACHE_LOOKUPS.inc(label_values=('miss' if bodies is None else 'hit',))
+
+        serialized_job_name = json.dumps(job_name).encode()
+        if bodies is None:
+            return self.__generate(key, serialized_job_name, create_tasks)
+        return (body.replace(self.__serialized_marker, serialized_job_name, 1) for body in bodies)
+
+    def __generate(self, key, serialized_job_name, create_tasks):
+        """
+        Iterates the tasks generated, caching them once all iterated if they fit in the cache.
+        """
+        bodies = []
+        bodies_size = 0
+        for body in create_tasks(self.__marker).serialize():
+            if bodies is not None:
+                bodies_size += len(body)
+                if bodies_size <= self.__size:
+                    bodies.append(body)
+                else:
+                    bodies = None
+            yield body.replace(self.__serialized_marker, serialized_job_name, 1)
+
+        if bodies is not None:
+            self.__add(key, bodies, bodies_size)
+
+    def __add(self, key, bodies, bodies_size):
+        with self.__lock:
+            if key in self.__entries:
+                return
+            self.__entries[key] = bodies
+            self.__used_size += bodies_size
+            while self.__used_size > self.__size:
+                _, evicted_bodies = self.__entries.popitem(last=False)
+                self.__used_size -= sum(map(len, evicted_bodies))
+
+
+class CachedTasks(object):
+    """
+    Defines the tasks of a job, iterated from their generator, or serialized through the cache.
+    """
+
+    def __init__(
+            self,
+            cache,
+            key,
+            job_name,
+            create_tasks,
+    ):
+        """
+        Initializes the tasks.
+
+        :param cache: the cache
+        :type cache: SerializedTasksCache
+
+        :param key: the key of the inputs of the generator
+        :type key: str
+
+        :param job_name: the name of the job
+        :type job_name: str
+
+        :param create_tasks: the function creating the tasks generator of a job name
+        :type create_tasks: (str) -> scheduler.tasks_generators.tasks_generator.TasksGenerator
+        """
+        self.__cache = cache
+        self.__key = key
+        self.__job_name = job_name
+        self.__create_tasks = create_tasks
+        self.__tasks = create_tasks(job_name)
+
+    def __iter__(self):
+        return iter(self.__tasks)
+
+    def serialize(self):
+        """
+        Iterates the tasks serialized as JSON, as TasksGenerator.serialize().
+
+        :return: the tasks serialized as JSON
+        :rtype: collections.abc.Iterator[bytes]
+        """
+        return self.__cache.serialize(self.__key, self.__job_name, self.__create_tasks)
+
+
+def get_inputs_key(generator_type, inputs):
+    """
+    Gets the key of the inputs of a tasks generator, the same for the equal inputs in any order.
+
+    :param generator_type: the type of the tasks generator
+    :type generator_type: type
+
+    :param inputs: the arguments of the generator except the job name
+    :type inputs: dict[str, object]
+
+    :return: the SHA-256 of the canonical JSON of the inputs
+    :rtype: str
+    """
+    canonical_inputs = json.dumps(
+        [generator_type.__qualname__, inputs],
+        sort_keys=True,
+        separators=(',', ':'),
+    )
+    return hashlib.sha256(canonical_inputs.encode()).hexdigest()
@@ -89,45 +89,50 @@ class FilterTasksGenerator(TasksGenerator):
         self.__random_seed = random_seed
         self.__include_header = include_header
         self.__threshold = threshold
-        self.__predict_parameters = predict_parameters
+        # Converted once, so an invalid value is rejected before any task is published.
+        self.__predict_parameters = self.__get_predict_parameters(predict_parameters)
 
         self.__i = 0
 
-    def __iter__(self):
-        return self
-
-    def __next__(self):
+    def _next_task_fields(self):
         if self.__i < 1:
-            task = {
-                'job_name': self.__job_name,
-                'learner_outputs_number': self.__learner_outputs_number,
-                'dataset_name': self.__dataset_name,
-                'training_rate': self.__training_rate,
-                'fusion_rate': self.__fusion_rate,
-                'class_attribute': self.__class_attribute,
-                'class_attribute_type': self.__class_attribute_type,
-                'true_class_value': self.__true_class_value,
-                'include_attributes': self.__include_attributes,
-                'exclude_attributes': self.__exclude_attributes,
-                'attributes_rate': self.__attributes_rate,
-                'random_seed': self.__random_seed,
-                'include_header': self.__include_header,
-                'threshold': self.__threshold,
-                'predict_parameters': self.__next_predict_parameters(),
-            }
             self.__i += 1
-            return task
+            return {}
         raise StopIteration
 
-    def __next_predict_parameters(self):
+    def _get_task(self, fields):
+        return {
+            'job_name': self.__job_name,
+            'learner_outputs_number': self.__learner_outputs_number,
+            'dataset_name': self.__dataset_name,
+            'training_rate': self.__training_rate,
+            'fusion_rate': self.__fusion_rate,
+            'class_attribute': self.__class_attribute,
+            'class_attribute_type': self.__class_attribute_type,
+            'true_class_value': self.__true_class_value,
+            'include_attributes': self.__include_attributes,
+            'exclude_attributes': self.__exclude_attributes,
+            'attributes_rate': self.__attributes_rate,
+            'random_seed': self.__random_seed,
+            'include_header': self.__include_header,
+            'threshold': self.__threshold,
+            'predict_parameters': dict(self.__predict_parameters),
+        }
+
+    def __get_predict_parameters(self, predict_parameters):
         """
-        Returns the next executor parameters.
+        Converts the executor parameters according to their types.
+
+        :param predict_parameters: the list of parameters, as given to the initializer
+        :type predict_parameters: list[object]
 
         :return: a dictionary with the parameters in the form {name: value}
         :rtype: dict[str, object]
+
+        :raises ValueError: if a value does not fit its type
         """
         parameters = {}
-        for parameter in self.__predict_parameters:
+        for parameter in predict_parameters:
             name = parameter.get('name')
             value_type = parameter.get('type')
             value = parameter.get('value')
@@ -1,6 +1,9 @@
 import random
 
+import numpy
+
 from scheduler.tasks_generators.tasks_generator import TasksGenerator
+from scheduler.tasks_generators.parameter_space import ParameterSpace
 
 
 INTEGER_DEFAULT_STEP = 1
@@ -102,52 +105,85 @@ class LearnerTasksGenerator(TasksGenerator):
         self.__include_header = include_header
         self.__duration = duration
         self.__learn_parameters = learn_parameters
+        self.__parameter_space = self.__compile_learn_parameters()
 
         self.__i = 0
         self.__random_generator = random.Random(random_seed)
+        self.__batch_random_generator = numpy.random.default_rng(random_seed)
 
-    def __iter__(self):
-        return self
-
-    def __next__(self):
+    def _next_task_fields(self):
         if self.__i < self.__tasks_number:
-            task = {
-                'job_name': self.__job_name,
+            fields = {
                 'task_number': self.__i,
-                'dataset_name': self.__dataset_name,
-                'training_rate': self.__training_rate,
-                'fusion_rate': self.__fusion_rate,
-                'sample_rate': self.__sample_rate,
-                'class_attribute': self.__class_attribute,
-                'class_attribute_type': self.__class_attribute_type,
-                'true_class_value': self.__true_class_value,
-                'include_attributes': self.__include_attributes,
-                'exclude_attributes': self.__exclude_attributes,
-                'attributes_rate': self.__attributes_rate,
-                'random_seed': self.__random_seed,
-                'include_header': self.__include_header,
-                'duration': self.__duration,
                 'learn_parameters': self.__next_learn_parameters(),
             }
             self.__i += 1
-            return task
+            return fields
         raise StopIteration
 
-    def __next_learn_parameters(self):
+    def _get_task(self, fields):
+        return {
+            'job_name': self.__job_name,
+            'task_number': fields['task_number'],
+            'dataset_name': self.__dataset_name,
+            'training_rate': self.__training_rate,
+            'fusion_rate': self.__fusion_rate,
+            'sample_rate': self.__sample_rate,
+            'class_attribute': self.__class_attribute,
+            'class_attribute_type': self.__class_attribute_type,
+            'true_class_value': self.__true_class_value,
+            'include_attributes': self.__include_attributes,
+            'exclude_attributes': self.__exclude_attributes,
+            'attributes_rate': self.__attributes_rate,
+            'random_seed': self.__random_seed,
+            'include_header': self.__include_header,
+            'duration': self.__duration,
+            'learn_parameters': fields['learn_parameters'],
+        }
+
+    def generate_batch(self, size, seed_stable=False):
         """
-        Returns the next learn parameters, according to the random generator.
+        Generates the next tasks in a batch, as columns.
+        By default the parameters are drawn with a numpy.random.Generator seeded with the random seed:
+        the batches are reproducible for the same seed and the same sequence of batch sizes,
+        but differ from the tasks obtained by iterating the generator.
+        In the seed-stable mode the parameters are drawn with the random generator used by the iteration,
+        so the batches contain exactly the tasks the iteration would have produced.
 
-        :return: a dictionary with the parameters in the form {name: value}
+        :param size: the maximum number of tasks in the batch
+        :type size: int
+
+        :param seed_stable: if True, it draws the parameters with the same sequence as the iteration
+        :type seed_stable: bool
+
+        :return: a dictionary in the form {'task_number': numpy.ndarray, 'learn_parameters': {name: numpy.ndarray}}
         :rtype: dict[str, object]
         """
-        parameters = {}
+        size = max(min(size, self.__tasks_number - self.__i), 0)
+        random_generator = self.__random_generator if seed_stable else self.__batch_random_generator
+
+        batch = {
+            'task_number': numpy.arange(self.__i, self.__i + size),
+            'learn_parameters': self.__parameter_space.sample_batch(random_generator, size),
+        }
+        self.__i += size
+        return batch
+
+    def __compile_learn_parameters(self):
+        """
+        Compiles the learn parameters in the space of their candidate values.
+
+        :return: the parameter space
+        :rtype: ParameterSpace
+        """
+        parameter_space = ParameterSpace()
         for parameter in self.__learn_parameters:
             name = parameter.get('name')
             value_type = parameter.get('type')
             values = None
 
             if 'values' in parameter:
-                values = [self._convert_string(x, value_type) for x in parameter.get('values')]
+                values = self._get_values(parameter.get('values'), value_type)
             elif 'range' in parameter:
                 range_start = parameter.get('range').get('start')
                 range_stop = parameter.get('range').get('stop')
@@ -155,8 +191,15 @@ class LearnerTasksGenerator(TasksGenerator):
 
                 values = self._get_range(range_start, range_stop, range_step, value_type)
 
-            value = self.__random_generator.choice(values)
+            parameter_space.add_parameter(name, values)
 
-            parameters[name] = value
+        return parameter_space
 
-        return parameters
+    def __next_learn_parameters(self):
+        """
+        Returns the next learn parameters, according to the random generator.
+
+        :return: a dictionary with the parameters in the form {name: value}
+        :rtype: dict[str, object]
+        """
+        return self.__parameter_space.sample(self.__random_generator)
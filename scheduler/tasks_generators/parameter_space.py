@@ -0,0 +1,100 @@
+from array import array
+
+import numpy
+
+
+class ParameterSpace(object):
+    """
+    Defines the space of the learn parameters, compiled once for the whole job.
+    """
+
+    def __init__(self):
+        self.__names = []
+        self.__values = []
+
+    def __len__(self):
+        return len(self.__names)
+
+    def __iter__(self):
+        return zip(self.__names, self.__values)
+
+    def add_parameter(
+            self,
+            name,
+            values,
+    ):
+        """
+        Adds a parameter to the space.
+
+        :param name: the name of the parameter
+        :type name: str
+
+        :param values: the candidate values, supporting len() and indexing
+        :type values: collections.abc.Sequence
+        """
+        self.__names.append(name)
+        self.__values.append(values)
+
+    def sample(self, random_generator):
+        """
+        Samples a point of the space.
+        Each parameter costs a single draw, in the order the parameters were added.
+
+        :param random_generator: the random generator
+        :type random_generator: random.Random
+
+        :return: a dictionary with the parameters in the form {name: value}
+        :rtype: dict[str, object]
+        """
+        parameters = {}
+        for name, values in zip(self.__names, self.__values):
+            parameters[name] = random_generator.choice(values)
+        return parameters
+
+    def sample_batch(self, random_generator, size):
+        """
+        Samples a batch of points of the space, returned as columns.
+        With a numpy.random.Generator all the indices of a parameter are drawn at once;
+        with a random.Random the draws are the same, and in the same order, as calling sample() size times.
+
+        :param random_generator: the random generator
+        :type random_generator: numpy.random.Generator | random.Random
+
+        :param size: the number of points
+        :type size: int
+
+        :return: a dictionary with the parameters in the form {name: values}
+        :rtype: dict[str, numpy.ndarray]
+        """
+        if isinstance(random_generator, numpy.random.Generator):
+            indices = [random_generator.integers(len(values), size=size) for values in self.__values]
+        else:
+            rows = [[random_generator.randrange(len(values)) for values in self.__values] for _ in range(size)]
+            indices = numpy.array(rows, dtype=numpy.int64).reshape(size, len(self.__values)).T
+
+        parameters = {}
+        for name, values, column in zip(self.__names, self.__values, indices):
+            parameters[name] = take_values(values, column)
+        return parameters
+
+
+def take_values(values, indices):
+    """
+    Gets the candidate values at the given indices.
+
+    :param values: the candidate values
+    :type values: range | scheduler.tasks_generators.real_range.RealRange | array | tuple
+
+    :param indices: the indices of the values
+    :type indices: numpy.ndarray
+
+    :return: the values
+    :rtype: numpy.ndarray
+    """
+    if isinstance(values, range):
+        return values.start + numpy.asarray(indices, dtype=numpy.int64) * values.step
+    elif isinstance(values, array):
+        return numpy.frombuffer(values, dtype=values.typecode)[indices]
+    elif hasattr(values, 'take'):
+        return values.take(indices)
+    return numpy.array(values, dtype=object)[indices]
@@ -0,0 +1,78 @@
+import math
+
+import numpy
+
+
+class RealRange(object):
+    """
+    Defines a lazy range of real values, equivalent to numpy.arange(start, stop, step).
+    The values are computed on access, so the length of the range does not affect memory nor sampling time.
+    """
+
+    def __init__(
+            self,
+            start,
+            stop,
+            step,
+    ):
+        """
+        Initializes the range.
+
+        :param start: the lower limit of the range
+        :type start: float
+
+        :param stop: the upper limit of the range, excluded
+        :type stop: float
+
+        :param step: the step for the range
+        :type step: float
+        """
+        if step == 0:
+            raise ValueError('RealRange step must not be zero')
+
+        self.__start = start
+        self.__step = step
+        self.__length = max(math.ceil((stop - start) / step), 0)
+
+        # Uses the same increment as numpy.arange, so the values are identical.
+        self.__delta = (start + step) - start
+
+    def __len__(self):
+        return self.__length
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.__length
+        if not 0 <= index < self.__length:
+            raise IndexError('RealRange index out of range')
+
+        if index == 0:
+            value = self.__start
+        elif index == 1:
+            value = self.__start + self.__step
+        else:
+            value = self.__start + index * self.__delta
+        return float(str(value))
+
+    def __iter__(self):
+        for i in range(self.__length):
+            yield self[i]
+
+    def take(self, indices):
+        """
+        Gets the values at the given indices, computed in a single vectorized pass.
+
+        :param indices: the indices of the values
+        :type indices: numpy.ndarray
+
+        :return: the values
+        :rtype: numpy.ndarray
+        """
+        indices = numpy.asarray(indices)
+        if indices.size and (indices.min() < 0 or indices.max() >= self.__length):
+            raise IndexError('RealRange index out of range')
+
+        values = self.__start + indices * self.__delta
+        values[indices == 1] = self.__start + self.__step
+        values[indices == 0] = self.__start
+        return values
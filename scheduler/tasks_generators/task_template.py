@@ -0,0 +1,51 @@
+import json
+
+
+MARKER = '\x00{name_}\x00'
+
+
+class TaskTemplate(object):
+    """
+    Defines a task serialized as JSON once, where only the variable fields are serialized for each task.
+    """
+
+    def __init__(
+            self,
+            get_task,
+            field_names,
+    ):
+        """
+        Initializes the template, serializing the invariant part of the task.
+
+        :param get_task: the function building a task from its variable fields
+        :type get_task: (dict[str, object]) -> dict[str, object]
+
+        :param field_names: the names of the variable fields
+        :type field_names: list[str]
+        """
+        markers = {name: json.dumps(MARKER.format(name_=name)) for name in field_names}
+        serialized = json.dumps(get_task({name: MARKER.format(name_=name) for name in field_names}))
+
+        self.__field_names = sorted(field_names, key=lambda name: serialized.index(markers[name]))
+        self.__segments = []
+        for name in self.__field_names:
+            segment, _, serialized = serialized.partition(markers[name])
+            self.__segments.append(segment.encode())
+        self.__segments.append(serialized.encode())
+
+    def render(self, fields):
+        """
+        Serializes a task, splicing its variable fields in the invariant part.
+        The result is the same as json.dumps() on the whole task.
+
+        :param fields: the variable fields in the form {name: value}
+        :type fields: dict[str, object]
+
+        :return: the task serialized as JSON
+        :rtype: bytes
+        """
+        parts = [self.__segments[0]]
+        for name, segment in zip(self.__field_names, self.__segments[1:]):
+            parts.append(json.dumps(fields[name]).encode())
+            parts.append(segment)
+        return b''.join(parts)
@@ -1,6 +1,8 @@
 from abc import ABCMeta, abstractmethod
+from array import array
 
-import numpy
+from scheduler.tasks_generators.real_range import RealRange
+from scheduler.tasks_generators.task_template import TaskTemplate
 
 
 INTEGER_DEFAULT_STEP = 1
@@ -15,56 +17,140 @@ class TasksGenerator(object):
     __metaclass__ = ABCMeta
 
     def __init__(self):
+        self.__template = None
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self._get_task(self._next_task_fields())
+
+    def serialize(self):
+        """
+        Iterates the tasks serialized as JSON.
+        The fields shared by all the tasks are serialized only once, the variable ones for each task.
+
+        :return: the tasks serialized as JSON
+        :rtype: collections.abc.Iterator[bytes]
+        """
+        while True:
+            try:
+                fields = self._next_task_fields()
+            except StopIteration:
+                return
+            if self.__template is None:
+                self.__template = TaskTemplate(self._get_task, list(fields))
+            yield self.__template.render(fields)
+
+    @abstractmethod
+    def _next_task_fields(self):
+        """
+        Returns the variable fields of the next task.
+
+        :return: a dictionary with the fields in the form {name: value}
+        :rtype: dict[str, object]
+
+        :raises StopIteration: if there are no more tasks
+        """
+        pass
+
+    @abstractmethod
+    def _get_task(self, fields):
+        """
+        Builds a task from its variable fields.
+
+        :param fields: the variable fields in the form {name: value}
+        :type fields: dict[str, object]
+
+        :return: the task
+        :rtype: dict[str, object]
+        """
         pass
 
     def _convert_string(self, value, value_type):
         """
-        Converts a string to a value according to a given type.
+        Converts a string to a value according to a given type, as convert_string().
+        """
+        return convert_string(value, value_type)
+
+    def _get_values(self, values, value_type):
+        """
+        Converts a list of strings to a compact sequence of values according to a given type.
 
-        :param value: the value to convert
-        :rtype: str
+        :param values: the values to convert
+        :type values: list[str]
 
         :param value_type: the destination between 'integer', 'real' and 'string'
         :type value_type: str
 
-        :return: the value converted
-        :rtype: object
+        :return: the values converted, as a typed array for the numeric types
+        :rtype: collections.abc.Sequence
         """
+        values = [self._convert_string(x, value_type) for x in values]
         if value_type == 'integer':
-            return int(value)
+            return array('q', values)
         elif value_type == 'real':
-            return float(value)
-        elif value_type == 'text':
-            return value
+            return array('d', values)
+        return tuple(values)
 
     def _get_range(self, start, stop, step, value_type):
         """
-        Gets a range according to the given value type.
+        Gets a range according to the given value type, as get_range().
+        """
+        return get_range(start, stop, step, value_type)
 
-        :param start: the lower limit of the range
-        :type start: str
 
-        :param stop: the upper limit of the range
-        :type stop: str
+def convert_string(value, value_type):
+    """
+    Converts a string to a value according to a given type.
 
-        :param step: the step for the range
-        :type step: str
+    :param value: the value to convert
+    :rtype: str
 
-        :param value_type: the type of the values between 'integer' and 'real'
-        :type value_type: str
+    :param value_type: the destination between 'integer', 'real' and 'string'
+    :type value_type: str
 
-        :return: the range of values
-        :rtype: list[object]
-        """
-        if value_type == 'integer':
-            start = int(start)
-            stop = int(stop)
-            if step:
-                step = int(step)
-            return range(start, stop, step or INTEGER_DEFAULT_STEP)
-        elif value_type == 'real':
-            start = float(start)
-            stop = float(stop)
-            if step:
-                step = float(step)
-            return [float(str(x)) for x in numpy.arange(start, stop, step or FLOAT_DEFAULT_STEP)]
+    :return: the value converted
+    :rtype: object
+
+    :raises ValueError: if the value does not fit the type
+    """
+    if value_type == 'integer':
+        return int(value)
+    elif value_type == 'real':
+        return float(value)
+    elif value_type == 'text':
+        return value
+
+
+def get_range(start, stop, step, value_type):
+    """
+    Gets a range according to the given value type.
+
+    :param start: the lower limit of the range
+    :type start: str
+
+    :param stop: the upper limit of the range
+    :type stop: str
+
+    :param step: the step for the range
+    :type step: str
+
+    :param value_type: the type of the values between 'integer' and 'real'
+    :type value_type: str
+
+    :return: the lazy range of values, None for the other types
+    :rtype: range | RealRange
+    """
+    if value_type == 'integer':
+        start = int(start)
+        stop = int(stop)
+        if step:
+            step = int(step)
+        return range(start, stop, step or INTEGER_DEFAULT_STEP)
+    elif value_type == 'real':
+        start = float(start)
+        stop = float(stop)
+        if step:
+            step = float(step)
+        return RealRange(start, stop, step or FLOAT_DEFAULT_STEP)
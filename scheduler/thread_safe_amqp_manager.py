@@ -0,0 +1,202 @@
+import contextvars
+import queue
+import threading
+from concurrent.futures import Future
+
+import pika
+
+from scheduler import channel_pool
+from scheduler import profiling
+from scheduler.amqp_manager import AMQPManager
+
+
+HEARTBEAT_INTERVAL = 10
+
+
+class ThreadSafeAMQPManager(object):
+    """
+    Implements a manager for the AMQP protocol usable by many threads.
+    A dedicated thread owns the connection and executes the operations submitted by the other threads,
+    processing the heartbeats of the broker while idle.
+    """
+
+    def __init__(self, hostname, codec=None, channels_number=channel_pool.CHANNELS_NUMBER, transport=None):
+        """
+        Initializes a manager connecting to the AMQP message broker.
+
+        :param hostname: the hostname of the message broker
+        :type hostname: str
+
+        :param codec: the codec of the published messages, JSON if None
+        :type codec: scheduler.message_codecs.MessageCodec
+
+        :param channels_number: the maximum number of channels kept open
+        :type channels_number: int
+
+        :param transport: the function opening a connection to the message broker, see AMQPManager
+        :type transport: (str) -> pika.BlockingConnection
+        """
+        self.__operations = queue.Queue()
+        self.__closed = False
+
+        connected = Future()
+        self.__thread = threading.Thread(
+            target=self.__run,
+            args=(connected, hostname, codec, channels_number, transport),
+            name='amqp-manager-{}'.format(hostname),
+            daemon=True,
+        )
+        self.__thread.start()
+        connected.result()
+
+    def close(self):
+        if self.__closed:
+            return
+        try:
+            self.__execute('close')
+        finally:
+            self.__closed = True
+            self.__operations.put(None)
+            self.__thread.join()
+
+    def is_open(self):
+        """
+        See AMQPManager.is_open.
+        """
+        if self.__closed or not self.__thread.is_alive():
+            return False
+        return self.__execute('is_open')
+
+    def create_queue(self, *args, **kwargs):
+        """
+        See AMQPManager.create_queue.
+        """
+        return self.__execute('create_queue', *args, **kwargs)
+
+    def create_queues(self, *args, **kwargs):
+        """
+        See AMQPManager.create_queues.
+        """
+        return self.__execute('create_queues', *args, **kwargs)
+
+    def queue_exists(self, *args, **kwargs):
+        """
+        See AMQPManager.queue_exists.
+        """
+        return self.__execute('queue_exists', *args, **kwargs)
+
+    def queue_size(self, *args, **kwargs):
+        """
+        See AMQPManager.queue_size.
+        """
+        return self.__execute('queue_size', *args, **kwargs)
+
+    def queues_statistics(self, *args, **kwargs):
+        """
+        See AMQPManager.queues_statistics.
+        """
+        return self.__execute('queues_statistics', *args, **kwargs)
+
+    def delete_queue(self, *args, **kwargs):
+        """
+        See AMQPManager.delete_queue.
+        """
+        return self.__execute('delete_queue', *args, **kwargs)
+
+    def purge_queue(self, *args, **kwargs):
+        """
+        See AMQPManager.purge_queue.
+        """
+        return self.__execute('purge_queue', *args, **kwargs)
+
+    def publish_messages(self, *args, **kwargs):
+        """
+        See AMQPManager.publish_messages.
+        """
+        return self.__execute('publish_messages', *args, **kwargs)
+
+    def stream_messages(self, *args, **kwargs):
+        """
+        See AMQPManager.stream_messages.
+        """
+        return self.__execute('stream_messages', *args, **kwargs)
+
+    def publish_transaction(self, *args, **kwargs):
+        """
+        See AMQPManager.publish_transaction.
+        """
+        return self.__execute('publish_transaction', *args, **kwargs)
+
+    def consume_messages(self, *args, **kwargs):
+        """
+        See AMQPManager.consume_messages.
+        """
+        return self.__execute('consume_messages', *args, **kwargs)
+
+    def acknowledge_messages(self, *args, **kwargs):
+        """
+        See AMQPManager.acknowledge_messages.
+        """
+        return self.__execute('acknowledge_messages', *args, **kwargs)
+
+    def reject_messages(self, *args, **kwargs):
+        """
+        See AMQPManager.reject_messages.
+        """
+        return self.__execute('reject_messages', *args, **kwargs)
+
+    def __execute(self, operation, *args, **kwargs):
+        """
+        Executes an operation of the manager in the thread owning the connection, waiting for its result.
+
+        :param operation: the name of the AMQPManager method
+        :type operation: str
+
+        :return: the result of the operation
+        :rtype: object
+
+        :raises pika.exceptions.ConnectionWrongStateError: if the manager is closed
+        """
+        if self.__closed or not self.__thread.is_alive():
+            raise pika.exceptions.ConnectionWrongStateError('AMQP manager closed')
+
+        # Executes directly the operations nested in another one, e.g. from a message generator.
+        if threading.current_thread() is self.__thread:
+            return getattr(self.__amqp_manager, operation)(*args, **kwargs)
+
+        # Runs the operation in the context of the caller, so a profiling session covers the I/O thread too.
+        result = Future()
+        self.__operations.put((result, contextvars.copy_context(), operation, args, kwargs))
+        return result.result()
+
+    def __run(self, connected, hostname, codec, channels_number, transport):
+        """
+        Connects to the message broker and executes the submitted operations, until closed.
+
+        :param connected: the future notified when connected
+        :type connected: concurrent.futures.Future
+        """
+        try:
+            self.__amqp_manager = AMQPManager(hostname, codec, channels_number, transport)
+        except BaseException as e:
+            connected.set_exception(e)
+            return
+        connected.set_result(None)
+
+        while True:
+            try:
+                operation = self.__operations.get(timeout=HEARTBEAT_INTERVAL)
+            except queue.Empty:
+                # Processes the heartbeats, so the broker does not drop an idle connection.
+                self.__amqp_manager.is_open()
+                continue
+            if operation is None:
+                return
+
+            result, context, name, args, kwargs = operation
+            if not result.set_running_or_notify_cancel():
+                continue
+            try:
+                result.set_result(context.run(profiling.call, getattr(self.__amqp_manager, name), *args, **kwargs))
+            except BaseException as e:
+                result.set_exception(e)
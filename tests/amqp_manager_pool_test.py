@@ -0,0 +1,46 @@
+import os
+import unittest
+
+from scheduler.amqp_manager_pool import AMQPManagerPool
+from scheduler.memory_broker import MemoryBroker
+
+AMQP_HOSTNAME = 'localhost'
+AMQP_TRANSPORT = os.environ.get('AMQP_TRANSPORT', 'memory')
+
+POOL_SIZE = 2
+
+
+class AMQPManagerPoolTest(unittest.TestCase):
+    def setUp(self):
+        transport = MemoryBroker().connect if AMQP_TRANSPORT == 'memory' else None
+        self.__amqp_manager_pool = AMQPManagerPool(AMQP_HOSTNAME, POOL_SIZE, transport=transport)
+
+    def tearDown(self):
+        self.__amqp_manager_pool.close()
+
+    def test_acquire(self):
+        amqp_manager = self.__amqp_manager_pool.acquire()
+        self.assertTrue(amqp_manager.is_open())
+        self.__amqp_manager_pool.release(amqp_manager)
+
+        self.assertIs(self.__amqp_manager_pool.acquire(), amqp_manager)
+        self.__amqp_manager_pool.release(amqp_manager)
+
+    def test_acquire_bounded(self):
+        amqp_managers = [self.__amqp_manager_pool.acquire() for _ in range(POOL_SIZE)]
+
+        with self.assertRaises(TimeoutError):
+            self.__amqp_manager_pool.acquire(timeout=0.1)
+
+        for amqp_manager in amqp_managers:
+            self.__amqp_manager_pool.release(amqp_manager)
+
+    def test_acquire_reconnects(self):
+        amqp_manager = self.__amqp_manager_pool.acquire()
+        amqp_manager.close()
+        self.__amqp_manager_pool.release(amqp_manager)
+
+        new_amqp_manager = self.__amqp_manager_pool.acquire()
+        self.assertIsNot(new_amqp_manager, amqp_manager)
+        self.assertTrue(new_amqp_manager.is_open())
+        self.__amqp_manager_pool.release(new_amqp_manager)
@@ -1,9 +1,17 @@
+import os
 import unittest
 import time
+from unittest import mock
 
-from scheduler.amqp_manager import AMQPManager
+import pika
+
+from scheduler import amqp_manager
+from scheduler.amqp_manager import AMQPManager, ConfirmedBatch, PendingConfirms, PublisherConfirms, \
+    collapse_delivery_tags
+from scheduler.memory_broker import MemoryBlockingConnection, MemoryBroker
 
 AMQP_HOSTNAME = 'localhost'
+AMQP_TRANSPORT = os.environ.get('AMQP_TRANSPORT', 'memory')
 
 QUEUE_NAME = 'gpfunction'
 
@@ -51,7 +59,8 @@ TASKS = [
 
 class AMQPManagerTest(unittest.TestCase):
     def setUp(self):
-        self.__amqp_manager = AMQPManager(AMQP_HOSTNAME)
+        self.__transport = MemoryBroker().connect if AMQP_TRANSPORT == 'memory' else None
+        self.__amqp_manager = AMQPManager(AMQP_HOSTNAME, transport=self.__transport)
     
     def tearDown(self):
         self.__amqp_manager.close()
@@ -63,6 +72,69 @@ class AMQPManagerTest(unittest.TestCase):
         self.__amqp_manager.delete_queue(QUEUE_NAME)
         self.assertFalse(self.__amqp_manager.queue_exists(QUEUE_NAME))
 
+    def test_create_queues(self):
+        queue_names = ['{}@{}'.format(QUEUE_NAME, i) for i in range(3)]
+
+        self.__amqp_manager.create_queues(queue_names)
+        self.__amqp_manager.create_queues(queue_names)
+
+        for queue_name in queue_names:
+            self.assertTrue(self.__amqp_manager.queue_exists(queue_name))
+            self.__amqp_manager.delete_queue(queue_name)
+            self.assertFalse(self.__amqp_manager.queue_exists(queue_name))
+
+    def test_create_queues_deleted_elsewhere(self):
+        queue_names = ['{}@{}'.format(QUEUE_NAME, i) for i in range(2)]
+        self.__amqp_manager.create_queues(queue_names)
+
+        other_amqp_manager = AMQPManager(AMQP_HOSTNAME, transport=self.__transport)
+        try:
+            other_amqp_manager.delete_queue(queue_names[0])
+        finally:
+            other_amqp_manager.close()
+
+        self.__amqp_manager.create_queues(queue_names)
+        self.__amqp_manager.publish_messages(queue_names[0], TASKS, confirm=True)
+
+        self.assertEqual(self.__amqp_manager.queue_size(queue_names[0]), len(TASKS))
+
+        for queue_name in queue_names:
+            self.__amqp_manager.delete_queue(queue_name)
+
+    def test_queue_exists_own_channel(self):
+        if AMQP_TRANSPORT != 'memory':
+            self.skipTest('the channels are tracked on the memory transport')
+
+        channels = []
+        open_channel = MemoryBlockingConnection.channel
+
+        def track_channel(connection, channel_number=None):
+            channels.append(open_channel(connection, channel_number))
+            return channels[-1]
+
+        with mock.patch.object(MemoryBlockingConnection, 'channel', track_channel):
+            self.__amqp_manager.create_queue(QUEUE_NAME)
+            self.assertFalse(self.__amqp_manager.queue_exists('missing'))
+            self.assertIsNone(self.__amqp_manager.queues_statistics([QUEUE_NAME, 'missing'])['missing'])
+
+        # The missing queues closed the channels of their own, not the admin channel.
+        self.assertTrue(channels[0].is_open)
+        self.assertFalse(any(channel.is_open for channel in channels[1:]))
+
+        self.__amqp_manager.delete_queue(QUEUE_NAME)
+
+    def test_declare_queues_without_underlying_channel(self):
+        queue_names = ['{}@{}'.format(QUEUE_NAME, i) for i in range(2)]
+
+        with mock.patch.object(amqp_manager, 'get_underlying_channel', return_value=None):
+            self.__amqp_manager.create_queues(queue_names)
+            statistics = self.__amqp_manager.queues_statistics(['missing'] + queue_names)
+
+        self.assertIsNone(statistics['missing'])
+        for queue_name in queue_names:
+            self.assertEqual(statistics[queue_name], {'messages_number': 0, 'consumers_number': 0})
+            self.__amqp_manager.delete_queue(queue_name)
+
     def test_publish_messages(self):
         self.__amqp_manager.create_queue(QUEUE_NAME)
 
@@ -74,6 +146,109 @@ class AMQPManagerTest(unittest.TestCase):
 
         self.__amqp_manager.delete_queue(QUEUE_NAME)
 
+    def test_queues_statistics(self):
+        self.__amqp_manager.create_queue(QUEUE_NAME)
+
+        self.__amqp_manager.publish_messages(QUEUE_NAME, TASKS, confirm=True)
+
+        statistics = self.__amqp_manager.queues_statistics([QUEUE_NAME, 'missing', QUEUE_NAME])
+
+        self.assertEqual(statistics[QUEUE_NAME], {'messages_number': len(TASKS), 'consumers_number': 0})
+        self.assertIsNone(statistics['missing'])
+        self.assertEqual(self.__amqp_manager.queues_statistics([QUEUE_NAME, QUEUE_NAME]), {
+            QUEUE_NAME: {'messages_number': len(TASKS), 'consumers_number': 0},
+        })
+
+        self.__amqp_manager.delete_queue(QUEUE_NAME)
+
+    def test_queues_statistics_timeout(self):
+        self.__amqp_manager.create_queue(QUEUE_NAME)
+
+        with mock.patch.object(amqp_manager, 'DECLARE_TIMEOUT', 0):
+            with self.assertRaises(TimeoutError):
+                self.__amqp_manager.queues_statistics([QUEUE_NAME])
+
+        self.assertEqual(self.__amqp_manager.queues_statistics([QUEUE_NAME])[QUEUE_NAME]['messages_number'], 0)
+
+        self.__amqp_manager.delete_queue(QUEUE_NAME)
+
+    def test_publish_messages_confirm(self):
+        self.__amqp_manager.create_queue(QUEUE_NAME)
+
+        confirmation = self.__amqp_manager.publish_messages(QUEUE_NAME, TASKS, confirm=True, window_size=1)
+
+        self.assertEqual(confirmation.published, len(TASKS))
+        self.assertEqual(confirmation.acknowledged, len(TASKS))
+        self.assertEqual(self.__amqp_manager.queue_size(QUEUE_NAME), len(TASKS))
+
+        self.__amqp_manager.delete_queue(QUEUE_NAME)
+
+    def test_publish_messages_confirm_timeout(self):
+        self.__amqp_manager.create_queue(QUEUE_NAME)
+
+        # The confirmations are lost, and the batch fails instead of waiting for each message.
+        with mock.patch.object(PublisherConfirms, 'on_confirmation'), \
+                mock.patch.object(PublisherConfirms.wait, '__defaults__', (0,)):
+            with self.assertRaises(TimeoutError) as context:
+                self.__amqp_manager.publish_messages(QUEUE_NAME, TASKS, confirm=True)
+        self.assertIn('2 messages not confirmed before the timeout, delivery tags [1, 2]', str(context.exception))
+
+        # The channel is replaced, and the next batch is confirmed.
+        confirmation = self.__amqp_manager.publish_messages(QUEUE_NAME, TASKS, confirm=True)
+        self.assertEqual(confirmation.acknowledged, len(TASKS))
+
+        self.__amqp_manager.delete_queue(QUEUE_NAME)
+
+    def test_publish_messages_invalid_window_size(self):
+        with self.assertRaises(ValueError):
+            self.__amqp_manager.publish_messages(QUEUE_NAME, TASKS, confirm=True, window_size=0)
+
+    def test_stream_messages(self):
+        self.__amqp_manager.create_queue(QUEUE_NAME)
+
+        confirmation = self.__amqp_manager.stream_messages(QUEUE_NAME, iter(TASKS), confirm=True, chunk_size=1)
+
+        self.assertEqual(confirmation.acknowledged, len(TASKS))
+        self.assertEqual(self.__amqp_manager.queue_size(QUEUE_NAME), len(TASKS))
+
+        self.__amqp_manager.delete_queue(QUEUE_NAME)
+
+    def test_publish_transaction(self):
+        queue_names = ['{}@{}'.format(QUEUE_NAME, i) for i in range(2)]
+        self.__amqp_manager.create_queues(queue_names)
+
+        published_numbers = self.__amqp_manager.publish_transaction([
+            (queue_names[0], TASKS),
+            (queue_names[1], TASKS[:1]),
+        ])
+
+        self.assertEqual(published_numbers, {queue_names[0]: len(TASKS), queue_names[1]: 1})
+        self.assertEqual(self.__amqp_manager.queue_size(queue_names[0]), len(TASKS))
+        self.assertEqual(self.__amqp_manager.queue_size(queue_names[1]), 1)
+
+        for queue_name in queue_names:
+            self.__amqp_manager.delete_queue(queue_name)
+
+    def test_publish_transaction_rollback(self):
+        def failing_tasks():
+            yield from TASKS
+            raise ValueError('Invalid task')
+
+        self.__amqp_manager.create_queue(QUEUE_NAME)
+
+        with self.assertRaises(ValueError):
+            self.__amqp_manager.publish_transaction([(QUEUE_NAME, TASKS), (QUEUE_NAME, failing_tasks())])
+        self.assertEqual(self.__amqp_manager.queue_size(QUEUE_NAME), 0)
+
+        # The channel is still usable for the next transaction.
+        self.__amqp_manager.publish_transaction([(QUEUE_NAME, TASKS)])
+        self.assertEqual(self.__amqp_manager.queue_size(QUEUE_NAME), len(TASKS))
+
+        self.assertEqual(self.__amqp_manager.purge_queue(QUEUE_NAME), len(TASKS))
+        self.assertEqual(self.__amqp_manager.queue_size(QUEUE_NAME), 0)
+
+        self.__amqp_manager.delete_queue(QUEUE_NAME)
+
     def test_consume_messages(self):
         self.__amqp_manager.create_queue(QUEUE_NAME)
 
@@ -88,3 +263,70 @@ class AMQPManagerTest(unittest.TestCase):
         self.__amqp_manager.acknowledge_messages(QUEUE_NAME, delivery_tags)
 
         self.__amqp_manager.delete_queue(QUEUE_NAME)
+
+    def test_consume_messages_timeout(self):
+        self.__amqp_manager.create_queue(QUEUE_NAME)
+
+        self.__amqp_manager.publish_messages(QUEUE_NAME, TASKS)
+
+        consumed_tasks, delivery_tags = self.__amqp_manager.consume_messages(
+            QUEUE_NAME,
+            len(TASKS) + 1,
+            timeout=5,
+            inactivity_timeout=1,
+            prefetch_count=1,
+        )
+
+        self.assertEqual(consumed_tasks, TASKS)
+
+        self.__amqp_manager.acknowledge_messages(QUEUE_NAME, delivery_tags)
+
+        self.__amqp_manager.delete_queue(QUEUE_NAME)
+
+    def test_reject_messages(self):
+        self.__amqp_manager.create_queue(QUEUE_NAME)
+
+        self.__amqp_manager.publish_messages(QUEUE_NAME, TASKS)
+
+        _, delivery_tags = self.__amqp_manager.consume_messages(QUEUE_NAME, len(TASKS))
+        self.__amqp_manager.reject_messages(QUEUE_NAME, delivery_tags, requeue=False)
+
+        time.sleep(1)
+
+        self.assertEqual(self.__amqp_manager.queue_size(QUEUE_NAME), 0)
+
+        self.__amqp_manager.delete_queue(QUEUE_NAME)
+
+
+class PendingConfirmsTest(unittest.TestCase):
+    def test_confirmations_by_batch(self):
+        pending_confirms = PendingConfirms()
+        earlier_batch = ConfirmedBatch()
+        batch = ConfirmedBatch()
+        for _ in range(2):
+            pending_confirms.add_pending(earlier_batch)
+        for _ in range(3):
+            pending_confirms.add_pending(batch)
+
+        # The earlier batch timed out, and its messages are confirmed with the ones of the batch.
+        pending_confirms.on_confirmation(get_confirmation(pika.spec.Basic.Ack, 4, multiple=True))
+        pending_confirms.on_confirmation(get_confirmation(pika.spec.Basic.Nack, 5))
+
+        self.assertEqual((earlier_batch.acknowledged, earlier_batch.rejected), (2, 0))
+        self.assertEqual((batch.acknowledged, batch.rejected), (2, 1))
+        self.assertEqual(pending_confirms.pending_number, 0)
+
+
+class CollapseDeliveryTagsTest(unittest.TestCase):
+    def test_collapse_all(self):
+        self.assertEqual(collapse_delivery_tags({1, 2, 3}, [3, 1, 2]), [(3, True)])
+
+    def test_collapse_leading_run(self):
+        self.assertEqual(collapse_delivery_tags({1, 2, 3, 4, 5}, [1, 2, 4, 5]), [(2, True), (4, False), (5, False)])
+
+    def test_collapse_after_pending(self):
+        self.assertEqual(collapse_delivery_tags({1, 2, 3}, [2, 3]), [(2, False), (3, False)])
+
+
+def get_confirmation(method_type, delivery_tag, multiple=False):
+    return pika.frame.Method(1, method_type(delivery_tag=delivery_tag, multiple=multiple))
@@ -0,0 +1,164 @@
+import asyncio
+import unittest
+from unittest import mock
+
+import pika
+
+from scheduler import async_amqp_manager
+from scheduler.async_amqp_manager import AsyncAMQPManager, AsyncPublisherConfirms
+from scheduler.memory_broker import MemoryAsyncConnection, MemoryBroker
+
+QUEUE_NAME = 'gpfunction'
+MESSAGES_NUMBER = 250
+
+TASKS = [
+    {
+        'job_name': 'gpfunction',
+        'task_number': task_number,
+        'dataset_name': 'higgs',
+        'learner_parameters': {
+            'pop_size': 1000,
+        },
+    }
+    for task_number in range(MESSAGES_NUMBER)
+]
+
+
+class WriteBuffer(object):
+    def __init__(self, sizes):
+        self.sizes = list(sizes)
+
+    def get_write_buffer_size(self):
+        return self.sizes.pop(0) if self.sizes else 0
+
+
+class AsyncAMQPManagerTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.__broker = MemoryBroker()
+        self.__amqp_manager = AsyncAMQPManager(MemoryAsyncConnection(self.__broker, asyncio.get_running_loop()))
+
+    async def asyncTearDown(self):
+        await self.__amqp_manager.close()
+
+    async def test_create_queue(self):
+        await self.__amqp_manager.create_queue(QUEUE_NAME)
+        self.assertTrue(await self.__amqp_manager.queue_exists(QUEUE_NAME))
+
+        await self.__amqp_manager.delete_queue(QUEUE_NAME)
+        self.assertFalse(await self.__amqp_manager.queue_exists(QUEUE_NAME))
+
+    async def test_create_queues(self):
+        queue_names = ['{}@{}'.format(QUEUE_NAME, i) for i in range(3)]
+
+        await self.__amqp_manager.create_queues(queue_names)
+
+        for queue_name in queue_names:
+            self.assertTrue(await self.__amqp_manager.queue_exists(queue_name))
+
+    async def test_queue_exists_concurrent(self):
+        queue_names = ['{}@{}'.format(QUEUE_NAME, i) for i in range(3)]
+        await self.__amqp_manager.create_queue(QUEUE_NAME)
+
+        # The passive declaration of the missing queue does not close the channel of the other declarations.
+        exists, *_ = await asyncio.gather(
+            self.__amqp_manager.queue_exists('missing'),
+            *[self.__amqp_manager.create_queue(queue_name) for queue_name in queue_names],
+        )
+
+        self.assertFalse(exists)
+        for queue_name in queue_names:
+            self.assertTrue(await self.__amqp_manager.queue_exists(queue_name))
+
+    async def test_publish_messages(self):
+        await self.__amqp_manager.create_queue(QUEUE_NAME)
+
+        await self.__amqp_manager.publish_messages(QUEUE_NAME, TASKS)
+        self.assertEqual(await self.__amqp_manager.queue_size(QUEUE_NAME), MESSAGES_NUMBER)
+
+    async def test_publish_messages_backpressure(self):
+        connection = MemoryAsyncConnection(self.__broker, asyncio.get_running_loop())
+        connection._transport = WriteBuffer([async_amqp_manager.PUBLISH_BUFFER_SIZE + 1] * 3)
+        amqp_manager = AsyncAMQPManager(connection)
+        await amqp_manager.create_queue(QUEUE_NAME)
+
+        await amqp_manager.publish_messages(QUEUE_NAME, TASKS)
+
+        self.assertEqual(connection._transport.sizes, [])
+        self.assertEqual(await amqp_manager.queue_size(QUEUE_NAME), MESSAGES_NUMBER)
+        await amqp_manager.close()
+
+    async def test_publish_messages_confirm(self):
+        await self.__amqp_manager.create_queue(QUEUE_NAME)
+
+        confirmation = await self.__amqp_manager.publish_messages(QUEUE_NAME, TASKS, confirm=True, window_size=8)
+
+        self.assertEqual(confirmation, (MESSAGES_NUMBER, MESSAGES_NUMBER, 0))
+        self.assertEqual(await self.__amqp_manager.queue_size(QUEUE_NAME), MESSAGES_NUMBER)
+
+    async def test_publish_messages_confirm_timeout(self):
+        await self.__amqp_manager.create_queue(QUEUE_NAME)
+
+        # The confirmations are lost, and the batch fails instead of waiting for each message.
+        with mock.patch.object(AsyncPublisherConfirms, 'on_confirmation'), \
+                mock.patch.object(AsyncPublisherConfirms.wait, '__defaults__', (0,)):
+            with self.assertRaises(TimeoutError) as context:
+                await self.__amqp_manager.publish_messages(QUEUE_NAME, TASKS, confirm=True, window_size=8)
+        self.assertIn('8 messages not confirmed before the timeout, delivery tags [1, 2', str(context.exception))
+
+        # The channel is replaced, and the next batch is confirmed.
+        confirmation = await self.__amqp_manager.publish_messages(QUEUE_NAME, TASKS, confirm=True, window_size=8)
+        self.assertEqual(confirmation, (MESSAGES_NUMBER, MESSAGES_NUMBER, 0))
+
+    async def test_publish_messages_interleaved(self):
+        queue_names = ['{}@{}'.format(QUEUE_NAME, i) for i in range(4)]
+        await self.__amqp_manager.create_queues(queue_names)
+
+        await asyncio.gather(*[
+            self.__amqp_manager.publish_messages(queue_name, TASKS) for queue_name in queue_names
+        ])
+
+        for queue_name in queue_names:
+            self.assertEqual(await self.__amqp_manager.queue_size(queue_name), MESSAGES_NUMBER)
+
+    async def test_consume_messages(self):
+        await self.__amqp_manager.create_queue(QUEUE_NAME)
+        await self.__amqp_manager.publish_messages(QUEUE_NAME, TASKS)
+
+        messages, delivery_tags = await self.__amqp_manager.consume_messages(
+            QUEUE_NAME,
+            MESSAGES_NUMBER,
+            prefetch_count=100,
+        )
+        await self.__amqp_manager.acknowledge_messages(QUEUE_NAME, delivery_tags)
+
+        self.assertEqual(messages, TASKS)
+        self.assertEqual(await self.__amqp_manager.queue_size(QUEUE_NAME), 0)
+
+    async def test_consume_messages_timeout(self):
+        await self.__amqp_manager.create_queue(QUEUE_NAME)
+        await self.__amqp_manager.publish_messages(QUEUE_NAME, TASKS[:2])
+
+        messages, delivery_tags = await self.__amqp_manager.consume_messages(
+            QUEUE_NAME,
+            len(TASKS),
+            inactivity_timeout=0.05,
+        )
+
+        self.assertEqual(messages, TASKS[:2])
+        self.assertEqual(len(delivery_tags), 2)
+
+    async def test_reject_messages(self):
+        await self.__amqp_manager.create_queue(QUEUE_NAME)
+        await self.__amqp_manager.publish_messages(QUEUE_NAME, TASKS[:2])
+
+        _, delivery_tags = await self.__amqp_manager.consume_messages(QUEUE_NAME, 2)
+        await self.__amqp_manager.reject_messages(QUEUE_NAME, delivery_tags)
+
+        self.assertEqual(await self.__amqp_manager.queue_size(QUEUE_NAME), 2)
+
+    async def test_consume_messages_missing_queue(self):
+        with self.assertRaises(pika.exceptions.ChannelClosedByBroker):
+            await self.__amqp_manager.consume_messages(QUEUE_NAME, 1, timeout=1)
+
+        await self.__amqp_manager.create_queue(QUEUE_NAME)
+        self.assertEqual(await self.__amqp_manager.queue_size(QUEUE_NAME), 0)
@@ -0,0 +1,36 @@
+import unittest
+
+from benchmarks import cases
+from benchmarks.__main__ import check_thresholds, run_benchmark
+
+
+class BenchmarksTest(unittest.TestCase):
+    def test_get_case_id(self):
+        benchmark = cases.Benchmark('publish_messages', {'learners_number': 10, 'confirm': True}, None)
+
+        self.assertEqual(cases.get_case_id(benchmark), 'publish_messages[confirm=true,learners_number=10]')
+
+    def test_get_benchmarks_unique(self):
+        case_ids = [cases.get_case_id(benchmark) for benchmark in cases.get_benchmarks()]
+
+        self.assertEqual(len(case_ids), len(set(case_ids)))
+
+    def test_run_benchmark(self):
+        benchmark = cases.Benchmark('publish_messages', {}, lambda: cases.setup_publish_messages(10, True))
+
+        result = run_benchmark(benchmark, repeats_number=1)
+
+        self.assertEqual(result['id'], 'publish_messages')
+        self.assertEqual(result['items_number'], 10)
+        self.assertGreater(result['item_microseconds'], 0)
+
+    def test_check_thresholds(self):
+        results = [
+            {'id': 'fast', 'item_microseconds': 1.0},
+            {'id': 'slow', 'item_microseconds': 3.0},
+            {'id': 'unchecked', 'item_microseconds': 3.0},
+        ]
+
+        regressions = check_thresholds(results, {'fast': 2.0, 'slow': 2.0})
+
+        self.assertEqual(regressions, [{'id': 'slow', 'item_microseconds': 3.0, 'threshold': 2.0}])
@@ -0,0 +1,61 @@
+import unittest
+
+from scheduler import channel_pool
+from scheduler.channel_pool import ChannelPool
+
+CHANNELS_NUMBER = 3
+
+
+class Channel(object):
+    def __init__(self, role):
+        self.role = role
+        self.is_open = True
+
+    def close(self):
+        self.is_open = False
+
+
+class ChannelPoolTest(unittest.TestCase):
+    def setUp(self):
+        self.__busy_names = set()
+        self.__discarded_names = []
+        self.__channel_pool = ChannelPool(
+            open_channel=Channel,
+            size=CHANNELS_NUMBER,
+            is_busy=lambda role, name, channel: name in self.__busy_names,
+            on_discard=lambda role, name: self.__discarded_names.append(name),
+        )
+
+    def tearDown(self):
+        self.__channel_pool.close()
+
+    def test_get(self):
+        channel = self.__channel_pool.get(channel_pool.PUBLISH_ROLE)
+
+        self.assertEqual(channel.role, channel_pool.PUBLISH_ROLE)
+        self.assertIs(self.__channel_pool.get(channel_pool.PUBLISH_ROLE), channel)
+
+        channel.close()
+
+        self.assertIsNot(self.__channel_pool.get(channel_pool.PUBLISH_ROLE), channel)
+        self.assertEqual(len(self.__channel_pool), 1)
+
+    def test_get_evicts_least_recently_used(self):
+        channels = [self.__channel_pool.get(channel_pool.CONSUME_ROLE, str(i)) for i in range(CHANNELS_NUMBER)]
+        self.__channel_pool.get(channel_pool.CONSUME_ROLE, '0')
+
+        self.__channel_pool.get(channel_pool.CONSUME_ROLE, str(CHANNELS_NUMBER))
+
+        self.assertEqual(len(self.__channel_pool), CHANNELS_NUMBER)
+        self.assertTrue(channels[0].is_open)
+        self.assertFalse(channels[1].is_open)
+        self.assertEqual(self.__discarded_names, ['1'])
+
+    def test_get_keeps_busy(self):
+        channels = [self.__channel_pool.get(channel_pool.CONSUME_ROLE, str(i)) for i in range(CHANNELS_NUMBER)]
+        self.__busy_names.update(str(i) for i in range(CHANNELS_NUMBER))
+
+        self.__channel_pool.get(channel_pool.CONSUME_ROLE, str(CHANNELS_NUMBER))
+
+        self.assertEqual(len(self.__channel_pool), CHANNELS_NUMBER + 1)
+        self.assertTrue(all(channel.is_open for channel in channels))
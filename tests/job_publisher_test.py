@@ -0,0 +1,135 @@
+import asyncio
+import queue
+import threading
+import time
+import unittest
+
+from scheduler.async_amqp_manager import AsyncAMQPManager
+from scheduler.job_publisher import AsyncJobPublisher, JobPublisher
+from scheduler.memory_broker import MemoryAsyncConnection, MemoryBroker
+
+JOB_NAME = 'gpfunction'
+QUEUE_NAME = 'gpfunction@learner.tasks'
+TASKS_NUMBER = 10
+
+
+class JobPublisherTest(unittest.TestCase):
+    def setUp(self):
+        self.__job_publisher = JobPublisher(workers_number=1, statuses_number=2)
+
+    def tearDown(self):
+        self.__job_publisher.shutdown()
+
+    def test_submit(self):
+        published_messages = []
+
+        def publish(job_status):
+            published_messages.extend(range(TASKS_NUMBER))
+            job_status.add_published(QUEUE_NAME, TASKS_NUMBER)
+
+        job_status = self.__job_publisher.submit(JOB_NAME, {QUEUE_NAME: TASKS_NUMBER}, publish)
+        self.__job_publisher.shutdown()
+
+        self.assertIs(self.__job_publisher.get_status(job_status.job_id), job_status)
+        self.assertEqual(published_messages, list(range(TASKS_NUMBER)))
+        self.assertEqual(job_status.to_dict(), {
+            'job_id': job_status.job_id,
+            'job_name': JOB_NAME,
+            'state': 'completed',
+            'error': None,
+            'queues': {
+                QUEUE_NAME: {
+                    'tasks_number': TASKS_NUMBER,
+                    'published_tasks_number': TASKS_NUMBER,
+                },
+            },
+        })
+
+    def test_submit_failed(self):
+        def publish(job_status):
+            raise ConnectionError('broker unavailable')
+
+        job_status = self.__job_publisher.submit(JOB_NAME, {QUEUE_NAME: TASKS_NUMBER}, publish)
+        self.__job_publisher.shutdown()
+
+        self.assertEqual(job_status.state, 'failed')
+        self.assertIn('broker unavailable', job_status.error)
+
+    def test_submit_backlog_full(self):
+        job_publisher = JobPublisher(workers_number=1, backlog_size=1)
+        started = threading.Event()
+        released = threading.Event()
+
+        def publish(job_status):
+            started.set()
+            released.wait()
+
+        try:
+            job_publisher.submit(JOB_NAME, {QUEUE_NAME: TASKS_NUMBER}, publish)
+            started.wait()
+            job_status = job_publisher.submit(JOB_NAME, {QUEUE_NAME: TASKS_NUMBER}, publish)
+            with self.assertRaises(queue.Full):
+                job_publisher.submit(JOB_NAME, {QUEUE_NAME: TASKS_NUMBER}, publish)
+
+            # The jobs published release their slots.
+            released.set()
+            deadline = time.monotonic() + 5
+            while True:
+                try:
+                    job_publisher.submit(JOB_NAME, {QUEUE_NAME: TASKS_NUMBER}, publish)
+                    break
+                except queue.Full:
+                    self.assertLess(time.monotonic(), deadline)
+                    time.sleep(0.01)
+            self.assertEqual(job_status.state, 'completed')
+        finally:
+            released.set()
+            job_publisher.shutdown()
+
+    def test_get_status_evicted(self):
+        job_statuses = [
+            self.__job_publisher.submit(JOB_NAME, {QUEUE_NAME: TASKS_NUMBER}, lambda job_status: None)
+            for _ in range(3)
+        ]
+
+        self.assertIsNone(self.__job_publisher.get_status(job_statuses[0].job_id))
+        self.assertIs(self.__job_publisher.get_status(job_statuses[-1].job_id), job_statuses[-1])
+
+
+class AsyncJobPublisherTest(unittest.TestCase):
+    def setUp(self):
+        self.__broker = MemoryBroker()
+        self.__job_publisher = AsyncJobPublisher(connect=self.__connect, statuses_number=2)
+
+    def tearDown(self):
+        self.__job_publisher.shutdown()
+
+    async def __connect(self):
+        return AsyncAMQPManager(MemoryAsyncConnection(self.__broker, asyncio.get_running_loop()))
+
+    def test_submit(self):
+        async def publish(amqp_manager, job_status):
+            await amqp_manager.create_queue(QUEUE_NAME)
+            confirmation = await amqp_manager.publish_messages(QUEUE_NAME, range(TASKS_NUMBER), confirm=True)
+            job_status.add_published(QUEUE_NAME, confirmation.acknowledged)
+
+        job_statuses = [
+            self.__job_publisher.submit(JOB_NAME, {QUEUE_NAME: TASKS_NUMBER}, publish)
+            for _ in range(2)
+        ]
+        self.__job_publisher.shutdown()
+
+        for job_status in job_statuses:
+            self.assertEqual(job_status.state, 'completed')
+            self.assertEqual(job_status.to_dict()['queues'][QUEUE_NAME]['published_tasks_number'], TASKS_NUMBER)
+        self.assertEqual(self.__broker.declare_queue(QUEUE_NAME, passive=True), (2 * TASKS_NUMBER, 0))
+
+    def test_submit_failed(self):
+        async def publish(amqp_manager, job_status):
+            await amqp_manager.queue_size(QUEUE_NAME)
+
+        job_status = self.__job_publisher.submit(JOB_NAME, {QUEUE_NAME: TASKS_NUMBER}, publish)
+        self.__job_publisher.shutdown()
+
+        self.assertEqual(job_status.state, 'failed')
+        self.assertIn('NOT_FOUND', job_status.error)
@@ -0,0 +1,108 @@
+import unittest
+
+from scheduler import job_schema
+
+JOB = {
+    'name': 'gpfunction',
+    'dataset_name': 'higgs',
+    'training_rate': 0.5,
+    'fusion_rate': 0.3,
+    'sample_rate': 0.1,
+    'class_attribute': 'label',
+    'class_attribute_type': 'text',
+    'true_class_value': 1,
+    'include_attributes': [],
+    'exclude_attributes': [],
+    'attributes_rate': 0.5,
+    'random_seed': 0,
+    'include_header': False,
+    'duration': 60,
+    'threshold': 0.5,
+    'learners_number': 10,
+    'learn_parameters': [
+        {'name': 'xover_op', 'type': 'text', 'values': ['SPUCrossover', 'KozaCrossover']},
+        {'name': 'pop_size', 'type': 'integer', 'range': {'start': 1000, 'stop': 2000, 'step': 100}},
+    ],
+    'predict_parameters': [
+        {'name': 'test_1', 'type': 'real', 'value': 0.1},
+    ],
+}
+
+
+class JobSchemaTest(unittest.TestCase):
+    def setUp(self):
+        self.__job = dict(JOB)
+
+    def tearDown(self):
+        pass
+
+    def __assert_invalid(self, message):
+        with self.assertRaises(ValueError) as context:
+            job_schema.validate_job(self.__job)
+        self.assertIn(message, str(context.exception))
+
+    def test_valid(self):
+        job_schema.validate_job(self.__job)
+
+    def test_type(self):
+        self.__job['training_rate'] = 'half'
+        self.__assert_invalid("$.training_rate: 'half' is not of type number")
+
+    def test_boolean_not_number(self):
+        self.__job['learners_number'] = True
+        self.__assert_invalid('$.learners_number: True is not of type integer')
+
+    def test_range(self):
+        self.__job['fusion_rate'] = 1.5
+        self.__assert_invalid('$.fusion_rate: 1.5 is greater than 1')
+
+    def test_required(self):
+        del self.__job['dataset_name']
+        self.__assert_invalid("$: missing property 'dataset_name'")
+
+    def test_additional_property(self):
+        self.__job['learner_number'] = 10
+        self.__assert_invalid("$: unexpected property 'learner_number'")
+
+    def test_nested(self):
+        self.__job['learn_parameters'] = [{'name': 'pop_size', 'type': 'integer', 'range': {'start': 1, 'stop': 2}}]
+        self.__assert_invalid("$.learn_parameters[0].range: missing property 'step'")
+
+    def test_any_of(self):
+        self.__job['learn_parameters'] = [{'name': 'pop_size', 'type': 'integer'}]
+        self.__assert_invalid("$.learn_parameters[0]: missing property 'values'")
+
+    def test_enum(self):
+        self.__job['predict_parameters'] = [{'name': 'test_1', 'type': 'float', 'value': 0.1}]
+        self.__assert_invalid("$.predict_parameters[0].type: 'float' is not one of")
+
+    def test_not_object(self):
+        with self.assertRaises(ValueError):
+            job_schema.validate_job(None)
+
+    def test_range_text(self):
+        self.__job['learn_parameters'] = [
+            {'name': 'xover_op', 'type': 'text', 'range': {'start': 0, 'stop': 1, 'step': 1}},
+        ]
+        self.__assert_invalid("$.learn_parameters[0].type: 'text' is not one of ['integer', 'real']")
+
+    def test_range_empty(self):
+        self.__job['learn_parameters'] = [
+            {'name': 'mutation_rate', 'type': 'real', 'range': {'start': 0, 'stop': 1, 'step': -0.1}},
+        ]
+        self.__assert_invalid('$.learn_parameters[0].range: ')
+        self.__assert_invalid('is empty')
+
+    def test_range_not_number(self):
+        self.__job['learn_parameters'] = [
+            {'name': 'pop_size', 'type': 'integer', 'range': {'start': 'one', 'stop': 10, 'step': 1}},
+        ]
+        self.__assert_invalid('$.learn_parameters[0].range: invalid literal')
+
+    def test_predict_value_not_number(self):
+        self.__job['predict_parameters'] = [{'name': 'p', 'type': 'integer', 'value': 'abc'}]
+        self.__assert_invalid("$.predict_parameters[0].value: invalid literal for int() with base 10: 'abc'")
+
+    def test_learn_value_not_number(self):
+        self.__job['learn_parameters'] = [{'name': 'mutation_rate', 'type': 'real', 'values': [0.1, 'high']}]
+        self.__assert_invalid("$.learn_parameters[0].values[1]: could not convert string to float: 'high'")
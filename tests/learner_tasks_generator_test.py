@@ -1,74 +1,16 @@
 import unittest
+import random
+import json
 
-from scheduler.tasks_generators import learner_tasks_generator
+import numpy
 
-JOB_NAME = 'gpfunction'
-TASKS_NUMBER = 10
-
-DATASET_NAME = 'higgs'
-TRAINING_RATE = 0.5
-FUSION_RATE = 0.3
-TRAINING_SAMPLE_RATE = 0.1
-CLASS_ATTRIBUTE = 'label'
-CLASS_ATTRIBUTE_TYPE = 'integer'
-TRUE_CLASS_ATTRIBUTE = 1
-INCLUDE_ATTRIBUTES = []
-EXCLUDE_ATTRIBUTES = []
-ATTRIBUTES_RATE = 0.5
-RANDOM_SEED = 0
-INCLUDE_HEADER = False
-DURATION = 60
-
-LEARNER_PARAMETERS = [
-    {
-        'name': 'xover_op',
-        'type': 'text',
-        'values': [
-            'SPUCrossover',
-            'KozaCrossover',
-        ],
-    },
-    {
-        'name': 'pop_size',
-        'type': 'integer',
-        'range': {
-            'start': 1000,
-            'stop': 2000,
-            'step': 100,
-        }
-    },
-    {
-        'name': 'mutation_rate',
-        'type': 'real',
-        'range': {
-            'start': 0.1,
-            'stop': 1.0,
-            'step': 0.001,
-        }
-    },
-]
+from scheduler.tasks_generators.learner_tasks_generator import LearnerTasksGenerator
+from tasks_generator_fixtures import LEARNER_PARAMETERS, RANDOM_SEED, TASKS_NUMBER, create_tasks_generator
 
 
 class LearnerTasksGeneratorTest(unittest.TestCase):
     def setUp(self):
-        self.__tasks_generator = learner_tasks_generator.LearnerTasksGenerator(
-            job_name=JOB_NAME,
-            tasks_number=TASKS_NUMBER,
-            dataset_name=DATASET_NAME,
-            training_rate=TRAINING_RATE,
-            fusion_rate=FUSION_RATE,
-            sample_rate=TRAINING_SAMPLE_RATE,
-            class_attribute=CLASS_ATTRIBUTE,
-            class_attribute_type=CLASS_ATTRIBUTE_TYPE,
-            true_class_value=TRUE_CLASS_ATTRIBUTE,
-            include_attributes=INCLUDE_ATTRIBUTES,
-            exclude_attributes=EXCLUDE_ATTRIBUTES,
-            attributes_rate=ATTRIBUTES_RATE,
-            random_seed=RANDOM_SEED,
-            include_header=INCLUDE_HEADER,
-            duration=DURATION,
-            learner_parameters=LEARNER_PARAMETERS,
-        )
+        self.__tasks_generator = create_tasks_generator(LearnerTasksGenerator)
 
     def tearDown(self):
         pass
@@ -76,3 +18,45 @@ class LearnerTasksGeneratorTest(unittest.TestCase):
     def test_tasks_generator(self):
         for task in self.__tasks_generator:
             print(task)
+
+    def test_serialize(self):
+        tasks = [json.dumps(task).encode() for task in create_tasks_generator(LearnerTasksGenerator)]
+
+        self.assertEqual(list(self.__tasks_generator.serialize()), tasks)
+
+    def test_learn_parameters_sequence(self):
+        random_generator = random.Random(RANDOM_SEED)
+        xover_ops = LEARNER_PARAMETERS[0]['values']
+        pop_sizes = list(range(1000, 2000, 100))
+        mutation_rates = [float(str(x)) for x in numpy.arange(0.1, 1.0, 0.001)]
+
+        for task in self.__tasks_generator:
+            self.assertEqual(task['learn_parameters'], {
+                'xover_op': random_generator.choice(xover_ops),
+                'pop_size': random_generator.choice(pop_sizes),
+                'mutation_rate': random_generator.choice(mutation_rates),
+            })
+
+    def test_generate_batch_seed_stable(self):
+        tasks = list(create_tasks_generator(LearnerTasksGenerator))
+
+        batch = self.__tasks_generator.generate_batch(TASKS_NUMBER // 2, seed_stable=True)
+        batch_next = self.__tasks_generator.generate_batch(TASKS_NUMBER, seed_stable=True)
+
+        self.assertEqual(len(batch_next['task_number']), TASKS_NUMBER - TASKS_NUMBER // 2)
+        task_numbers = list(batch['task_number']) + list(batch_next['task_number'])
+        self.assertEqual(task_numbers, [task['task_number'] for task in tasks])
+        for name in ('xover_op', 'pop_size', 'mutation_rate'):
+            values = list(batch['learn_parameters'][name]) + list(batch_next['learn_parameters'][name])
+            self.assertEqual(values, [task['learn_parameters'][name] for task in tasks])
+
+    def test_generate_batch(self):
+        batch = self.__tasks_generator.generate_batch(TASKS_NUMBER)
+        same_batch = create_tasks_generator(LearnerTasksGenerator).generate_batch(TASKS_NUMBER)
+
+        for name, values in batch['learn_parameters'].items():
+            self.assertEqual(len(values), TASKS_NUMBER)
+            self.assertEqual(list(values), list(same_batch['learn_parameters'][name]))
+        self.assertTrue(set(batch['learn_parameters']['xover_op']) <= set(LEARNER_PARAMETERS[0]['values']))
+        self.assertTrue(all(1000 <= x < 2000 and x % 100 == 0 for x in batch['learn_parameters']['pop_size']))
+        self.assertEqual(len(self.__tasks_generator.generate_batch(TASKS_NUMBER)['task_number']), 0)
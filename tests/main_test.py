@@ -1,7 +1,16 @@
 import unittest
+import marshal
 import os
+import json
+import queue
+import tempfile
+import time
+from unittest import mock
+
+import pika
 
 from scheduler import __main__
+from scheduler import job_publisher
 from scheduler.amqp_manager import AMQPManager
 
 
@@ -70,25 +79,29 @@ EXECUTOR_PARAMETERS = [
 ]
 
 AMQP_HOSTNAME = 'localhost'
+AMQP_TRANSPORT = os.environ.get('AMQP_TRANSPORT', 'memory')
 
 
 class MainTest(unittest.TestCase):
     def setUp(self):
         os.environ['AMQP_HOSTNAME'] = AMQP_HOSTNAME
+        os.environ['AMQP_TRANSPORT'] = AMQP_TRANSPORT
 
         self.__client = __main__.app.test_client()
         self.__client.testing = True
 
-        self.__amqp_manager = AMQPManager(AMQP_HOSTNAME)
+        self.__amqp_manager = AMQPManager(AMQP_HOSTNAME, transport=__main__.get_amqp_transports()[0])
         self.__learner_tasks_queue_name = __main__.LEARNER_TASKS_QUEUE_NAME.format(job_name_=JOB_NAME)
         self.__filter_tasks_queue_name = __main__.FILTER_TASKS_QUEUE_NAME.format(job_name_=JOB_NAME)
         self.__fuser_tasks_queue_name = __main__.FUSER_TASKS_QUEUE_NAME.format(job_name_=JOB_NAME)
 
     def tearDown(self):
-        pass
+        if __main__.tasks_spool is not None:
+            __main__.tasks_spool.close()
+            __main__.tasks_spool = None
     
-    def test_post_job(self):
-        data = {
+    def __get_job_data(self):
+        return {
             'name': JOB_NAME,
             'dataset_name': DATASET_NAME,
             'training_rate': TRAINING_RATE,
@@ -105,20 +118,283 @@ class MainTest(unittest.TestCase):
             'duration': DURATION,
             'threshold': THRESHOLD,
             'learners_number': LEARNERS_NUMBER,
-            'learner_parameters': LEARNER_PARAMETERS,
-            'executor_parameters': EXECUTOR_PARAMETERS,
+            'learn_parameters': json.dumps(LEARNER_PARAMETERS),
+            'predict_parameters': json.dumps(EXECUTOR_PARAMETERS),
         }
-        
+
+    def test_post_job(self):
         response = self.__client.post(
             '/job',
-            data=data,
+            data=self.__get_job_data(),
             content_type='multipart/form-data',
         )
-        
+
         print(response.data)
-        
+
+        self.assertEqual(response.status_code, 200)
+
+        self.__amqp_manager.delete_queue(self.__learner_tasks_queue_name)
+        self.__amqp_manager.delete_queue(self.__filter_tasks_queue_name)
+        self.__amqp_manager.delete_queue(self.__fuser_tasks_queue_name)
+
+    def test_post_job_async(self):
+        response = self.__client.post(
+            '/job?async=true',
+            data=self.__get_job_data(),
+            content_type='multipart/form-data',
+        )
+
+        self.assertEqual(response.status_code, 202)
+
+        job_status = response.get_json()
+        while job_status['state'] in ('queued', 'publishing'):
+            time.sleep(0.1)
+            job_status = self.__client.get(response.headers['Location']).get_json()
+
+        self.assertEqual(job_status['state'], 'completed')
+        self.assertEqual(
+            job_status['queues'][self.__learner_tasks_queue_name]['published_tasks_number'],
+            LEARNERS_NUMBER,
+        )
+        self.assertEqual(self.__amqp_manager.queue_size(self.__learner_tasks_queue_name), LEARNERS_NUMBER)
+
+        self.__amqp_manager.delete_queue(self.__learner_tasks_queue_name)
+        self.__amqp_manager.delete_queue(self.__filter_tasks_queue_name)
+        self.__amqp_manager.delete_queue(self.__fuser_tasks_queue_name)
+
+    def test_post_job_async_backlog_full(self):
+        with mock.patch.object(job_publisher.JobPublisher, 'submit', side_effect=queue.Full('backlog full')):
+            response = self.__client.post(
+                '/job?async=true',
+                data=self.__get_job_data(),
+                content_type='multipart/form-data',
+            )
+
+        self.assertEqual(response.status_code, 503)
+        self.assertFalse(self.__amqp_manager.queue_exists(self.__learner_tasks_queue_name))
+
+    def test_post_job_spooled(self):
+        with tempfile.TemporaryDirectory() as directory:
+            os.environ['JOB_SPOOL_PATH'] = directory
+            try:
+                response = self.__client.post(
+                    '/job',
+                    data=self.__get_job_data(),
+                    content_type='multipart/form-data',
+                )
+
+                self.assertEqual(response.status_code, 202)
+                self.assertTrue(__main__.get_task_spool().wait_drained(timeout=5))
+
+                response = self.__client.get('/admin/spool')
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response.get_json()['drained'])
+            finally:
+                del os.environ['JOB_SPOOL_PATH']
+                __main__.get_task_spool().close()
+                __main__.tasks_spool = None
+
+        self.assertEqual(self.__amqp_manager.queue_size(self.__learner_tasks_queue_name), LEARNERS_NUMBER)
+        self.assertEqual(self.__amqp_manager.queue_size(self.__fuser_tasks_queue_name), 1)
+
+        self.__amqp_manager.delete_queue(self.__learner_tasks_queue_name)
+        self.__amqp_manager.delete_queue(self.__filter_tasks_queue_name)
+        self.__amqp_manager.delete_queue(self.__fuser_tasks_queue_name)
+
+    def test_post_job_atomic(self):
+        response = self.__client.post(
+            '/job?atomic=true',
+            data=self.__get_job_data(),
+            content_type='multipart/form-data',
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.__amqp_manager.queue_size(self.__learner_tasks_queue_name), LEARNERS_NUMBER)
+        self.assertEqual(self.__amqp_manager.queue_size(self.__fuser_tasks_queue_name), 1)
+
+        self.__amqp_manager.delete_queue(self.__learner_tasks_queue_name)
+        self.__amqp_manager.delete_queue(self.__filter_tasks_queue_name)
+        self.__amqp_manager.delete_queue(self.__fuser_tasks_queue_name)
+
+    def test_post_job_atomic_rollback(self):
+        error = pika.exceptions.ConnectionClosedByBroker(320, 'CONNECTION_FORCED')
+        with mock.patch.object(AMQPManager, 'publish_transaction', side_effect=error):
+            response = self.__client.post(
+                '/job?atomic=true',
+                data=self.__get_job_data(),
+                content_type='multipart/form-data',
+            )
+
+        self.assertEqual(response.status_code, 503)
+        self.assertFalse(self.__amqp_manager.queue_exists(self.__learner_tasks_queue_name))
+        self.assertFalse(self.__amqp_manager.queue_exists(self.__filter_tasks_queue_name))
+        self.assertFalse(self.__amqp_manager.queue_exists(self.__fuser_tasks_queue_name))
+
+    def test_post_job_atomic_rollback_existing(self):
+        self.__client.post(
+            '/job',
+            data=self.__get_job_data(),
+            content_type='multipart/form-data',
+        )
+
+        error = pika.exceptions.ConnectionClosedByBroker(320, 'CONNECTION_FORCED')
+        with mock.patch.object(AMQPManager, 'publish_transaction', side_effect=error):
+            response = self.__client.post(
+                '/job?atomic=true',
+                data=self.__get_job_data(),
+                content_type='multipart/form-data',
+            )
+
+        # The queues and the tasks of the earlier submission are kept.
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(self.__amqp_manager.queue_size(self.__learner_tasks_queue_name), LEARNERS_NUMBER)
+        self.assertEqual(self.__amqp_manager.queue_size(self.__fuser_tasks_queue_name), 1)
+
+        self.__amqp_manager.delete_queue(self.__learner_tasks_queue_name)
+        self.__amqp_manager.delete_queue(self.__filter_tasks_queue_name)
+        self.__amqp_manager.delete_queue(self.__fuser_tasks_queue_name)
+
+    def test_post_job_invalid(self):
+        data = self.__get_job_data()
+        data['training_rate'] = 'half'
+
+        response = self.__client.post(
+            '/job',
+            data=data,
+            content_type='multipart/form-data',
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(self.__amqp_manager.queue_exists(self.__learner_tasks_queue_name))
+
+    def test_post_job_json(self):
+        response = self.__client.post('/job', json=self.__get_job_spec(JOB_NAME))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.__amqp_manager.queue_size(self.__learner_tasks_queue_name), LEARNERS_NUMBER)
+
+        self.__amqp_manager.delete_queue(self.__learner_tasks_queue_name)
+        self.__amqp_manager.delete_queue(self.__filter_tasks_queue_name)
+        self.__amqp_manager.delete_queue(self.__fuser_tasks_queue_name)
+
+    def test_post_job_json_invalid(self):
+        job_spec = self.__get_job_spec(JOB_NAME)
+        job_spec['learn_parameters'][0] = {'name': 'xover_op', 'type': 'text'}
+
+        response = self.__client.post('/job', json=job_spec)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('learn_parameters[0]', response.get_data(as_text=True))
+        self.assertFalse(self.__amqp_manager.queue_exists(self.__learner_tasks_queue_name))
+
+    def test_post_job_invalid_value(self):
+        job_spec = self.__get_job_spec(JOB_NAME)
+        job_spec['predict_parameters'][0] = {'name': 'test_1', 'type': 'integer', 'value': 'abc'}
+
+        response = self.__client.post('/job', json=job_spec)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('predict_parameters[0].value', response.get_data(as_text=True))
+
+        # The form bodies are not validated by the schema, but the generators convert the values eagerly.
+        data = self.__get_job_data()
+        data['predict_parameters'] = json.dumps(job_spec['predict_parameters'])
+        response = self.__client.post('/job', data=data, content_type='multipart/form-data')
+
+        self.assertEqual(response.status_code, 400)
+        for queue_name in (self.__learner_tasks_queue_name, self.__filter_tasks_queue_name,
+                           self.__fuser_tasks_queue_name):
+            self.assertFalse(self.__amqp_manager.queue_exists(queue_name))
+
+    def test_get_metrics(self):
+        self.__client.post(
+            '/job',
+            data=self.__get_job_data(),
+            content_type='multipart/form-data',
+        )
+
+        response = self.__client.get('/metrics')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('scheduler_job_stage_seconds_count{stage="publish"}', response.get_data(as_text=True))
+        self.assertIn(
+            'scheduler_amqp_published_messages_total{{queue="{}"}}'.format(self.__learner_tasks_queue_name),
+            response.get_data(as_text=True),
+        )
+
+        self.__amqp_manager.delete_queue(self.__learner_tasks_queue_name)
+        self.__amqp_manager.delete_queue(self.__filter_tasks_queue_name)
+        self.__amqp_manager.delete_queue(self.__fuser_tasks_queue_name)
+
+    def test_post_job_profiled(self):
+        response = self.__client.post(
+            '/job',
+            data=self.__get_job_data(),
+            content_type='multipart/form-data',
+            headers={'X-Profile': 'true'},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        profile_id = response.headers['X-Profile-Id']
+
+        profiles = self.__client.get('/admin/profiles').get_json()
+        self.assertEqual(profiles[0]['profile_id'], profile_id)
+
+        response = self.__client.get('/admin/profiles/{}?format=text'.format(profile_id))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('function calls', response.get_data(as_text=True))
+
+        response = self.__client.get('/admin/profiles/{}'.format(profile_id))
         self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['Content-Type'], 'application/octet-stream')
+        # The tasks are generated in the serializer thread of the manager, profiled with the request.
+        function_names = {function_name for _, _, function_name in marshal.loads(response.get_data())}
+        self.assertIn('__serialize_chunks', function_names)
+
+        self.assertEqual(self.__client.get('/admin/profiles/missing').status_code, 404)
 
         self.__amqp_manager.delete_queue(self.__learner_tasks_queue_name)
         self.__amqp_manager.delete_queue(self.__filter_tasks_queue_name)
         self.__amqp_manager.delete_queue(self.__fuser_tasks_queue_name)
+
+    def __get_job_spec(self, job_name):
+        job_spec = dict(self.__get_job_data(), name=job_name)
+        job_spec['learn_parameters'] = [dict(parameter) for parameter in LEARNER_PARAMETERS]
+        job_spec['predict_parameters'] = [dict(parameter) for parameter in EXECUTOR_PARAMETERS]
+        return job_spec
+
+    def test_post_jobs_batch(self):
+        job_names = ['{}_{}'.format(JOB_NAME, i) for i in range(3)]
+
+        response = self.__client.post(
+            '/jobs/batch',
+            json=[self.__get_job_spec(job_name) for job_name in job_names],
+        )
+
+        self.assertEqual(response.status_code, 200)
+        jobs = response.get_json()
+        self.assertEqual([job['name'] for job in jobs], job_names)
+
+        for job_name in job_names:
+            learner_tasks_queue_name = __main__.LEARNER_TASKS_QUEUE_NAME.format(job_name_=job_name)
+            self.assertEqual(
+                jobs[job_names.index(job_name)]['queues'][learner_tasks_queue_name],
+                {'published': LEARNERS_NUMBER, 'acknowledged': LEARNERS_NUMBER, 'rejected': 0},
+            )
+            self.assertEqual(self.__amqp_manager.queue_size(learner_tasks_queue_name), LEARNERS_NUMBER)
+
+            for queue_name in (__main__.LEARNER_TASKS_QUEUE_NAME, __main__.FILTER_TASKS_QUEUE_NAME,
+                               __main__.FUSER_TASKS_QUEUE_NAME):
+                self.__amqp_manager.delete_queue(queue_name.format(job_name_=job_name))
+
+    def test_post_jobs_batch_invalid(self):
+        job_specs = [self.__get_job_spec(JOB_NAME), self.__get_job_spec(JOB_NAME), self.__get_job_spec('other')]
+        job_specs[2]['training_rate'] = 'half'
+
+        response = self.__client.post('/jobs/batch', json=job_specs)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['index'] for error in response.get_json()['errors']], [1, 2])
+        self.assertFalse(self.__amqp_manager.queue_exists(self.__learner_tasks_queue_name))
+
+        self.assertEqual(self.__client.post('/jobs/batch', json={}).status_code, 400)
@@ -0,0 +1,111 @@
+import unittest
+
+import pika
+
+from scheduler.memory_broker import MemoryBroker
+
+QUEUE_NAME = 'gpfunction'
+MESSAGES_NUMBER = 5
+
+
+class MemoryBrokerTest(unittest.TestCase):
+    def setUp(self):
+        self.__broker = MemoryBroker()
+        self.__connection = self.__broker.connect()
+        self.__channel = self.__connection.channel()
+        self.__channel.queue_declare(queue=QUEUE_NAME, durable=True)
+
+        for i in range(MESSAGES_NUMBER):
+            self.__channel.basic_publish(exchange='', routing_key=QUEUE_NAME, body=str(i).encode())
+
+    def tearDown(self):
+        self.__connection.close()
+
+    def __consume(self, channel, messages_number):
+        deliveries = []
+        for method, _, body in channel.consume(QUEUE_NAME, inactivity_timeout=0.01):
+            if method is None:
+                break
+            deliveries.append((method, body))
+            if len(deliveries) == messages_number:
+                break
+        return deliveries
+
+    def test_queue_declare_passive(self):
+        method_frame = self.__channel.queue_declare(queue=QUEUE_NAME, passive=True)
+        self.assertEqual(method_frame.method.message_count, MESSAGES_NUMBER)
+
+        with self.assertRaises(pika.exceptions.ChannelClosedByBroker):
+            self.__channel.queue_declare(queue='missing', passive=True)
+        self.assertFalse(self.__channel.is_open)
+
+    def test_publish_unroutable(self):
+        self.__channel.basic_publish(exchange='', routing_key='missing', body=b'')
+
+        self.assertEqual(self.__broker.declare_queue(QUEUE_NAME, passive=True), (MESSAGES_NUMBER, 0))
+
+    def test_prefetch(self):
+        self.__channel.basic_qos(prefetch_count=2)
+
+        deliveries = self.__consume(self.__channel, MESSAGES_NUMBER)
+
+        self.assertEqual([body for _, body in deliveries], [b'0', b'1'])
+        self.assertEqual([method.delivery_tag for method, _ in deliveries], [1, 2])
+
+        self.__channel.basic_ack(delivery_tag=2, multiple=True)
+        deliveries = self.__consume(self.__channel, MESSAGES_NUMBER)
+        self.assertEqual([body for _, body in deliveries], [b'2', b'3'])
+
+    def test_cancel_requeues(self):
+        self.__channel.basic_qos(prefetch_count=MESSAGES_NUMBER)
+        self.__consume(self.__channel, 1)
+
+        self.assertEqual(self.__channel.cancel(), MESSAGES_NUMBER - 1)
+        self.assertEqual(self.__broker.declare_queue(QUEUE_NAME, passive=True), (MESSAGES_NUMBER - 1, 0))
+
+    def test_close_requeues(self):
+        channel = self.__connection.channel()
+        channel.basic_qos(prefetch_count=2)
+        self.__consume(channel, 2)
+        channel.close()
+
+        deliveries = self.__consume(self.__channel, MESSAGES_NUMBER)
+        self.assertEqual([body for _, body in deliveries], [str(i).encode() for i in range(MESSAGES_NUMBER)])
+        self.assertTrue(deliveries[0][0].redelivered)
+        self.assertFalse(deliveries[-1][0].redelivered)
+
+    def test_nack(self):
+        deliveries = self.__consume(self.__channel, 2)
+        self.__channel.basic_nack(delivery_tag=deliveries[0][0].delivery_tag, requeue=False)
+        self.__channel.basic_nack(delivery_tag=deliveries[1][0].delivery_tag, requeue=True)
+        self.__channel.cancel()
+
+        self.assertEqual(self.__broker.declare_queue(QUEUE_NAME, passive=True), (MESSAGES_NUMBER - 1, 0))
+
+    def test_ack_unknown_delivery_tag(self):
+        self.__channel.basic_ack(delivery_tag=42)
+
+        self.assertFalse(self.__channel.is_open)
+
+    def test_purge_and_delete(self):
+        self.assertEqual(self.__channel.queue_purge(queue=QUEUE_NAME).method.message_count, MESSAGES_NUMBER)
+        self.assertEqual(self.__channel.queue_delete(queue=QUEUE_NAME).method.message_count, 0)
+
+        with self.assertRaises(pika.exceptions.ChannelClosedByBroker):
+            self.__broker.declare_queue(QUEUE_NAME, passive=True)
+
+    def test_transaction(self):
+        channel = self.__connection.channel()
+        channel.tx_select()
+
+        channel.basic_publish(exchange='', routing_key=QUEUE_NAME, body=b'rolled back')
+        channel.tx_rollback()
+        channel.basic_publish(exchange='', routing_key=QUEUE_NAME, body=b'committed')
+        self.assertEqual(self.__broker.declare_queue(QUEUE_NAME, passive=True), (MESSAGES_NUMBER, 0))
+
+        channel.tx_commit()
+        self.assertEqual(self.__broker.declare_queue(QUEUE_NAME, passive=True), (MESSAGES_NUMBER + 1, 0))
+
+    def test_commit_not_transactional(self):
+        with self.assertRaises(pika.exceptions.ChannelClosedByBroker):
+            self.__channel.tx_commit()
@@ -0,0 +1,63 @@
+import unittest
+import json
+
+from scheduler import message_codecs
+from scheduler.message_codecs import MessageCodec
+
+MESSAGE = {
+    'job_name': 'gpfunction',
+    'task_number': 0,
+    'include_attributes': ['attribute_{}'.format(i) for i in range(1000)],
+}
+
+COMPRESSION_THRESHOLD = 1024
+
+
+class MessageCodecTest(unittest.TestCase):
+    def test_json(self):
+        codec = MessageCodec()
+
+        body, content_type, content_encoding = codec.encode(MESSAGE)
+
+        self.assertEqual(body, json.dumps(MESSAGE).encode())
+        self.assertEqual(content_type, message_codecs.JSON_CONTENT_TYPE)
+        self.assertIsNone(content_encoding)
+        self.assertEqual(MessageCodec.decode(body, content_type, content_encoding), MESSAGE)
+
+    def test_compression(self):
+        codec = MessageCodec(
+            content_encoding=message_codecs.ZLIB_CONTENT_ENCODING,
+            compression_threshold=COMPRESSION_THRESHOLD,
+        )
+
+        body, content_type, content_encoding = codec.encode(MESSAGE)
+        self.assertEqual(content_encoding, message_codecs.ZLIB_CONTENT_ENCODING)
+        self.assertLess(len(body), len(json.dumps(MESSAGE)))
+        self.assertEqual(MessageCodec.decode(body, content_type, content_encoding), MESSAGE)
+
+        body, content_type, content_encoding = codec.encode({'task_number': 0})
+        self.assertIsNone(content_encoding)
+
+    def test_serialized(self):
+        codec = MessageCodec(content_encoding=message_codecs.ZLIB_CONTENT_ENCODING, compression_threshold=0)
+
+        body, content_type, content_encoding = codec.encode(json.dumps(MESSAGE).encode())
+
+        self.assertEqual(content_type, message_codecs.JSON_CONTENT_TYPE)
+        self.assertEqual(MessageCodec.decode(body, content_type, content_encoding), MESSAGE)
+
+    def test_msgpack(self):
+        if message_codecs.msgpack is None:
+            self.skipTest('msgpack not installed')
+
+        codec = MessageCodec(content_type=message_codecs.MSGPACK_CONTENT_TYPE)
+
+        body, content_type, content_encoding = codec.encode(MESSAGE)
+        self.assertEqual(content_type, message_codecs.MSGPACK_CONTENT_TYPE)
+        self.assertEqual(MessageCodec.decode(body, content_type, content_encoding), MESSAGE)
+
+    def test_unsupported(self):
+        with self.assertRaises(ValueError):
+            MessageCodec(content_type='text/csv')
+        with self.assertRaises(ValueError):
+            MessageCodec.decode(b'', message_codecs.JSON_CONTENT_TYPE, 'br')
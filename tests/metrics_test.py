@@ -0,0 +1,68 @@
+import unittest
+
+from scheduler import metrics
+from scheduler.metrics import MetricsRegistry
+
+
+class MetricsTest(unittest.TestCase):
+    def setUp(self):
+        self.__registry = MetricsRegistry()
+
+    def tearDown(self):
+        pass
+
+    def test_counter(self):
+        counter = self.__registry.counter('messages_total', 'Messages.', ['queue'])
+
+        counter.inc(2, ('gpfunction@learner.tasks',))
+        counter.inc(3, ('gpfunction@learner.tasks',))
+        counter.inc(1, ('a"b',))
+
+        self.assertEqual(self.__registry.render(), '\n'.join([
+            '# HELP messages_total Messages.',
+            '# TYPE messages_total counter',
+            'messages_total{queue="gpfunction@learner.tasks"} 5',
+            'messages_total{queue="a\\"b"} 1',
+        ]) + '\n')
+
+    def test_histogram(self):
+        histogram = self.__registry.histogram('latency_seconds', 'Latency.', buckets=[0.1, 1])
+
+        histogram.observe(0.1)
+        histogram.observe(0.5)
+        histogram.observe(2)
+
+        self.assertEqual(self.__registry.render(), '\n'.join([
+            '# HELP latency_seconds Latency.',
+            '# TYPE latency_seconds histogram',
+            'latency_seconds_bucket{le="0.1"} 1',
+            'latency_seconds_bucket{le="1.0"} 2',
+            'latency_seconds_bucket{le="+Inf"} 3',
+            'latency_seconds_sum 2.6',
+            'latency_seconds_count 3',
+        ]) + '\n')
+
+    def test_histogram_timed(self):
+        histogram = self.__registry.histogram('operation_seconds', 'Operations.', ['operation'])
+
+        @histogram.timed('sum')
+        def add(a, b):
+            return a + b
+
+        self.assertEqual(add(1, 2), 3)
+        with histogram.time('block'):
+            pass
+
+        rendered = self.__registry.render()
+        self.assertIn('operation_seconds_count{operation="sum"} 1', rendered)
+        self.assertIn('operation_seconds_count{operation="block"} 1', rendered)
+
+    def test_series_bounded(self):
+        counter = self.__registry.counter('messages_total', 'Messages.', ['queue'])
+
+        for i in range(metrics.SERIES_NUMBER + 1):
+            counter.inc(1, (str(i),))
+
+        rendered = self.__registry.render()
+        self.assertNotIn('messages_total{queue="0"}', rendered)
+        self.assertIn('messages_total{{queue="{}"}}'.format(metrics.SERIES_NUMBER), rendered)
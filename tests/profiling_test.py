@@ -0,0 +1,90 @@
+import contextvars
+import marshal
+import pstats
+import threading
+import unittest
+
+from scheduler import profiling
+from scheduler.profiling import ProfileSession
+from scheduler.profiling import ProfileStore
+
+PROFILES_NUMBER = 2
+
+
+def generate_tasks():
+    return [str(i) for i in range(1000)]
+
+
+def profiled_in_thread():
+    thread = threading.Thread(target=contextvars.copy_context().run, args=(profiling.call, generate_tasks))
+    thread.start()
+    thread.join()
+
+
+class ProfilingTest(unittest.TestCase):
+    def setUp(self):
+        self.__store = ProfileStore(profiles_number=PROFILES_NUMBER)
+
+    def tearDown(self):
+        pass
+
+    def __get_function_names(self, stats):
+        return {function_name for _, _, function_name in stats.stats}
+
+    def test_profile_threads(self):
+        session = ProfileSession('job')
+        with session.profile():
+            profiled_in_thread()
+
+        stats = session.get_stats()
+        self.assertIn('generate_tasks', self.__get_function_names(stats))
+        self.assertIsNotNone(session.seconds)
+
+        self.assertEqual(marshal.loads(profiling.dump_stats(stats)), stats.stats)
+        self.assertIn('generate_tasks', profiling.print_stats(stats, 'tottime'))
+
+    def test_profile_concurrent_sessions(self):
+        other_session = ProfileSession('other_job')
+
+        def profile_other_job():
+            with other_session.profile():
+                generate_tasks()
+
+        session = ProfileSession('job')
+        with session.profile():
+            thread = threading.Thread(target=contextvars.Context().run, args=(profile_other_job,))
+            thread.start()
+            thread.join()
+
+        # A process-wide profiler cannot be enabled twice, so the other job is only seen by the first session.
+        self.assertEqual(other_session.is_profiled, not profiling.PROCESS_WIDE_PROFILER)
+        self.assertIsNotNone(other_session.seconds)
+        stats = (other_session if other_session.is_profiled else session).get_stats()
+        self.assertIn('generate_tasks', self.__get_function_names(stats))
+
+    def test_call_without_session(self):
+        self.assertIsNone(profiling.current_session.get())
+        self.assertEqual(profiling.call(len, 'job'), 3)
+
+    def test_call_nested(self):
+        session = ProfileSession('job')
+        with session.profile():
+            profiling.call(generate_tasks)
+
+        self.assertIsInstance(session.get_stats(), pstats.Stats)
+        self.assertIn('generate_tasks', self.__get_function_names(session.get_stats()))
+        self.assertFalse(profiling.profiled_thread.active)
+
+    def test_store_eviction(self):
+        sessions = [ProfileSession('job_{}'.format(i)) for i in range(PROFILES_NUMBER + 1)]
+        for session in sessions:
+            with session.profile():
+                pass
+            self.__store.add(session)
+
+        self.assertIsNone(self.__store.get(sessions[0].session_id))
+        self.assertIs(self.__store.get(sessions[-1].session_id), sessions[-1])
+        self.assertEqual(
+            [profile['profile_id'] for profile in self.__store.list()],
+            [session.session_id for session in reversed(sessions[1:])],
+        )
@@ -0,0 +1,62 @@
+import unittest
+import threading
+import time
+
+from scheduler.queues_statistics_cache import QueuesStatisticsCache
+
+QUEUE_NAMES = ['gpfunction@learner.tasks', 'gpfunction@filter.tasks', 'gpfunction@fuser.tasks']
+MISSING_QUEUE_NAME = 'missing@learner.tasks'
+
+TTL = 0.2
+RETRIEVAL_TIME = 0.1
+
+
+class QueuesStatisticsCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.__retrievals = []
+        self.__queues_statistics_cache = QueuesStatisticsCache(self.__get_queues_statistics, TTL)
+
+    def tearDown(self):
+        pass
+
+    def __get_queues_statistics(self, queue_names):
+        self.__retrievals.append(list(queue_names))
+        time.sleep(RETRIEVAL_TIME)
+        return {
+            queue_name: {'messages_number': len(self.__retrievals), 'consumers_number': 0}
+            for queue_name in queue_names if queue_name != MISSING_QUEUE_NAME
+        }
+
+    def test_get(self):
+        statistics = self.__queues_statistics_cache.get(QUEUE_NAMES + [MISSING_QUEUE_NAME])
+
+        self.assertEqual(statistics[QUEUE_NAMES[0]]['messages_number'], 1)
+        self.assertIsNone(statistics[MISSING_QUEUE_NAME])
+        self.assertEqual(self.__queues_statistics_cache.get(QUEUE_NAMES), {
+            queue_name: statistics[queue_name] for queue_name in QUEUE_NAMES
+        })
+        self.assertEqual(len(self.__retrievals), 1)
+
+        time.sleep(TTL)
+
+        self.assertEqual(self.__queues_statistics_cache.get(QUEUE_NAMES)[QUEUE_NAMES[0]]['messages_number'], 2)
+
+    def test_get_coalesced(self):
+        threads = [
+            threading.Thread(target=self.__queues_statistics_cache.get, args=(QUEUE_NAMES,))
+            for _ in range(10)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.__retrievals, [QUEUE_NAMES])
+
+    def test_get_pruned(self):
+        queues_statistics_cache = QueuesStatisticsCache(self.__get_queues_statistics, TTL, size=1)
+
+        for queue_name in QUEUE_NAMES[:2] + QUEUE_NAMES[:1]:
+            queues_statistics_cache.get([queue_name])
+
+        self.assertEqual(self.__retrievals, [QUEUE_NAMES[:1], QUEUE_NAMES[1:2], QUEUE_NAMES[:1]])
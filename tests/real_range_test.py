@@ -0,0 +1,32 @@
+import unittest
+
+import numpy
+
+from scheduler.tasks_generators.real_range import RealRange
+
+RANGES = [
+    (0.1, 1.0, 0.001),
+    (0.0, 1.0, 0.3),
+    (-2.5, 2.5, 0.07),
+    (1.0, 0.0, -0.1),
+    (1.0, 1.0, 0.1),
+]
+
+
+class RealRangeTest(unittest.TestCase):
+    def test_values(self):
+        for start, stop, step in RANGES:
+            expected = [float(str(x)) for x in numpy.arange(start, stop, step)]
+            real_range = RealRange(start, stop, step)
+
+            self.assertEqual(len(real_range), len(expected))
+            self.assertEqual(list(real_range), expected)
+
+    def test_indexing(self):
+        real_range = RealRange(0.0, 1.0, 1e-7)
+
+        self.assertEqual(len(real_range), 10000000)
+        self.assertEqual(real_range[0], 0.0)
+        self.assertAlmostEqual(real_range[-1], 1.0 - 1e-7)
+        with self.assertRaises(IndexError):
+            real_range[len(real_range)]
@@ -0,0 +1,159 @@
+import os
+import tempfile
+import unittest
+
+from scheduler.amqp_manager import AMQPManager
+from scheduler.memory_broker import MemoryBroker
+from scheduler.task_spool import SpoolSegment, TaskSpool
+
+AMQP_HOSTNAME = 'localhost'
+
+LEARNER_QUEUE_NAME = 'gpfunction@learner.tasks'
+FUSER_QUEUE_NAME = 'gpfunction@fuser.tasks'
+MESSAGES_NUMBER = 50
+SEGMENT_SIZE = 512
+STAGING_SIZE = 64
+RETRY_INTERVAL = 0.01
+DRAIN_TIMEOUT = 5
+
+
+def get_messages(messages_number=MESSAGES_NUMBER):
+    messages = [(LEARNER_QUEUE_NAME, '{{"task_number": {}}}'.format(i).encode()) for i in range(messages_number)]
+    return messages + [(FUSER_QUEUE_NAME, b'{}')]
+
+
+class TaskSpoolTest(unittest.TestCase):
+    def setUp(self):
+        self.__directory = tempfile.TemporaryDirectory()
+        self.__broker = MemoryBroker()
+        self.__amqp_manager = AMQPManager(AMQP_HOSTNAME, transport=self.__broker.connect)
+        self.__failures_number = 0
+        self.__failure = OSError('Connection refused')
+        self.__spools = []
+
+    def tearDown(self):
+        for spool in self.__spools:
+            spool.close()
+        self.__amqp_manager.close()
+        self.__directory.cleanup()
+
+    def __connect(self):
+        if self.__failures_number > 0:
+            self.__failures_number -= 1
+            raise self.__failure
+        return AMQPManager(AMQP_HOSTNAME, transport=self.__broker.connect)
+
+    def __create_spool(self, segment_size=SEGMENT_SIZE, staging_size=STAGING_SIZE):
+        spool = TaskSpool(
+            self.__directory.name,
+            self.__connect,
+            segment_size=segment_size,
+            batch_size=10,
+            retry_interval=RETRY_INTERVAL,
+            staging_size=staging_size,
+        )
+        self.__spools.append(spool)
+        return spool
+
+    def __get_segment_names(self):
+        return [name for name in os.listdir(self.__directory.name) if name.endswith('.segment')]
+
+    def test_append_and_drain(self):
+        spool = self.__create_spool()
+
+        self.assertEqual(spool.append(get_messages()), MESSAGES_NUMBER + 1)
+
+        self.assertTrue(spool.wait_drained(DRAIN_TIMEOUT))
+        self.assertEqual(self.__amqp_manager.queue_size(LEARNER_QUEUE_NAME), MESSAGES_NUMBER)
+        self.assertEqual(self.__amqp_manager.queue_size(FUSER_QUEUE_NAME), 1)
+
+        messages, _ = self.__amqp_manager.consume_messages(LEARNER_QUEUE_NAME, MESSAGES_NUMBER)
+        self.assertEqual([message['task_number'] for message in messages], list(range(MESSAGES_NUMBER)))
+        # The drained segments are deleted.
+        self.assertEqual(len(self.__get_segment_names()), 1)
+
+    def test_append_staged(self):
+        spool = self.__create_spool(staging_size=0)
+
+        self.assertEqual(spool.append(get_messages()), MESSAGES_NUMBER + 1)
+
+        self.assertTrue(spool.wait_drained(DRAIN_TIMEOUT))
+        messages, _ = self.__amqp_manager.consume_messages(LEARNER_QUEUE_NAME, MESSAGES_NUMBER)
+        self.assertEqual([message['task_number'] for message in messages], list(range(MESSAGES_NUMBER)))
+        self.assertEqual(self.__amqp_manager.queue_size(FUSER_QUEUE_NAME), 1)
+        # The temporary file of the staged tasks is removed.
+        self.assertEqual(len(os.listdir(self.__directory.name)), 2)
+
+    def test_retry_after_failure(self):
+        self.__failures_number = 3
+        spool = self.__create_spool()
+
+        spool.append(get_messages())
+
+        self.assertTrue(spool.wait_drained(DRAIN_TIMEOUT))
+        self.assertIsInstance(spool.last_error, OSError)
+        self.assertEqual(self.__amqp_manager.queue_size(LEARNER_QUEUE_NAME), MESSAGES_NUMBER)
+
+    def test_resume_after_restart(self):
+        self.__failures_number = float('inf')
+        spool = self.__create_spool()
+        spool.append(get_messages())
+        self.assertFalse(spool.wait_drained(0.05))
+        spool.close()
+        self.__spools.remove(spool)
+
+        self.__failures_number = 0
+        spool = self.__create_spool()
+        self.assertTrue(spool.wait_drained(DRAIN_TIMEOUT))
+        spool.close()
+        self.__spools.remove(spool)
+
+        # The confirmed tasks are not published again.
+        spool = self.__create_spool()
+        self.assertTrue(spool.wait_drained(DRAIN_TIMEOUT))
+        self.assertEqual(self.__amqp_manager.queue_size(LEARNER_QUEUE_NAME), MESSAGES_NUMBER)
+
+    def test_interrupted_append(self):
+        def interrupted_messages():
+            yield from get_messages()
+            raise ValueError('Invalid task')
+
+        spool = self.__create_spool()
+
+        with self.assertRaises(ValueError):
+            spool.append(interrupted_messages())
+        spool.append(get_messages(1))
+
+        self.assertTrue(spool.wait_drained(DRAIN_TIMEOUT))
+        self.assertEqual(self.__amqp_manager.queue_size(LEARNER_QUEUE_NAME), 1)
+
+    def test_large_message(self):
+        spool = self.__create_spool()
+
+        spool.append([(LEARNER_QUEUE_NAME, b'0' * SEGMENT_SIZE * 2)])
+
+        self.assertTrue(spool.wait_drained(DRAIN_TIMEOUT))
+        self.assertEqual(self.__amqp_manager.queue_size(LEARNER_QUEUE_NAME), 1)
+
+    def test_unexpected_error(self):
+        self.__failures_number = 1
+        self.__failure = TypeError('Unexpected error')
+        spool = self.__create_spool()
+
+        spool.append(get_messages())
+
+        self.assertTrue(spool.wait_drained(DRAIN_TIMEOUT))
+        self.assertTrue(spool.is_draining)
+        self.assertEqual(spool.get_status(), {
+            'draining': True,
+            'drained': True,
+            'failing': False,
+            'last_error': repr(self.__failure),
+        })
+
+    def test_segment_allocated(self):
+        segment = SpoolSegment(self.__directory.name, 0, SEGMENT_SIZE * 8)
+        segment.close()
+
+        # The blocks are allocated, not left sparse.
+        self.assertGreaterEqual(os.stat(segment.path).st_blocks * 512, SEGMENT_SIZE * 8)
@@ -0,0 +1,106 @@
+import json
+import unittest
+
+from scheduler.tasks_cache import SerializedTasksCache
+from scheduler.tasks_cache import get_inputs_key
+from scheduler.tasks_generators.learner_tasks_generator import LearnerTasksGenerator
+
+JOB_NAME = 'gpfunction'
+OTHER_JOB_NAME = 'gpfunction "2"'
+TASKS_NUMBER = 10
+
+INPUTS = {
+    'tasks_number': TASKS_NUMBER,
+    'dataset_name': 'higgs',
+    'training_rate': 0.5,
+    'fusion_rate': 0.3,
+    'sample_rate': 0.1,
+    'class_attribute': 'label',
+    'class_attribute_type': 'text',
+    'true_class_value': '1',
+    'include_attributes': [],
+    'exclude_attributes': [],
+    'attributes_rate': 0.5,
+    'random_seed': 0,
+    'include_header': False,
+    'duration': 60,
+    'learn_parameters': [
+        {'name': 'xover_op', 'type': 'text', 'values': ['SPUCrossover', 'KozaCrossover']},
+        {'name': 'mutation_rate', 'type': 'real', 'range': {'start': 0.1, 'stop': 1.0, 'step': 0.001}},
+    ],
+}
+
+
+class CountingTasksGenerator(LearnerTasksGenerator):
+    created_number = 0
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        CountingTasksGenerator.created_number += 1
+
+
+class SerializedTasksCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.__cache = SerializedTasksCache()
+        CountingTasksGenerator.created_number = 0
+
+    def tearDown(self):
+        pass
+
+    def __get_expected(self, job_name, inputs=INPUTS):
+        return list(LearnerTasksGenerator(job_name=job_name, **inputs).serialize())
+
+    def test_miss_then_hit(self):
+        bodies = list(self.__cache.get_tasks(CountingTasksGenerator, JOB_NAME, INPUTS).serialize())
+        self.assertEqual(bodies, self.__get_expected(JOB_NAME))
+        self.assertEqual(CountingTasksGenerator.created_number, 2)
+
+        tasks = self.__cache.get_tasks(CountingTasksGenerator, OTHER_JOB_NAME, INPUTS)
+        bodies = list(tasks.serialize())
+        self.assertEqual(bodies, self.__get_expected(OTHER_JOB_NAME))
+        self.assertEqual(json.loads(bodies[0])['job_name'], OTHER_JOB_NAME)
+        # Only the generator of the iteration is created, not the one generating the serialized tasks.
+        self.assertEqual(CountingTasksGenerator.created_number, 3)
+
+        self.assertEqual(list(tasks), list(LearnerTasksGenerator(job_name=OTHER_JOB_NAME, **INPUTS)))
+
+    def test_partial_iteration_not_cached(self):
+        bodies = self.__cache.get_tasks(CountingTasksGenerator, JOB_NAME, INPUTS).serialize()
+        next(bodies)
+        bodies.close()
+
+        list(self.__cache.get_tasks(CountingTasksGenerator, JOB_NAME, INPUTS).serialize())
+        self.assertEqual(CountingTasksGenerator.created_number, 4)
+
+    def test_eviction(self):
+        tasks_size = sum(map(len, self.__get_expected(JOB_NAME)))
+        cache = SerializedTasksCache(size=tasks_size * 3 // 2)
+        other_inputs = dict(INPUTS, random_seed=1)
+
+        list(cache.get_tasks(CountingTasksGenerator, JOB_NAME, INPUTS).serialize())
+        list(cache.get_tasks(CountingTasksGenerator, JOB_NAME, other_inputs).serialize())
+        list(cache.get_tasks(CountingTasksGenerator, JOB_NAME, other_inputs).serialize())
+        self.assertEqual(CountingTasksGenerator.created_number, 5)
+
+        list(cache.get_tasks(CountingTasksGenerator, JOB_NAME, INPUTS).serialize())
+        self.assertEqual(CountingTasksGenerator.created_number, 7)
+
+    def test_too_large_not_cached(self):
+        cache = SerializedTasksCache(size=10)
+
+        for _ in range(2):
+            bodies = list(cache.get_tasks(CountingTasksGenerator, JOB_NAME, INPUTS).serialize())
+            self.assertEqual(bodies, self.__get_expected(JOB_NAME))
+        self.assertEqual(CountingTasksGenerator.created_number, 4)
+
+    def test_inputs_key(self):
+        reordered_inputs = dict(reversed(list(INPUTS.items())))
+
+        self.assertEqual(
+            get_inputs_key(LearnerTasksGenerator, INPUTS),
+            get_inputs_key(LearnerTasksGenerator, reordered_inputs),
+        )
+        self.assertNotEqual(
+            get_inputs_key(LearnerTasksGenerator, INPUTS),
+            get_inputs_key(LearnerTasksGenerator, dict(INPUTS, random_seed=1)),
+        )
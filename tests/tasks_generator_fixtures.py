@@ -0,0 +1,95 @@
+from scheduler.tasks_generators.filter_tasks_generator import FilterTasksGenerator
+from scheduler.tasks_generators.fuser_tasks_generator import FuserTasksGenerator
+from scheduler.tasks_generators.learner_tasks_generator import LearnerTasksGenerator
+
+JOB_NAME = 'gpfunction'
+TASKS_NUMBER = 10
+RANDOM_SEED = 0
+
+LEARNER_PARAMETERS = [
+    {
+        'name': 'xover_op',
+        'type': 'text',
+        'values': [
+            'SPUCrossover',
+            'KozaCrossover',
+        ],
+    },
+    {
+        'name': 'pop_size',
+        'type': 'integer',
+        'range': {
+            'start': 1000,
+            'stop': 2000,
+            'step': 100,
+        }
+    },
+    {
+        'name': 'mutation_rate',
+        'type': 'real',
+        'range': {
+            'start': 0.1,
+            'stop': 1.0,
+            'step': 0.001,
+        }
+    },
+]
+
+EXECUTOR_PARAMETERS = [
+    {
+        'name': 'xover_op',
+        'type': 'text',
+        'value': 'SPUCrossover',
+    },
+]
+
+ARGUMENTS = {
+    'job_name': JOB_NAME,
+    'dataset_name': 'higgs',
+    'training_rate': 0.5,
+    'fusion_rate': 0.3,
+    'class_attribute': 'label',
+    'class_attribute_type': 'integer',
+    'true_class_value': 1,
+    'include_attributes': [],
+    'exclude_attributes': [],
+    'attributes_rate': 0.5,
+    'random_seed': RANDOM_SEED,
+    'include_header': False,
+}
+
+GENERATORS_ARGUMENTS = {
+    LearnerTasksGenerator: dict(
+        ARGUMENTS,
+        tasks_number=TASKS_NUMBER,
+        sample_rate=0.1,
+        duration=60,
+        learn_parameters=LEARNER_PARAMETERS,
+    ),
+    FilterTasksGenerator: dict(
+        ARGUMENTS,
+        learner_outputs_number=TASKS_NUMBER,
+        threshold=0.5,
+        predict_parameters=EXECUTOR_PARAMETERS,
+    ),
+    FuserTasksGenerator: dict(
+        ARGUMENTS,
+        predict_parameters=EXECUTOR_PARAMETERS,
+    ),
+}
+
+
+def create_tasks_generator(generator_type, **arguments):
+    """
+    Creates a tasks generator with the arguments of the tests, replaced by the given ones.
+
+    :param generator_type: the type of the tasks generator
+    :type generator_type: type
+
+    :param arguments: the arguments to replace
+    :type arguments: dict[str, object]
+
+    :return: the tasks generator
+    :rtype: scheduler.tasks_generators.tasks_generator.TasksGenerator
+    """
+    return generator_type(**dict(GENERATORS_ARGUMENTS[generator_type], **arguments))
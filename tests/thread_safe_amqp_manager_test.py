@@ -0,0 +1,75 @@
+import unittest
+import threading
+from unittest import mock
+
+import pika
+
+from scheduler import thread_safe_amqp_manager
+from scheduler.thread_safe_amqp_manager import ThreadSafeAMQPManager
+
+AMQP_HOSTNAME = 'localhost'
+
+QUEUE_NAME = 'gpfunction'
+THREADS_NUMBER = 8
+MESSAGES_NUMBER = 100
+
+
+class RecordingAMQPManager(object):
+    def __init__(self, hostname, codec, channels_number, transport):
+        self.threads = set()
+        self.messages = []
+
+    def is_open(self):
+        return True
+
+    def publish_messages(self, queue_name, messages):
+        self.threads.add(threading.current_thread())
+        self.messages.extend(messages)
+
+    def queue_size(self, queue_name):
+        raise pika.exceptions.ChannelClosedByBroker(404, 'NOT_FOUND')
+
+    def close(self):
+        pass
+
+
+class ThreadSafeAMQPManagerTest(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(thread_safe_amqp_manager, 'AMQPManager', RecordingAMQPManager)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.__amqp_manager = ThreadSafeAMQPManager(AMQP_HOSTNAME)
+
+    def tearDown(self):
+        self.__amqp_manager.close()
+
+    def test_publish_messages(self):
+        threads = [
+            threading.Thread(
+                target=self.__amqp_manager.publish_messages,
+                args=(QUEUE_NAME, range(MESSAGES_NUMBER)),
+            )
+            for _ in range(THREADS_NUMBER)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        recording_amqp_manager = self.__amqp_manager._ThreadSafeAMQPManager__amqp_manager
+        self.assertEqual(len(recording_amqp_manager.messages), THREADS_NUMBER * MESSAGES_NUMBER)
+        self.assertEqual(len(recording_amqp_manager.threads), 1)
+        self.assertNotIn(threading.current_thread(), recording_amqp_manager.threads)
+
+    def test_errors(self):
+        with self.assertRaises(pika.exceptions.ChannelClosedByBroker):
+            self.__amqp_manager.queue_size(QUEUE_NAME)
+        self.assertTrue(self.__amqp_manager.is_open())
+
+    def test_close(self):
+        self.__amqp_manager.close()
+
+        self.assertFalse(self.__amqp_manager.is_open())
+        with self.assertRaises(pika.exceptions.ConnectionWrongStateError):
+            self.__amqp_manager.publish_messages(QUEUE_NAME, [])